@@ -0,0 +1,254 @@
+"""
+Benchmarks of the command pipeline under the mock backends.
+
+    python -m bench.benchmarks              run the benchmarks
+    python -m bench.benchmarks --save       run them and store the results as the new baseline
+    python -m bench.benchmarks --compare    run them and flag the regressions against the baseline
+
+Timings are the best of several repeats; baselines are machine-specific, so save them again
+on the machine used for the comparisons.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+from mock.backend import RecordingGPIO, SimulatedBackend
+from src.cleaning_robot import CleaningRobot
+from src.coverage_planner import CoveragePlanner
+from src.room_map import RoomMap
+from src.snapshot import StateSnapshot
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+THRESHOLD = 0.25
+REPEATS = 5
+
+
+class Measurement(NamedTuple):
+    name: str
+    value: float
+    unit: str
+    # True if a greater value is better, e.g., for a throughput
+    higher_is_better: bool
+
+
+class Regression(NamedTuple):
+    name: str
+    baseline: float
+    value: float
+    unit: str
+
+
+def best_time(function: Callable[[], None], repeats: int = REPEATS) -> float:
+    """
+    :return: the shortest of several timed calls, in seconds, after an untimed warm-up call
+    """
+    function()
+    best = float('inf')
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def _robot(backend=None) -> CleaningRobot:
+    robot = CleaningRobot(backend if backend is not None else SimulatedBackend())
+    robot.initialize_robot()
+    robot.set_borders(-10 ** 6, 10 ** 6, -10 ** 6, 10 ** 6)
+    return robot
+
+
+def command_latency(commands: int = 20000) -> List[Measurement]:
+    measurements = []
+    for command in CleaningRobot.VALID_COMMANDS:
+        robot = _robot()
+
+        def run():
+            for _ in range(commands):
+                robot.execute_command(command)
+
+        measurements.append(Measurement(f'execute_command_{command}', best_time(run) / commands * 1e6, 'us', False))
+    return measurements
+
+
+def route_throughput(length: int = 100000) -> List[Measurement]:
+    route = ('ffffrffffl' * (length // 10 + 1))[:length]
+    measurements = []
+    for coalesce_moves in (False, True):
+        robot = _robot()
+        seconds = best_time(lambda: robot.execute_commands(route, coalesce_moves))
+        name = 'execute_commands_coalesced' if coalesce_moves else 'execute_commands'
+        measurements.append(Measurement(name, length / seconds, 'commands/s', True))
+    return measurements
+
+
+def status_polling(polls: int = 50000) -> List[Measurement]:
+    robot = _robot()
+    record = robot.status()
+
+    def poll_string():
+        for _ in range(polls):
+            robot.robot_status()
+
+    def poll_record():
+        for _ in range(polls):
+            robot.status(record)
+
+    return [Measurement('robot_status', polls / best_time(poll_string), 'polls/s', True),
+            Measurement('status', polls / best_time(poll_record), 'polls/s', True)]
+
+
+def construction(robots: int = 2000) -> List[Measurement]:
+    def simulated():
+        for _ in range(robots):
+            CleaningRobot(SimulatedBackend())
+
+    def module():
+        for _ in range(robots):
+            CleaningRobot()
+
+    def lazy():
+        for _ in range(robots):
+            CleaningRobot(lazy=True)
+
+    return [Measurement('construct_simulated', best_time(simulated) / robots * 1e6, 'us', False),
+            Measurement('construct_module', best_time(module) / robots * 1e6, 'us', False),
+            Measurement('construct_lazy', best_time(lazy) / robots * 1e6, 'us', False)]
+
+
+def startup(restarts: int = 2000, saves: int = 20000) -> List[Measurement]:
+    """
+    Time from a new process object to a robot ready to take its next command: a cold start
+    initializing every peripheral and homing, and a warm restart from a state snapshot.
+    The mock peripherals initialize instantly and homing takes no time here, so these track
+    the software overhead of both paths, not the time a restart saves on the hardware.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'robot.snapshot')
+        with StateSnapshot(path) as snapshot:
+            snapshot.attach(_robot())
+        robot = _robot()
+        with StateSnapshot(os.path.join(directory, 'saves.snapshot')) as snapshot:
+            def save():
+                for x in range(saves):
+                    robot.pos_x = x
+                    snapshot.save(robot)
+
+            save_time = best_time(save) / saves
+
+        def cold():
+            for _ in range(restarts):
+                CleaningRobot().initialize_robot()
+
+        def warm():
+            for _ in range(restarts):
+                with StateSnapshot(path) as restored:
+                    restored.restore(CleaningRobot(lazy=True))
+
+        return [Measurement('cold_start', best_time(cold) / restarts * 1e6, 'us', False),
+                Measurement('warm_restart', best_time(warm) / restarts * 1e6, 'us', False),
+                Measurement('snapshot_save', save_time * 1e6, 'us', False)]
+
+
+def gpio_calls() -> List[Measurement]:
+    """
+    GPIO writes per command, counted rather than timed so they are exact on any machine
+    """
+    measurements = []
+    for command in CleaningRobot.VALID_COMMANDS:
+        gpio = RecordingGPIO()
+        robot = _robot(SimulatedBackend(gpio=gpio))
+        gpio.clear()
+        robot.execute_command(command)
+        measurements.append(Measurement(f'gpio_writes_{command}', gpio.count(), 'writes', False))
+    return measurements
+
+
+def coverage_planning(size: int = 1000, density: float = 0.02) -> List[Measurement]:
+    """
+    Coverage of a large room with scattered obstacles, which split it into many small cells to join
+    """
+    room_map = RoomMap(0, size - 1, 0, size - 1)
+    generator = random.Random(0)
+    for _ in range(int(size * size * density)):
+        room_map.set(generator.randrange(size), generator.randrange(size), RoomMap.OBSTACLE)
+    room_map.set(0, 0, RoomMap.FREE)
+    planner = CoveragePlanner(room_map)
+    return [Measurement('coverage_scattered', best_time(lambda: planner.plan(0, 0, CleaningRobot.N), 2), 's', False)]
+
+
+BENCHMARKS = [command_latency, route_throughput, status_polling, construction, startup, gpio_calls,
+              coverage_planning]
+
+
+def run_benchmarks() -> List[Measurement]:
+    return [measurement for benchmark in BENCHMARKS for measurement in benchmark()]
+
+
+def load_baseline(path: str = BASELINE) -> Dict[str, Measurement]:
+    with open(path) as file:
+        return {name: Measurement(name, **fields) for name, fields in json.load(file).items()}
+
+
+def save_baseline(measurements: List[Measurement], path: str = BASELINE) -> None:
+    with open(path, 'w') as file:
+        json.dump({measurement.name: {'value': round(measurement.value, 2), 'unit': measurement.unit,
+                                      'higher_is_better': measurement.higher_is_better}
+                   for measurement in measurements}, file, indent=2)
+        file.write('\n')
+
+
+def compare(measurements: List[Measurement], baseline: Dict[str, Measurement],
+            threshold: float = THRESHOLD) -> List[Regression]:
+    """
+    :param threshold: the relative change beyond which a measurement is a regression, e.g., 0.25 for 25%
+    :return: the measurements worse than their baseline by more than the threshold
+    """
+    regressions = []
+    for measurement in measurements:
+        reference = baseline.get(measurement.name)
+        if reference is None:
+            continue
+        if measurement.higher_is_better:
+            worse = measurement.value < reference.value * (1 - threshold)
+        else:
+            worse = measurement.value > reference.value * (1 + threshold)
+        if worse:
+            regressions.append(Regression(measurement.name, reference.value, measurement.value, measurement.unit))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks of the command pipeline under the mock backends")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--compare', action='store_true', help="flag the regressions against the baseline")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="relative change flagged as a regression")
+    parser.add_argument('--baseline', default=BASELINE, help="the baseline file")
+    arguments = parser.parse_args(argv)
+
+    measurements = run_benchmarks()
+    baseline = load_baseline(arguments.baseline) if arguments.compare else {}
+    for measurement in measurements:
+        line = f'{measurement.name:32} {measurement.value:14.2f} {measurement.unit}'
+        if measurement.name in baseline:
+            line += f'  (baseline {baseline[measurement.name].value:.2f})'
+        print(line)
+
+    if arguments.save:
+        save_baseline(measurements, arguments.baseline)
+    if arguments.compare:
+        regressions = compare(measurements, baseline, arguments.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression.name}: {regression.value:.2f} {regression.unit}, '
+                  f'baseline {regression.baseline:.2f} {regression.unit}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
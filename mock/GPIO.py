@@ -53,6 +53,12 @@ _mode = 0
 
 channel_config = {}
 
+# levels driven on input channels by inject_edge()
+channel_levels = {}
+
+# edge detection callbacks registered for each channel
+event_callbacks = {}
+
 #flags
 setModeDone = False
 
@@ -92,7 +98,7 @@ def setwarnings(flag):
     """
     Enable or disable warning messages
     """
-    logger.info("Set warnings as {}".format(flag))
+    logger.info("Set warnings as %s", flag)
 
 def setup(channel, direction, initial=0,pull_up_down=PUD_OFF):
     """
@@ -103,7 +109,7 @@ def setup(channel, direction, initial=0,pull_up_down=PUD_OFF):
     [initial]      - Initial value for an output channel
 
     """
-    logger.info("Setup channel : {} as {} with initial :{} and pull_up_down {}".format(channel,direction,initial,pull_up_down))
+    logger.info("Setup channel : %s as %s with initial :%s and pull_up_down %s", channel,direction,initial,pull_up_down)
     global channel_config
     channel_config[channel] = Channel(channel, direction, initial, pull_up_down)
 
@@ -114,14 +120,15 @@ def output(channel, value):
     value   - 0/1 or False/True or LOW/HIGH
 
     """
-    logger.info("Output channel : {} with value : {}".format(channel, value))
+    logger.info("Output channel : %s with value : %s", channel, value)
 
 def input(channel):
     """
     Input from a GPIO channel.  Returns HIGH=1=True or LOW=0=False
     channel - either board pin number or BCM number depending on which mode is set.
     """
-    logger.info("Reading from channel {}".format(channel))
+    logger.info("Reading from channel %s", channel)
+    return channel_levels.get(channel)
 
 def wait_for_edge(channel,edge,bouncetime,timeout):
     """
@@ -131,10 +138,10 @@ def wait_for_edge(channel,edge,bouncetime,timeout):
     [bouncetime] - time allowed between calls to allow for switchbounce
     [timeout]    - timeout in ms
     """
-    logger.info("Waiting for edge : {} on channel : {} with bounce time : {} and Timeout :{}".format(edge,channel,bouncetime,timeout))
+    logger.info("Waiting for edge : %s on channel : %s with bounce time : %s and Timeout :%s", edge,channel,bouncetime,timeout)
 
 
-def add_event_detect(channel,edge,callback,bouncetime):
+def add_event_detect(channel,edge,callback=None,bouncetime=None):
     """
     Enable edge detection events for a particular GPIO channel.
     channel      - either board pin number or BCM number depending on which mode is set.
@@ -142,14 +149,16 @@ def add_event_detect(channel,edge,callback,bouncetime):
     [callback]   - A callback function for the event (optional)
     [bouncetime] - Switch bounce timeout in ms for callback
     """
-    logger.info("Event detect added for edge : {} on channel : {} with bounce time : {} and callback {}".format(edge,channel,bouncetime,callback))
+    logger.info("Event detect added for edge : %s on channel : %s with bounce time : %s and callback %s", edge,channel,bouncetime,callback)
+    global event_callbacks
+    event_callbacks[channel] = (edge, [callback] if callback is not None else [])
 
 def event_detected(channel):
     """
     Returns True if an edge has occurred on a given GPIO.  You need to enable edge detection using add_event_detect() first.
     channel - either board pin number or BCM number depending on which mode is set.
     """
-    logger.info("Waiting for even detection on channel :{}".format(channel))
+    logger.info("Waiting for even detection on channel :%s", channel)
 
 def add_event_callback(channel,callback):
     """
@@ -157,21 +166,40 @@ def add_event_callback(channel,callback):
     channel      - either board pin number or BCM number depending on which mode is set.
     callback     - a callback function
     """
-    logger.info("Event callback : {} added for channel : {}".format(callback,channel))
+    logger.info("Event callback : %s added for channel : %s", callback,channel)
+    if channel in event_callbacks:
+        event_callbacks[channel][1].append(callback)
 
 def remove_event_detect(channel):
     """
     Remove edge detection for a particular GPIO channel
     channel - either board pin number or BCM number depending on which mode is set.
     """
-    logger.info("Event detect removed for channel : {}".format(channel))
+    logger.info("Event detect removed for channel : %s", channel)
+    event_callbacks.pop(channel, None)
+
+def inject_edge(channel, value):
+    """
+    Mock only: drive an input channel to a level and fire the callbacks of the matching edge, if any
+    channel - either board pin number or BCM number depending on which mode is set.
+    value   - 0/1 or False/True or LOW/HIGH
+    """
+    logger.info("Injecting level : %s on channel : %s", value, channel)
+    previous = channel_levels.get(channel)
+    channel_levels[channel] = value
+    if channel not in event_callbacks or bool(previous) == bool(value):
+        return
+    edge, callbacks = event_callbacks[channel]
+    if edge == BOTH or edge == (RISING if value else FALLING):
+        for callback in list(callbacks):
+            callback(channel)
 
 def gpio_function(channel):
     """
     Return the current GPIO function (IN, OUT, PWM, SERIAL, I2C, SPI)
     channel - either board pin number or BCM number depending on which mode is set.
     """
-    logger.info("GPIO function of channel : {} is {}".format(channel,channel_config[channel].direction))
+    logger.info("GPIO function of channel : %s is %s", channel,channel_config[channel].direction)
 
 
 class PWM:
@@ -185,7 +213,7 @@ class PWM:
         self.dutycycle = 0
         global channel_config
         channel_config[channel] = Channel(channel,PWM,)
-        logger.info("Initialized PWM for channel : {} at frequency : {}".format(channel,frequency))
+        logger.info("Initialized PWM for channel : %s at frequency : %s", channel,frequency)
 
     # where dc is the duty cycle (0.0 <= dc <= 100.0)
     def start(self, dutycycle):
@@ -194,7 +222,7 @@ class PWM:
         dutycycle - the duty cycle (0.0 to 100.0)
         """
         self.dutycycle = dutycycle
-        logger.info("Start pwm on channel : {} with duty cycle : {}".format(self.channel,dutycycle))
+        logger.info("Start pwm on channel : %s with duty cycle : %s", self.channel,dutycycle)
 
     # where freq is the new frequency in Hz
     def ChangeFrequency(self, frequency):
@@ -202,7 +230,7 @@ class PWM:
         Change the frequency
         frequency - frequency in Hz (freq > 1.0)
         """
-        logger.info("Freqency changed for channel : {} from : {} -> to : {}".format(self.channel,self.frequency,frequency))
+        logger.info("Freqency changed for channel : %s from : %s -> to : %s", self.channel,self.frequency,frequency)
         self.frequency = frequency
 
     # where 0.0 <= dc <= 100.0
@@ -212,11 +240,11 @@ class PWM:
         dutycycle - between 0.0 and 100.0
         """
         self.dutycycle = dutycycle
-        logger.info("Dutycycle changed for channel : {} from : {} -> to : {}".format(self.channel,self.dutycycle,dutycycle))
+        logger.info("Dutycycle changed for channel : %s from : %s -> to : %s", self.channel,self.dutycycle,dutycycle)
 
     # stop PWM generation
     def stop(self):
-        logger.info("Stop PWM on channel : {} with duty cycle : {}".format(self.channel,self.dutycycle))
+        logger.info("Stop PWM on channel : %s with duty cycle : %s", self.channel,self.dutycycle)
 
 
 def cleanup(channel=None):
@@ -225,6 +253,11 @@ def cleanup(channel=None):
     [channel] - individual channel or list/tuple of channels to clean up.  Default - clean every channel that has been used.
     """
     if channel is not None:
-        logger.info("Cleaning up channel : {}".format(channel))
+        logger.info("Cleaning up channel : %s", channel)
+        for ch in (channel if isinstance(channel, (list, tuple)) else [channel]):
+            channel_levels.pop(ch, None)
+            event_callbacks.pop(ch, None)
     else:
-        logger.info("Cleaning up all channels")
\ No newline at end of file
+        logger.info("Cleaning up all channels")
+        channel_levels.clear()
+        event_callbacks.clear()
\ No newline at end of file
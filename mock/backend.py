@@ -0,0 +1,273 @@
+"""
+Instance-scoped stand-ins for RPi.GPIO, board.I2C and IBS, so that many simulated robots
+can live in one process without sharing pin state
+"""
+
+import logging
+import time
+from array import array
+from itertools import chain
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from mock import GPIO
+from mock.board import I2C
+
+logger = logging.getLogger(__name__)
+
+
+class SimulatedGPIO:
+    """
+    Same API as mock.GPIO, with a pin table of its own and no logging
+    """
+
+    __slots__ = ('mode', 'directions', 'levels', 'event_callbacks', 'detected')
+
+    BCM = GPIO.BCM
+    BOARD = GPIO.BOARD
+    BOTH = GPIO.BOTH
+    FALLING = GPIO.FALLING
+    RISING = GPIO.RISING
+    HIGH = GPIO.HIGH
+    LOW = GPIO.LOW
+    IN = GPIO.IN
+    OUT = GPIO.OUT
+    PUD_DOWN = GPIO.PUD_DOWN
+    PUD_OFF = GPIO.PUD_OFF
+    PUD_UP = GPIO.PUD_UP
+    UNKNOWN = GPIO.UNKNOWN
+
+    def __init__(self):
+        self.mode = None
+        self.directions = {}
+        self.levels = {}
+        self.event_callbacks = {}
+        # Channels with an edge detected since the last event_detected() call
+        self.detected = set()
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, channel, direction, initial=0, pull_up_down=GPIO.PUD_OFF):
+        for ch in (channel if isinstance(channel, (list, tuple)) else [channel]):
+            self.directions[ch] = direction
+            if direction == self.OUT:
+                self.levels[ch] = initial
+
+    def output(self, channel, value):
+        """
+        Output to a GPIO channel or list of channels, which must have been set up as outputs
+        """
+        if isinstance(channel, (list, tuple)):
+            values = value if isinstance(value, (list, tuple)) else [value] * len(channel)
+            for ch, val in zip(channel, values):
+                self.output(ch, val)
+            return
+        if self.directions.get(channel) != self.OUT:
+            raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+        self.levels[channel] = value
+
+    def input(self, channel):
+        if channel not in self.directions:
+            raise RuntimeError("You must setup() the GPIO channel first")
+        return self.levels.get(channel)
+
+    def wait_for_edge(self, channel, edge, bouncetime=None, timeout=None):
+        """
+        Edges are only injected between calls in a simulation, so none can come while waiting
+        :return: None, as on a timeout
+        """
+        if timeout is None:
+            raise RuntimeError("Waiting for an edge without timeout would block forever")
+        return None
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        self.event_callbacks[channel] = (edge, [callback] if callback is not None else [])
+
+    def add_event_callback(self, channel, callback):
+        if channel in self.event_callbacks:
+            self.event_callbacks[channel][1].append(callback)
+
+    def event_detected(self, channel):
+        """
+        :return: True if an edge was detected on the channel since the last call
+        """
+        if channel in self.detected:
+            self.detected.discard(channel)
+            return True
+        return False
+
+    def remove_event_detect(self, channel):
+        self.event_callbacks.pop(channel, None)
+        self.detected.discard(channel)
+
+    def inject_edge(self, channel, value):
+        """
+        Drive an input channel to a level and fire the callbacks of the matching edge, if any
+        """
+        previous = self.levels.get(channel)
+        self.levels[channel] = value
+        if channel not in self.event_callbacks or bool(previous) == bool(value):
+            return
+        edge, callbacks = self.event_callbacks[channel]
+        if edge == self.BOTH or edge == (self.RISING if value else self.FALLING):
+            self.detected.add(channel)
+            for callback in list(callbacks):
+                callback(channel)
+
+    def gpio_function(self, channel):
+        """
+        :return: the direction the channel was set up with, UNKNOWN if it was not
+        """
+        return self.directions.get(channel, self.UNKNOWN)
+
+    def PWM(self, channel, frequency):
+        return SimulatedPWM(self, channel, frequency)
+
+    def cleanup(self, channel=None):
+        channels = list(self.directions) if channel is None else \
+            (channel if isinstance(channel, (list, tuple)) else [channel])
+        for ch in channels:
+            self.directions.pop(ch, None)
+            self.levels.pop(ch, None)
+            self.event_callbacks.pop(ch, None)
+            self.detected.discard(ch)
+
+
+class SimulatedPWM:
+    """
+    Same API as mock.GPIO.PWM, keeping the duty cycles it was set to
+    """
+
+    __slots__ = ('channel', 'frequency', 'dutycycle', 'running', 'duty_cycles')
+
+    def __init__(self, gpio: SimulatedGPIO, channel, frequency):
+        if gpio.directions.get(channel) != gpio.OUT:
+            raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+        self.channel = channel
+        self.frequency = frequency
+        self.dutycycle = 0
+        self.running = False
+        self.duty_cycles = []
+
+    def start(self, dutycycle):
+        self.running = True
+        self.ChangeDutyCycle(dutycycle)
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def ChangeDutyCycle(self, dutycycle):
+        self.dutycycle = dutycycle
+        self.duty_cycles.append(dutycycle)
+
+    def stop(self):
+        self.running = False
+
+
+class RecordingGPIO(SimulatedGPIO):
+    """
+    SimulatedGPIO keeping a trace of the last writes, (timestamp, channel, value) entries in a
+    preallocated ring buffer, so tests can assert pin sequences without patching the GPIO
+    """
+
+    __slots__ = ('clock', 'capacity', 'recorded', '_times', '_channels', '_values')
+
+    def __init__(self, capacity: int = 4096, clock: Callable[[], float] = time.perf_counter):
+        """
+        :param capacity: the number of writes kept, the oldest ones are overwritten first
+        :param clock: the source of the timestamps, e.g., a VirtualClock
+        """
+        super().__init__()
+        self.clock = clock
+        self.capacity = capacity
+        self.recorded = 0
+        self._times = array('d', bytes(8 * capacity))
+        self._channels = array('h', bytes(2 * capacity))
+        self._values = array('b', bytes(capacity))
+
+    def output(self, channel, value):
+        super().output(channel, value)
+        if isinstance(channel, (list, tuple)):
+            return  # Recorded channel by channel by the call above
+        slot = self.recorded % self.capacity
+        self._times[slot] = self.clock()
+        self._channels[slot] = channel
+        self._values[slot] = 1 if value else 0
+        self.recorded += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Output channel : %s with value : %s", channel, value)
+
+    def __len__(self) -> int:
+        return min(self.recorded, self.capacity)
+
+    @property
+    def dropped(self) -> int:
+        """
+        The number of writes overwritten by newer ones
+        """
+        return max(0, self.recorded - self.capacity)
+
+    def entries(self, channel: Optional[int] = None) -> List[Tuple[float, int, int]]:
+        """
+        :return: the recorded (timestamp, channel, value) writes, oldest first, to a channel or to every channel
+        """
+        return [(self._times[slot], self._channels[slot], self._values[slot]) for slot in self._slots()
+                if channel is None or self._channels[slot] == channel]
+
+    def writes(self, channel: int) -> List[int]:
+        """
+        :return: the sequence of values written to a channel, oldest first
+        """
+        return [self._values[slot] for slot in self._slots() if self._channels[slot] == channel]
+
+    def count(self, channel: Optional[int] = None) -> int:
+        if channel is None:
+            return len(self)
+        return sum(1 for slot in self._slots() if self._channels[slot] == channel)
+
+    def clear(self) -> None:
+        self.recorded = 0
+
+    def _slots(self) -> Iterable[int]:
+        if self.recorded <= self.capacity:
+            return range(self.recorded)
+        start = self.recorded % self.capacity
+        return chain(range(start, self.capacity), range(start))
+
+
+class SimulatedIBS:
+    """
+    IBS stand-in whose charge left is set by the simulation
+    """
+
+    __slots__ = ('i2c', 'address', 'charge')
+
+    def __init__(self, i2c: I2C, address: int = 0x77, charge: int = 100):
+        self.i2c = i2c
+        self.address = address
+        self.charge = charge
+
+    def get_charge_left(self) -> int:
+        return self.charge
+
+
+class SimulatedBackend:
+    """
+    GPIO, I2C bus and IBS of a single simulated robot: CleaningRobot(SimulatedBackend())
+    """
+
+    __slots__ = ('gpio', 'i2c', 'ibs')
+
+    def __init__(self, charge: int = 100, gpio: Optional[SimulatedGPIO] = None):
+        """
+        :param gpio: the GPIO of the robot, e.g., a RecordingGPIO, a new SimulatedGPIO by default
+        """
+        self.gpio = gpio if gpio is not None else SimulatedGPIO()
+        self.i2c = I2C()
+        self.ibs = SimulatedIBS(self.i2c, charge=charge)
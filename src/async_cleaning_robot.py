@@ -0,0 +1,143 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Coroutine, List, Optional, Tuple
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError, StepResult
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCleaningRobot(CleaningRobot):
+    """
+    CleaningRobot whose commands can be awaited: the motors are timed with asyncio.sleep,
+    so the event loop keeps serving the RMS and the monitoring tasks while the robot moves.
+    The synchronous API inherited from CleaningRobot keeps working unchanged.
+    """
+
+    def __init__(self, backend=None, lazy: bool = False):
+        """
+        :param backend: an object providing the gpio module and the ibs of this robot, see CleaningRobot
+        :param lazy: defer the initialization of the peripherals to their first use, see CleaningRobot
+        """
+        super().__init__(backend, lazy)
+        self._motion: Optional[asyncio.Task] = None
+        self._emergency = False
+        self._monitors: List[asyncio.Task] = []
+
+    async def execute_command_async(self, command: str) -> str:
+        if command not in self.VALID_COMMANDS:
+            raise CleaningRobotError("Invalid command received.")
+        return await self._run_motion(self._execute_route(command))
+
+    async def execute_commands_async(self, route: str) -> str:
+        """
+        Execute a whole route and return the status after its last executed command
+        :param route: a string of "l", "r" and "f" commands
+        """
+        if any(command not in self.VALID_COMMANDS for command in route):
+            raise CleaningRobotError("Invalid command received.")
+        return await self._run_motion(self._execute_route(route))
+
+    def emergency_stop(self) -> None:
+        """
+        Cancel the command or route being executed and drive all motor pins LOW
+        """
+        if self._motion is not None and not self._motion.done():
+            self._emergency = True
+            self._motion.cancel()
+        self.stop_wheel_motor(ramp=False)
+        self.stop_rotation_motor(ramp=False)
+
+    def add_monitor(self, callback: Callable[["AsyncCleaningRobot"], Any], period: float) -> asyncio.Task:
+        """
+        Run a monitoring callback every period seconds, concurrently with the commands.
+        An exception raised by the callback is logged and the monitoring goes on.
+        :param callback: a function or coroutine function taking the robot
+        :param period: seconds between two calls
+        """
+        task = asyncio.ensure_future(self._monitor(callback, period))
+        self._monitors.append(task)
+        return task
+
+    async def stop_monitors(self) -> None:
+        monitors, self._monitors = self._monitors, []
+        for task in monitors:
+            task.cancel()
+        await asyncio.gather(*monitors, return_exceptions=True)
+
+    async def activate_wheel_motor_async(self) -> None:
+        self.start_wheel_motor(ramp=False)
+        try:
+            if self.motion is not None:
+                await self.motion.accelerate_async(self.WHEEL_MOTOR)
+            await self._wait_async(self.WHEEL_MOVE_TIME, self.WHEEL_MOTOR)
+            if self.motion is not None:
+                await self.motion.decelerate_async(self.WHEEL_MOTOR)
+        finally:
+            self.stop_wheel_motor(ramp=False)
+
+    async def activate_rotation_motor_async(self, direction) -> None:
+        self.start_rotation_motor(direction, ramp=False)
+        try:
+            if self.motion is not None:
+                await self.motion.accelerate_async(self.ROTATION_MOTOR)
+            await self._wait_async(self.ROTATION_TIME, self.ROTATION_MOTOR)
+            if self.motion is not None:
+                await self.motion.decelerate_async(self.ROTATION_MOTOR)
+        finally:
+            self.stop_rotation_motor(ramp=False)
+
+    async def _wait_async(self, seconds: float, load: str) -> None:
+        # Always yields to the event loop, even when no time is to be waited for real
+        await asyncio.sleep(self._actuate(seconds, load))
+
+    async def _run_motion(self, motion: Coroutine[Any, Any, str]) -> str:
+        if self._motion is not None and not self._motion.done():
+            motion.close()
+            raise CleaningRobotError("The robot is already executing a command.")
+        self._motion = asyncio.ensure_future(motion)
+        try:
+            return await self._motion
+        except asyncio.CancelledError:
+            if not self._emergency:
+                raise
+            raise CleaningRobotError("Emergency stop.") from None
+        finally:
+            self._motion = None
+            self._emergency = False
+
+    async def _execute_route(self, route: str) -> str:
+        step = None
+        for command in route:
+            step = await self._step_async(command)
+            if step.stop is not None:
+                break
+        return self._route_status(step)
+
+    async def _step_async(self, command: str) -> StepResult:
+        stop = self._stop_reason(command)
+        if stop is not None:
+            return StepResult(command, self.pos_x, self.pos_y, self.heading, stop, None)
+
+        obstacle = await self._apply_command_async(command)
+        return StepResult(command, self.pos_x, self.pos_y, self.heading,
+                          self.OBSTACLE if obstacle is not None else None, obstacle)
+
+    async def _apply_command_async(self, command: str) -> Optional[Tuple[int, int]]:
+        if command == self.FORWARD:
+            await self.activate_wheel_motor_async()
+        else:
+            await self.activate_rotation_motor_async(command)
+        return self._complete_command(command)
+
+    async def _monitor(self, callback: Callable[["AsyncCleaningRobot"], Any], period: float) -> None:
+        while True:
+            try:
+                result = callback(self)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                # A failed sample must not end the monitoring
+                logger.exception("Monitor %r failed", callback)
+            await asyncio.sleep(period)
@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from src.cleaning_robot import CleaningRobotError
+
+
+class CachedBattery:
+    """
+    Battery-reading layer around an IBS that serves the charge left from a cached sample.
+    A sample is never served once it is older than max_age seconds: it is then read again
+    from the IBS, so any threshold on the charge left trips at most max_age seconds late.
+    It can replace the IBS of a CleaningRobot: robot.ibs = CachedBattery(robot.ibs, max_age=2)
+    """
+
+    def __init__(self, ibs, max_age: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        if max_age < 0:
+            raise CleaningRobotError("Invalid battery staleness bound.")
+        self.ibs = ibs
+        self.max_age = max_age
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+
+        self._charge = None
+        self._sampled_at = None
+        self._lock = threading.Lock()
+        self._stop_event = None
+        self._sampler = None
+
+    def get_charge_left(self) -> int:
+        """
+        Returns the charge left, reading the IBS only if the cached sample is too old.
+        :return: the charge left (i.e., a percentage value from 0 to 100)
+        """
+        with self._lock:
+            if self._sampled_at is not None and self.clock() - self._sampled_at <= self.max_age:
+                self.hits += 1
+                return self._charge
+            self.misses += 1
+        return self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Read the IBS and replace the cached sample
+        """
+        charge = self.ibs.get_charge_left()
+        with self._lock:
+            self._charge = charge
+            self._sampled_at = self.clock()
+        return charge
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._sampled_at = None
+
+    def sample_age(self) -> Optional[float]:
+        """
+        :return: seconds since the cached sample was read, or None if nothing was read yet
+        """
+        with self._lock:
+            return None if self._sampled_at is None else self.clock() - self._sampled_at
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "sample_age": self.sample_age()}
+
+    def start(self, period: Optional[float] = None) -> None:
+        """
+        Keep the cached sample fresh from a background thread, so get_charge_left never blocks on the IBS
+        :param period: seconds between two reads, half of max_age by default; it must be positive,
+        so a max_age of 0 needs an explicit one
+        """
+        if self._sampler is not None:
+            return
+        if period is None:
+            period = self.max_age / 2
+        if period <= 0:
+            raise CleaningRobotError("Invalid battery sampling period.")
+        self.refresh()
+        self._stop_event = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, args=(period, self._stop_event),
+                                         name="ibs-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        if self._sampler is None:
+            return
+        self._stop_event.set()
+        self._sampler.join()
+        self._sampler = None
+        self._stop_event = None
+
+    def _sample(self, period: float, stop_event: threading.Event) -> None:
+        while not stop_event.wait(period):
+            self.refresh()
@@ -1,14 +1,19 @@
+import re
 import time
+from typing import Iterator, NamedTuple, Optional, Tuple
 
 DEPLOYMENT = False  # This variable is to understand whether you are deploying on the actual hardware
 
+# A run of the same command in a route
+_COMMAND_RUN = re.compile(r'(.)\1*')
+
 try:
     import RPi.GPIO as GPIO
     import board
     import IBS
 
     DEPLOYMENT = True
-except:
+except (ImportError, RuntimeError):  # RPi.GPIO raises RuntimeError when imported off a Raspberry Pi
     import mock.GPIO as GPIO
     import mock.board as board
     import mock.ibs as IBS
@@ -44,153 +49,565 @@ class CleaningRobot:
 
     VALID_COMMANDS = [LEFT, RIGHT, FORWARD]
 
-    def __init__(self):
-        GPIO.setmode(GPIO.BOARD)
-        GPIO.setwarnings(False)
-        GPIO.setup(self.INFRARED_PIN, GPIO.IN)
-        GPIO.setup(self.RECHARGE_LED_PIN, GPIO.OUT)
-        GPIO.setup(self.CLEANING_SYSTEM_PIN, GPIO.OUT)
-
-        GPIO.setup(self.PWMA, GPIO.OUT)
-        GPIO.setup(self.AIN2, GPIO.OUT)
-        GPIO.setup(self.AIN1, GPIO.OUT)
-        GPIO.setup(self.PWMB, GPIO.OUT)
-        GPIO.setup(self.BIN2, GPIO.OUT)
-        GPIO.setup(self.BIN1, GPIO.OUT)
-        GPIO.setup(self.STBY, GPIO.OUT)
-
-        ic2 = board.I2C()
-        self.ibs = IBS.IBS(ic2)
+    # Cell offset of a forward move for each heading
+    DELTAS = {N: (0, 1), E: (1, 0), S: (0, -1), W: (-1, 0)}
+
+    # Heading reached from each heading after 0, 1, 2 or 3 right quarter turns
+    ROTATIONS = {N: (N, E, S, W), E: (E, S, W, N), S: (S, W, N, E), W: (W, N, E, S)}
+
+    # Shortest command sequence for a net number of right quarter turns (mod 4)
+    TURN_PROGRAMS = ('', RIGHT, RIGHT + RIGHT, LEFT)
+
+    # Reasons a route stops before its last command
+    LOW_BATTERY = '!'
+    OUT_OF_BOUNDS = 'O'
+    OBSTACLE = 'X'
+
+    # Seconds the wheel motor needs to move one cell from standstill, and to cross
+    # one more cell once it is already running
+    WHEEL_MOVE_TIME = 1
+    WHEEL_CRUISE_TIME = 0.4
+    # Seconds the rotation motor needs for a quarter turn
+    ROTATION_TIME = 1
+    # Seconds the cleaning system needs to switch on or off
+    CLEANING_SYSTEM_SWITCH_TIME = 0.5
+
+    # Actuators drawing power, as reported to a virtual clock
+    WHEEL_MOTOR = 'wheel'
+    ROTATION_MOTOR = 'rotation'
+    CLEANING_SYSTEM = 'cleaning'
+
+    def __init__(self, backend=None, lazy: bool = False):
+        """
+        :param backend: an object providing the gpio module and the ibs of this robot,
+        the GPIO and IBS modules imported by this file (RPi.GPIO on the hardware) by default
+        :param lazy: defer the pin setup to the first GPIO call and the IBS initialization to the first
+        battery reading, e.g., to restore a StateSnapshot before touching the hardware
+        """
+        if backend is None:
+            backend = ModuleBackend()
+        if lazy:
+            self.gpio = LazyPeripheral(self, 'gpio', lambda: self.setup_pins(backend.gpio))
+            self.ibs = LazyPeripheral(self, 'ibs', lambda: backend.ibs)
+        else:
+            self.gpio = self.setup_pins(backend.gpio)
+            self.ibs = backend.ibs
+
+        # Interrupt-driven infrared state, obstacle_found() polls the pin when it is None
+        self.obstacle_sensor = None
+        # Occupancy grid updated with the visited cells and the obstacles found, if any
+        self.room_map = None
+        # Virtual clock advanced by the actuations instead of sleeping, if any
+        self.clock = None
+        # Mission journal recording the commands, sensor readings and statuses, if any
+        self.journal = None
+        # Instrumentation timing the commands and the motors, if any
+        self.metrics = None
+        # Energy model learning the drain of the actuations, if any
+        self.energy_model = None
+        # Supervisor owning the cleaning system and the LEDs, if any
+        self.supervisor = None
+        # Motion layer driving the speed of the motors through PWM, full speed from start to stop if None
+        self.motion = None
+        # State snapshot saved after each command, to resume after a restart, if any
+        self.snapshot = None
 
         self.pos_x = None
         self.pos_y = None
         self.heading = None
 
+        # Outcome of the last command: its stop reason, if any, and the blocked cell if an obstacle stopped it
+        self.last_stop = None
+        self.last_obstacle = None
+
         self.recharge_led_on = False
         self.cleaning_system_on = False
         self.warning_led_on = False
 
         self.borders = [0, 9, 0, 9]
 
+    def setup_pins(self, gpio):
+        """
+        Set up the pins of the robot
+        :return: the gpio module
+        """
+        gpio.setmode(GPIO.BOARD)
+        gpio.setwarnings(False)
+        gpio.setup(self.INFRARED_PIN, GPIO.IN)
+        gpio.setup(self.WARNING_LED_PIN, GPIO.OUT)
+        gpio.setup(self.RECHARGE_LED_PIN, GPIO.OUT)
+        gpio.setup(self.CLEANING_SYSTEM_PIN, GPIO.OUT)
+
+        gpio.setup(self.PWMA, GPIO.OUT)
+        gpio.setup(self.AIN2, GPIO.OUT)
+        gpio.setup(self.AIN1, GPIO.OUT)
+        gpio.setup(self.PWMB, GPIO.OUT)
+        gpio.setup(self.BIN2, GPIO.OUT)
+        gpio.setup(self.BIN1, GPIO.OUT)
+        gpio.setup(self.STBY, GPIO.OUT)
+        return gpio
+
+    @classmethod
+    def compile_route(cls, route: str) -> str:
+        """
+        Normalize a route into a minimal equivalent program: opposite turns cancel out,
+        turn runs are reduced mod 4 and forward runs separated only by cancelling turns are merged.
+        The compiled route leaves the robot in the same position and heading as the original one,
+        as long as no obstacle, border or low battery stops it.
+        :param route: a string of "l", "r" and "f" commands
+        """
+        program = []
+        turns = 0
+        for command, run in cls._command_runs(route):
+            if command == cls.FORWARD:
+                program.append(cls.TURN_PROGRAMS[turns % 4])
+                program.append(cls.FORWARD * run)
+                turns = 0
+            else:
+                turns += run if command == cls.RIGHT else -run
+        program.append(cls.TURN_PROGRAMS[turns % 4])
+        return ''.join(program)
+
+    @classmethod
+    def route_displacement(cls, route: str, heading: str = N) -> Tuple[int, int, str]:
+        """
+        Compute where a route takes the robot without running it
+        :param route: a string of "l", "r" and "f" commands
+        :param heading: the heading the route starts from
+        :return: the net x and y displacement and the final heading
+        """
+        if heading not in cls.VALID_HEADINGS:
+            raise CleaningRobotError("Invalid heading.")
+        dx, dy = 0, 0
+        for command, run in cls._command_runs(route):
+            if command == cls.FORWARD:
+                step_x, step_y = cls.DELTAS[heading]
+                dx += step_x * run
+                dy += step_y * run
+            else:
+                heading = cls.ROTATIONS[heading][(run if command == cls.RIGHT else -run) % 4]
+        return dx, dy, heading
+
+    @classmethod
+    def _command_runs(cls, route: str) -> Iterator[Tuple[str, int]]:
+        if not set(route).issubset(cls.VALID_COMMANDS):
+            raise CleaningRobotError("Invalid command received.")
+        for run in _COMMAND_RUN.finditer(route):
+            yield route[run.start()], run.end() - run.start()
+
     def initialize_robot(self) -> None:
         self.pos_x = 0
         self.pos_y = 0
         self.heading = self.N
+        self.last_stop = None
+        self.last_obstacle = None
+        if self.journal is not None:
+            self.journal.position(self)
+        if self.snapshot is not None:
+            self.snapshot.save(self)
 
     def robot_status(self) -> str:
-        if self.heading not in self.VALID_HEADINGS:
-            raise CleaningRobotError("Invalid heading.")
-        if self.borders[0] <= self.pos_x <= self.borders[1] and self.borders[2] <= self.pos_y <= self.borders[3]:
+        if self._within_borders():
             string = f'({self.pos_x},{self.pos_y},{self.heading})'
-            self.warning_led_on = False
-            GPIO.output(self.WARNING_LED_PIN, False)
+            if self.supervisor is None:
+                self.warning_led_on = False
+                self.gpio.output(self.WARNING_LED_PIN, False)
         else:
             string = f'O({self.pos_x},{self.pos_y},{self.heading})'
-            self.warning_led_on = True
-            GPIO.output(self.WARNING_LED_PIN, True)
+            if self.supervisor is None:
+                self.warning_led_on = True
+                self.gpio.output(self.WARNING_LED_PIN, True)
         return string
 
+    def status(self, into: Optional["RobotStatus"] = None) -> "RobotStatus":
+        """
+        Structured counterpart of the status strings: no string is built until the record is formatted with str().
+        Low battery and obstacle report the outcome of the last command, so str() of the record matches
+        what execute_command returned. The warning LED is only written when it has to change.
+        :param into: a record to update in place instead of allocating a new one
+        """
+        out_of_bounds = not self._within_borders()
+        if self.supervisor is None and out_of_bounds != self.warning_led_on:
+            self.warning_led_on = out_of_bounds
+            self.gpio.output(self.WARNING_LED_PIN, out_of_bounds)
+        low_battery = self.last_stop == self.LOW_BATTERY
+        if into is None:
+            return RobotStatus(self.pos_x, self.pos_y, self.heading, out_of_bounds, low_battery, self.last_obstacle)
+        into.x = self.pos_x
+        into.y = self.pos_y
+        into.heading = self.heading
+        into.out_of_bounds = out_of_bounds
+        into.low_battery = low_battery
+        into.obstacle = self.last_obstacle
+        return into
+
     def execute_command(self, command: str) -> str:
         if command not in self.VALID_COMMANDS:
             raise CleaningRobotError("Invalid command received.")
 
-        battery = self.ibs.get_charge_left()
-        if battery <= 10:
+        stop = self._stop_reason(command)
+        if stop == self.LOW_BATTERY:
             return f'!{self.robot_status()}'
+        if stop == self.OUT_OF_BOUNDS:
+            return self.robot_status()
+
+        obstacle = self._apply_command(command)
+        suffix = f"({obstacle[0]},{obstacle[1]})" if obstacle is not None else ""
+        return self.robot_status() + suffix
+
+    def execute_commands(self, route: str, coalesce_moves: bool = False) -> str:
+        """
+        Execute a whole route sent by the RMS and return the status after its last executed command
+        :param route: a string of "l", "r" and "f" commands
+        :param coalesce_moves: drive each run of "f" commands with a single wheel motor activation
+        """
+        step = None
+        for step in self.iter_commands(route, coalesce_moves):
+            pass
+        return self._route_status(step)
+
+    def step_status(self, step: Optional["StepResult"]) -> str:
+        """
+        :param step: the StepResult of the last executed command of a route, None if it executed none
+        :return: the status string execute_commands returns for that route
+        """
+        return self._route_status(step)
+
+    def _route_status(self, step: Optional["StepResult"]) -> str:
+        """
+        Build the status string of a route from the StepResult of its last executed command
+        """
+        if step is not None and step.stop == self.LOW_BATTERY:
+            return f'!{self.robot_status()}'
+        if step is not None and step.stop == self.OBSTACLE:
+            return self.robot_status() + f"({step.obstacle[0]},{step.obstacle[1]})"
+        return self.robot_status()
+
+    def iter_commands(self, route: str, coalesce_moves: bool = False) -> Iterator["StepResult"]:
+        """
+        Execute a route one command at a time, yielding a StepResult after each command.
+        The route is validated as a whole before the robot moves.
+        :param route: a string of "l", "r" and "f" commands
+        :param coalesce_moves: drive each run of "f" commands with a single wheel motor activation
+        """
+        if any(command not in self.VALID_COMMANDS for command in route):
+            raise CleaningRobotError("Invalid command received.")
+        return self._run_route(route, coalesce_moves)
+
+    def _run_route(self, route: str, coalesce_moves: bool) -> Iterator["StepResult"]:
+        index = 0
+        while index < len(route):
+            command = route[index]
+            if coalesce_moves and command == self.FORWARD:
+                end = index
+                while end < len(route) and route[end] == self.FORWARD:
+                    end += 1
+                step = yield from self._run_forward(end - index)
+                index = end
+            else:
+                step = self._step(command)
+                yield step
+                index += 1
+            if step.stop is not None:
+                return
 
-        position = self.robot_status()
-        if 'O' in position:
-            return position
+    def execute_step(self, command: str) -> "StepResult":
+        """
+        Execute a single command like execute_command, returning a StepResult instead of a status string
+        """
+        if command not in self.VALID_COMMANDS:
+            raise CleaningRobotError("Invalid command received.")
+        return self._step(command)
 
-        suffix = ""
+    def _step(self, command: str) -> "StepResult":
+        stop = self._stop_reason(command)
+        if stop is not None:
+            return StepResult(command, self.pos_x, self.pos_y, self.heading, stop, None)
+
+        obstacle = self._apply_command(command)
+        return StepResult(command, self.pos_x, self.pos_y, self.heading,
+                          self.OBSTACLE if obstacle is not None else None, obstacle)
+
+    def _run_forward(self, cells: int) -> Iterator["StepResult"]:
+        """
+        Move forward up to the given number of cells with a single wheel motor activation.
+        The infrared sensor is sampled at each cell boundary and the run stops at the first blocked cell.
+        :return: the StepResult of the last cell
+        """
+        step = None
+        started = False
+        try:
+            for cell in range(cells):
+                stop = self._stop_reason(self.FORWARD)
+                if stop is not None:
+                    step = StepResult(self.FORWARD, self.pos_x, self.pos_y, self.heading, stop, None)
+                    yield step
+                    return step
+
+                # Started once the first cell is allowed, so a run that must not move never drives the motor
+                if not started:
+                    self.start_wheel_motor()
+                    started = True
+                self._wait(self.WHEEL_MOVE_TIME if cell == 0 else self.WHEEL_CRUISE_TIME, self.WHEEL_MOTOR)
+
+                obstacle = self._complete_command(self.FORWARD)
+                if obstacle is not None:
+                    step = StepResult(self.FORWARD, self.pos_x, self.pos_y, self.heading, self.OBSTACLE, obstacle)
+                    yield step
+                    return step
+                step = StepResult(self.FORWARD, self.pos_x, self.pos_y, self.heading, None, None)
+                yield step
+        finally:
+            if started:
+                self.stop_wheel_motor()
+        return step
+
+    def _stop_reason(self, command: str) -> Optional[str]:
+        """
+        Check whether a command can be executed, recording it in the journal if there is one
+        :return: LOW_BATTERY or OUT_OF_BOUNDS if the command must not be executed, None otherwise
+        """
+        if self.metrics is not None:
+            self.metrics.command_started(command)
+        if self.journal is not None:
+            self.journal.command(command)
+        stop = None
+        if self.ibs.get_charge_left() <= 10:
+            stop = self.LOW_BATTERY
+        elif not self._within_borders():
+            stop = self.OUT_OF_BOUNDS
+        self.last_stop = stop
+        self.last_obstacle = None
+        if stop is not None:
+            if self.journal is not None:
+                self.journal.status(self, stop, None)
+            if self.metrics is not None:
+                self.metrics.command_finished(stop)
+        return stop
+
+    def _within_borders(self) -> bool:
+        if self.heading not in self.VALID_HEADINGS:
+            raise CleaningRobotError("Invalid heading.")
+        return self.borders[0] <= self.pos_x <= self.borders[1] and self.borders[2] <= self.pos_y <= self.borders[3]
+
+    def _apply_command(self, command: str) -> Optional[Tuple[int, int]]:
+        """
+        Actuate a single valid command and update the position or heading accordingly
+        :return: the blocked cell if an obstacle prevented a forward move, None otherwise
+        """
         if command == self.FORWARD:
             self.activate_wheel_motor()
-            dx, dy = 0, 0
-            if self.heading == self.N:
-                dy = 1
-            elif self.heading == self.S:
-                dy = -1
-            elif self.heading == self.E:
-                dx = 1
-            elif self.heading == self.W:
-                dx = -1
+        else:
+            self.activate_rotation_motor(command)
+        return self._complete_command(command)
 
+    def _complete_command(self, command: str) -> Optional[Tuple[int, int]]:
+        """
+        Update the position or heading once the motor of a command has been actuated
+        :return: the blocked cell if an obstacle prevented a forward move, None otherwise
+        """
+        obstacle = None
+        if command == self.FORWARD:
+            dx, dy = self.DELTAS[self.heading]
             if self.obstacle_found():
-                suffix = f"({self.pos_x + dx},{self.pos_y + dy})"
+                obstacle = self.pos_x + dx, self.pos_y + dy
+                self._map_cell(*obstacle, True)
             else:
                 self.pos_x += dx
                 self.pos_y += dy
+                self._map_cell(self.pos_x, self.pos_y, False)
         else:
-            self.activate_rotation_motor(command)
             index = self.VALID_HEADINGS.index(self.heading)
             self.heading = self.VALID_HEADINGS[
                 (index - 1 if command == self.LEFT else index + 1) % len(self.VALID_HEADINGS)]
-
-        return self.robot_status() + suffix
+        self.last_stop = self.OBSTACLE if obstacle is not None else None
+        self.last_obstacle = obstacle
+        if self.journal is not None:
+            self.journal.status(self, self.last_stop, obstacle)
+        if self.metrics is not None:
+            self.metrics.command_finished(self.OBSTACLE if obstacle is not None else None)
+        if self.snapshot is not None:
+            self.snapshot.save(self)
+        return obstacle
+
+    def _map_cell(self, x: int, y: int, obstacle: bool) -> None:
+        if self.room_map is None or not self.room_map.contains(x, y):
+            return
+        if obstacle:
+            self.room_map.set(x, y, self.room_map.OBSTACLE)
+        else:
+            self.room_map.set(x, y, self.room_map.CLEANED if self.cleaning_system_on else self.room_map.FREE)
 
     def obstacle_found(self) -> bool:
-        return GPIO.input(self.INFRARED_PIN)
+        if self.obstacle_sensor is not None:
+            found = self.obstacle_sensor.obstacle
+        else:
+            found = self.gpio.input(self.INFRARED_PIN)
+        if self.journal is not None:
+            self.journal.infrared(found)
+        return found
 
     def manage_cleaning_system(self) -> None:
+        if self.journal is not None:
+            self.journal.cleaning_system()
+        try:
+            if self.supervisor is not None:
+                self.supervisor.tick(self.ibs.get_charge_left())
+            else:
+                self._switch_cleaning_system()
+        finally:
+            if self.snapshot is not None:
+                self.snapshot.save(self)
+
+    def _switch_cleaning_system(self) -> None:
         battery = self.ibs.get_charge_left()
+        if self.cleaning_system_on != (battery > 10):
+            if self.energy_model is not None:
+                self.energy_model.actuated(self.CLEANING_SYSTEM, self.CLEANING_SYSTEM_SWITCH_TIME, False)
+            if self.clock is not None:
+                self.clock.sleep(self.CLEANING_SYSTEM_SWITCH_TIME, self._loads(self.CLEANING_SYSTEM))
         if battery <= 10:
-            GPIO.output(self.CLEANING_SYSTEM_PIN, False)
+            self.gpio.output(self.CLEANING_SYSTEM_PIN, False)
             self.cleaning_system_on = False
 
-            GPIO.output(self.RECHARGE_LED_PIN, True)
+            self.gpio.output(self.RECHARGE_LED_PIN, True)
             self.recharge_led_on = True
             return
 
-        GPIO.output(self.CLEANING_SYSTEM_PIN, True)
+        self.gpio.output(self.CLEANING_SYSTEM_PIN, True)
         self.cleaning_system_on = True
 
-        GPIO.output(self.RECHARGE_LED_PIN, False)
+        self.gpio.output(self.RECHARGE_LED_PIN, False)
         self.recharge_led_on = False
 
+    def _wait(self, seconds: float, load: str) -> None:
+        """
+        Wait for an actuation to complete: on the virtual clock if there is one, for real on the hardware
+        :param load: the actuator drawing power while waiting
+        """
+        seconds = self._actuate(seconds, load)
+        if seconds:
+            time.sleep(seconds)
+
+    def _actuate(self, seconds: float, load: str) -> float:
+        """
+        Account for an actuation: its energy, and its time on the virtual clock if there is one
+        :return: the seconds still to wait for real, which are only waited on the hardware
+        """
+        if self.energy_model is not None:
+            self.energy_model.actuated(load, seconds, self.cleaning_system_on)
+        return self._elapse(seconds, load)
+
+    def _elapse(self, seconds: float, load: str) -> float:
+        """
+        :return: the seconds still to wait for real, which are only waited on the hardware
+        """
+        if self.clock is not None:
+            self.clock.sleep(seconds, self._loads(load))
+            return 0
+        return seconds if DEPLOYMENT else 0  # Sleep only if you are deploying on the actual hardware
+
+    def actuation_time(self, command: str) -> float:
+        """
+        :return: the seconds a single command takes, with the speed ramps of the motion layer if any
+        """
+        if self.motion is not None:
+            return self.motion.move_time(1) if command == self.FORWARD else self.motion.turn_time()
+        return self.WHEEL_MOVE_TIME if command == self.FORWARD else self.ROTATION_TIME
+
+    def _loads(self, load: str) -> Tuple[str, ...]:
+        if self.cleaning_system_on and load != self.CLEANING_SYSTEM:
+            return load, self.CLEANING_SYSTEM
+        return load,
+
     def activate_wheel_motor(self) -> None:
         """
         Let the robot move forward by activating its wheel motor
         """
+        self.start_wheel_motor()
+
+        self._wait(self.WHEEL_MOVE_TIME, self.WHEEL_MOTOR)  # Wait for the motor to actually move
+
+        self.stop_wheel_motor()
+
+    def start_wheel_motor(self, ramp: bool = True) -> None:
+        """
+        :param ramp: accelerate through the motion layer, if any, before returning, the caller accelerates otherwise
+        """
+        if self.metrics is not None:
+            self.metrics.motor_started(self.WHEEL_MOTOR)
         # Drive the motor clockwise
-        GPIO.output(self.AIN1, GPIO.HIGH)
-        GPIO.output(self.AIN2, GPIO.LOW)
+        self.gpio.output(self.AIN1, GPIO.HIGH)
+        self.gpio.output(self.AIN2, GPIO.LOW)
         # Set the motor speed
-        GPIO.output(self.PWMA, GPIO.HIGH)
+        if self.motion is None:
+            self.gpio.output(self.PWMA, GPIO.HIGH)
         # Disable STBY
-        GPIO.output(self.STBY, GPIO.HIGH)
-
-        if DEPLOYMENT:  # Sleep only if you are deploying on the actual hardware
-            time.sleep(1)  # Wait for the motor to actually move
+        self.gpio.output(self.STBY, GPIO.HIGH)
+        if self.motion is not None and ramp:
+            self.motion.accelerate(self.WHEEL_MOTOR)
 
-        # Stop the motor
-        GPIO.output(self.AIN1, GPIO.LOW)
-        GPIO.output(self.AIN2, GPIO.LOW)
-        GPIO.output(self.PWMA, GPIO.LOW)
-        GPIO.output(self.STBY, GPIO.LOW)
+    def stop_wheel_motor(self, ramp: bool = True) -> None:
+        """
+        :param ramp: decelerate through the motion layer, if any, rather than cutting the motor at once
+        """
+        if self.motion is not None:
+            if ramp:
+                self.motion.decelerate(self.WHEEL_MOTOR)
+            else:
+                self.motion.halt(self.WHEEL_MOTOR)
+        if self.metrics is not None:
+            self.metrics.motor_stopped(self.WHEEL_MOTOR)
+        self.gpio.output(self.AIN1, GPIO.LOW)
+        self.gpio.output(self.AIN2, GPIO.LOW)
+        self.gpio.output(self.PWMA, GPIO.LOW)
+        self.gpio.output(self.STBY, GPIO.LOW)
 
     def activate_rotation_motor(self, direction) -> None:
         """
         Let the robot rotate towards a given direction
         :param direction: "l" to turn left, "r" to turn right
         """
+        self.start_rotation_motor(direction)
+
+        self._wait(self.ROTATION_TIME, self.ROTATION_MOTOR)  # Wait for the motor to actually move
+
+        self.stop_rotation_motor()
+
+    def start_rotation_motor(self, direction, ramp: bool = True) -> None:
+        """
+        :param ramp: accelerate through the motion layer, if any, before returning, the caller accelerates otherwise
+        """
+        if self.metrics is not None:
+            self.metrics.motor_started(self.ROTATION_MOTOR)
         if direction == self.LEFT:
-            GPIO.output(self.BIN1, GPIO.HIGH)
-            GPIO.output(self.BIN2, GPIO.LOW)
+            self.gpio.output(self.BIN1, GPIO.HIGH)
+            self.gpio.output(self.BIN2, GPIO.LOW)
         elif direction == self.RIGHT:
-            GPIO.output(self.BIN1, GPIO.LOW)
-            GPIO.output(self.BIN2, GPIO.HIGH)
-
-        GPIO.output(self.PWMB, GPIO.HIGH)
-        GPIO.output(self.STBY, GPIO.HIGH)
+            self.gpio.output(self.BIN1, GPIO.LOW)
+            self.gpio.output(self.BIN2, GPIO.HIGH)
 
-        if DEPLOYMENT:  # Sleep only if you are deploying on the actual hardware
-            time.sleep(1)  # Wait for the motor to actually move
+        if self.motion is None:
+            self.gpio.output(self.PWMB, GPIO.HIGH)
+        self.gpio.output(self.STBY, GPIO.HIGH)
+        if self.motion is not None and ramp:
+            self.motion.accelerate(self.ROTATION_MOTOR)
 
-        # Stop the motor
-        GPIO.output(self.BIN1, GPIO.LOW)
-        GPIO.output(self.BIN2, GPIO.LOW)
-        GPIO.output(self.PWMB, GPIO.LOW)
-        GPIO.output(self.STBY, GPIO.LOW)
+    def stop_rotation_motor(self, ramp: bool = True) -> None:
+        """
+        :param ramp: decelerate through the motion layer, if any, rather than cutting the motor at once
+        """
+        if self.motion is not None:
+            if ramp:
+                self.motion.decelerate(self.ROTATION_MOTOR)
+            else:
+                self.motion.halt(self.ROTATION_MOTOR)
+        if self.metrics is not None:
+            self.metrics.motor_stopped(self.ROTATION_MOTOR)
+        self.gpio.output(self.BIN1, GPIO.LOW)
+        self.gpio.output(self.BIN2, GPIO.LOW)
+        self.gpio.output(self.PWMB, GPIO.LOW)
+        self.gpio.output(self.STBY, GPIO.LOW)
 
     def get_borders(self) -> str:
         return f'B({self.borders[0]},{self.borders[1]},{self.borders[2]},{self.borders[3]})'
@@ -200,8 +617,111 @@ class CleaningRobot:
         self.borders[1] = x_max
         self.borders[2] = y_min
         self.borders[3] = y_max
+        if self.room_map is not None:
+            self.room_map.resize(x_min, x_max, y_min, y_max)
+        if self.journal is not None:
+            self.journal.borders(self)
+        if self.snapshot is not None:
+            self.snapshot.save(self)
         return self.get_borders()
 
 
+class ModuleBackend:
+    """
+    Backend shared by every robot of the process, made of the GPIO, board and IBS modules.
+    The I2C bus and the IBS are opened on first use.
+    """
+
+    def __init__(self):
+        self.gpio = GPIO
+        self._i2c = None
+        self._ibs = None
+
+    @property
+    def i2c(self):
+        if self._i2c is None:
+            self._i2c = board.I2C()
+        return self._i2c
+
+    @property
+    def ibs(self):
+        if self._ibs is None:
+            self._ibs = IBS.IBS(self.i2c)
+        return self._ibs
+
+
+class LazyPeripheral:
+    """
+    Stand-in for the gpio or the ibs of a robot, initializing the peripheral on its first use
+    and then replacing itself with it, unless another layer has wrapped it meanwhile
+    """
+
+    def __init__(self, robot: CleaningRobot, attribute: str, initialize):
+        """
+        :param attribute: 'gpio' or 'ibs'
+        :param initialize: a function initializing the peripheral and returning it
+        """
+        self._robot = robot
+        self._attribute = attribute
+        self._initialize = initialize
+        self._peripheral = None
+
+    @property
+    def initialized(self) -> bool:
+        return self._peripheral is not None
+
+    def __getattr__(self, name):
+        peripheral = self._peripheral
+        if peripheral is None:
+            peripheral = self._peripheral = self._initialize()
+            if getattr(self._robot, self._attribute) is self:
+                setattr(self._robot, self._attribute, peripheral)
+        return getattr(peripheral, name)
+
+
+class RobotStatus:
+    """
+    Status of the robot, formatted lazily to the robot_status() string by str()
+    """
+
+    __slots__ = ('x', 'y', 'heading', 'out_of_bounds', 'low_battery', 'obstacle')
+
+    def __init__(self, x: int, y: int, heading: str, out_of_bounds: bool = False, low_battery: bool = False,
+                 obstacle: Optional[Tuple[int, int]] = None):
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.out_of_bounds = out_of_bounds
+        self.low_battery = low_battery
+        self.obstacle = obstacle
+
+    def __str__(self) -> str:
+        string = f'({self.x},{self.y},{self.heading})'
+        if self.out_of_bounds:
+            string = f'O{string}'
+        if self.low_battery:
+            string = f'!{string}'
+        if self.obstacle is not None:
+            string = f'{string}({self.obstacle[0]},{self.obstacle[1]})'
+        return string
+
+    def __repr__(self) -> str:
+        return f'RobotStatus({self})'
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RobotStatus):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+
+class StepResult(NamedTuple):
+    command: str
+    pos_x: int
+    pos_y: int
+    heading: str
+    stop: Optional[str]
+    obstacle: Optional[Tuple[int, int]]
+
+
 class CleaningRobotError(Exception):
     pass
@@ -0,0 +1,286 @@
+from collections import defaultdict, deque
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+Cell = Tuple[int, int]
+
+
+class _Fleet:
+    __slots__ = ('robot', 'schedule', 'state', 'end', 'keys')
+
+    def __init__(self, robot: CleaningRobot):
+        self.robot = robot
+        # (command, x, y, heading) planned for each tick, command is None while waiting
+        self.schedule: Deque[Tuple[Optional[str], int, int, str]] = deque()
+        # State of the robot at the end of its schedule, and the tick it is reached at
+        self.state = (robot.pos_x, robot.pos_y, robot.heading)
+        self.end = 0
+        # Reservations held, (x, y, tick)
+        self.keys: Deque[Tuple[int, int, int]] = deque()
+
+
+class Coordinator:
+    """
+    Coordinator of robots sharing a room, with a space-time reservation table keyed by (x, y, tick).
+    Every command takes one tick. A robot holds its cell at each tick it spends there, both cells
+    of a forward move for the tick before and after it, so it never sees another robot in front of it,
+    and its last cell from the end of its schedule on. Routes are admitted one after the other:
+    a robot waits in place until the next command of its route can get a reservation, and a route
+    is rejected if it ends on a cell another robot is yet to cross.
+    If a robot does not end up where planned, e.g., because of an obstacle, the rest of its route is
+    dropped and the robots whose reservations it now stands in are replanned. The routes dropped,
+    including those that could not be replanned, are appended to dropped as (robot_id, route).
+    """
+
+    # Ticks a robot may wait before a single command before its route is rejected
+    MAX_WAIT = 64
+
+    def __init__(self, max_wait: int = MAX_WAIT):
+        self.max_wait = max_wait
+        self.tick = 0
+        self._table: Dict[Tuple[int, int, int], Hashable] = {}
+        self._by_tick: Dict[int, List[Tuple[int, int, int]]] = defaultdict(list)
+        # Reservations of each cell, tick: robot
+        self._by_cell: Dict[Cell, Dict[int, Hashable]] = defaultdict(dict)
+        # Robot standing on each cell from the end of its schedule on
+        self._parked: Dict[Cell, Hashable] = {}
+        self._robots: Dict[Hashable, _Fleet] = {}
+        self.dropped: List[Tuple[Hashable, str]] = []
+
+    def add_robot(self, robot_id: Hashable, robot: CleaningRobot) -> None:
+        """
+        Register a robot standing at its current position
+        """
+        if robot_id in self._robots:
+            raise CleaningRobotError("Robot already registered.")
+        cell = (robot.pos_x, robot.pos_y)
+        if self.occupant(*cell) is not None:
+            raise CleaningRobotError("The cell is taken by another robot.")
+        entry = _Fleet(robot)
+        entry.end = self.tick
+        self._robots[robot_id] = entry
+        self._parked[cell] = robot_id
+        self._replan_conflicts([robot_id])
+
+    def submit(self, robot_id: Hashable, route: str) -> int:
+        """
+        Reserve the cells of a route, to be executed after the routes already submitted for the robot
+        :return: the number of ticks the robot will wait along the route
+        """
+        if any(command not in CleaningRobot.VALID_COMMANDS for command in route):
+            raise CleaningRobotError("Invalid command received.")
+        entry = self._robots[robot_id]
+        if not self._plan(robot_id, entry, route):
+            raise CleaningRobotError("The route cannot be admitted.")
+        return sum(1 for item in entry.schedule if item[0] is None)
+
+    def step(self) -> bool:
+        """
+        Execute the commands of one tick
+        :return: whether some robot still has commands to execute
+        """
+        tick = self.tick
+        deviated = []
+        for robot_id, entry in self._robots.items():
+            if not entry.schedule:
+                continue
+            command, x, y, heading = entry.schedule.popleft()
+            if command is None:
+                continue
+            robot = entry.robot
+            robot.execute_step(command)
+            if robot.pos_x != x or robot.pos_y != y or robot.heading != heading:
+                deviated.append(robot_id)
+
+        self.tick = tick + 1
+        for key in self._by_tick.pop(tick, ()):
+            if self._table.pop(key, None) is not None:
+                self._unindex(key)
+        for entry in self._robots.values():
+            while entry.keys and entry.keys[0][2] <= tick:
+                entry.keys.popleft()
+
+        for robot_id in deviated:
+            route = self._stop(robot_id)
+            if route:
+                self.dropped.append((robot_id, route))
+        if deviated:
+            self._replan_conflicts(deviated)
+        return any(entry.schedule for entry in self._robots.values())
+
+    def run(self, max_ticks: Optional[int] = None) -> int:
+        """
+        Execute ticks until every route is done
+        :return: the number of ticks executed
+        """
+        ticks = 0
+        while (max_ticks is None or ticks < max_ticks) and any(entry.schedule for entry in self._robots.values()):
+            self.step()
+            ticks += 1
+        return ticks
+
+    def occupant(self, x: int, y: int, tick: Optional[int] = None) -> Optional[Hashable]:
+        """
+        :return: the robot holding a cell at a tick, the current one by default, or None
+        """
+        if tick is None:
+            tick = self.tick
+        owner = self._table.get((x, y, tick))
+        if owner is not None:
+            return owner
+        owner = self._parked.get((x, y))
+        if owner is not None and self._robots[owner].end <= tick:
+            return owner
+        return None
+
+    def _free(self, x: int, y: int, tick: int, robot_id: Hashable) -> bool:
+        owner = self.occupant(x, y, tick)
+        return owner is None or owner == robot_id
+
+    def _plan(self, robot_id: Hashable, entry: _Fleet, route: str) -> bool:
+        """
+        Reserve the cells of a route after the schedule of a robot. A command that can neither run
+        nor wait in place makes the previous command start one tick later (at most max_wait times).
+        :return: False, reserving nothing, if the robot would have to wait too long
+        """
+        x, y, heading = entry.state
+        tick = entry.end
+        keys = []
+        schedule = []
+        # State before each admitted command and the tick it starts at, to backtrack
+        admitted = []
+
+        def hold(cell_x: int, cell_y: int, at: int) -> None:
+            key = (cell_x, cell_y, at)
+            if self._table.get(key) is None:
+                self._table[key] = robot_id
+                self._by_cell[cell_x, cell_y][at] = robot_id
+                keys.append(key)
+
+        def release(count: int) -> None:
+            for key in keys[count:]:
+                del self._table[key]
+                self._unindex(key)
+            del keys[count:]
+
+        hold(x, y, tick)
+        index = 0
+        earliest = tick
+        backtracks = 0
+        while index < len(route):
+            command = route[index]
+            before = (len(keys), len(schedule), x, y, heading, tick)
+            waited = 0
+            while True:
+                if tick >= earliest:
+                    if command == CleaningRobot.FORWARD:
+                        dx, dy = CleaningRobot.DELTAS[heading]
+                        if (self._free(x + dx, y + dy, tick, robot_id) and self._free(x + dx, y + dy, tick + 1, robot_id)
+                                and self._free(x, y, tick + 1, robot_id)):
+                            hold(x, y, tick + 1)
+                            hold(x + dx, y + dy, tick)
+                            hold(x + dx, y + dy, tick + 1)
+                            break
+                    elif self._free(x, y, tick + 1, robot_id):
+                        hold(x, y, tick + 1)
+                        break
+                if waited >= self.max_wait or not self._free(x, y, tick + 1, robot_id):
+                    waited = None
+                    break
+                hold(x, y, tick + 1)
+                schedule.append((None, x, y, heading))
+                tick += 1
+                waited += 1
+
+            if waited is None:
+                release(before[0])
+                if not admitted or backtracks >= self.max_wait:
+                    release(0)
+                    return False
+                # Start the previous command one tick later
+                before, start = admitted.pop()
+                release(before[0])
+                del schedule[before[1]:]
+                _, _, x, y, heading, tick = before
+                index -= 1
+                earliest = start + 1
+                backtracks += 1
+                continue
+
+            admitted.append((before, tick))
+            if command == CleaningRobot.FORWARD:
+                x += dx
+                y += dy
+            else:
+                heading = CleaningRobot.ROTATIONS[heading][1 if command == CleaningRobot.RIGHT else 3]
+            schedule.append((command, x, y, heading))
+            tick += 1
+            index += 1
+            earliest = tick
+
+        if any(at >= tick and owner != robot_id for at, owner in self._by_cell.get((x, y), {}).items()):
+            # Another robot is yet to cross the cell the robot would stand on for good
+            release(0)
+            return False
+
+        for key in keys:
+            self._by_tick[key[2]].append(key)
+        entry.keys.extend(keys)
+        entry.schedule.extend(schedule)
+        self._park(robot_id, entry, (x, y, heading), tick)
+        return True
+
+    def _park(self, robot_id: Hashable, entry: _Fleet, state: Tuple[int, int, str], end: int) -> None:
+        old = entry.state[:2]
+        if self._parked.get(old) == robot_id:
+            del self._parked[old]
+        entry.state = state
+        entry.end = end
+        self._parked[state[:2]] = robot_id
+
+    def _cancel(self, robot_id: Hashable, entry: _Fleet) -> None:
+        """
+        Release the reservations of a robot from the current tick on and clear its schedule
+        """
+        for key in entry.keys:
+            if self._table.get(key) == robot_id:
+                del self._table[key]
+                self._unindex(key)
+        entry.keys.clear()
+        entry.schedule.clear()
+
+    def _unindex(self, key: Tuple[int, int, int]) -> None:
+        cell = key[:2]
+        reservations = self._by_cell[cell]
+        del reservations[key[2]]
+        if not reservations:
+            del self._by_cell[cell]
+
+    def _stop(self, robot_id: Hashable) -> str:
+        """
+        Drop the rest of the route of a robot, parking it where it stands
+        :return: the commands dropped
+        """
+        entry = self._robots[robot_id]
+        route = ''.join(item[0] for item in entry.schedule if item[0] is not None)
+        self._cancel(robot_id, entry)
+        robot = entry.robot
+        self._park(robot_id, entry, (robot.pos_x, robot.pos_y, robot.heading), self.tick)
+        return route
+
+    def _replan_conflicts(self, robot_ids: List[Hashable]) -> None:
+        """
+        Replan the robots holding reservations on the cells the given robots now stand on
+        """
+        pending = list(robot_ids)
+        while pending:
+            robot_id = pending.pop()
+            reservations = self._by_cell.get(self._robots[robot_id].state[:2], {})
+            # Robots in the order of their first reservation of the cell
+            for other_id in dict.fromkeys(owner for owner in reservations.values() if owner != robot_id):
+                other = self._robots[other_id]
+                route = self._stop(other_id)
+                if not self._plan(other_id, other, route):
+                    self.dropped.append((other_id, route))
+                    pending.append(other_id)
@@ -0,0 +1,327 @@
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.path_planner import PathPlanner
+from src.room_map import RoomMap
+
+
+class CoveragePlan(NamedTuple):
+    route: str
+    coverage: float
+    actuation_time: float
+
+
+class CoveragePlanner:
+    """
+    Boustrophedon coverage planner for the room of a RoomMap. Free cells are split into
+    straight lanes along the longer side of the room, so the robot turns as little as possible;
+    overlapping lanes of consecutive rows (or columns) are grouped into cells that are swept
+    back and forth, and cells are visited nearest first. Cells cut off from the robot by obstacles
+    are found once, from the lanes, and skipped instead of planned to.
+    """
+
+    # Number of cells, in sweep order, among which the nearest one is picked next
+    ORDER_WINDOW = 64
+    # Number of crossing lanes tried for a detour before falling back to the path planner
+    DETOUR_CROSSINGS = 16
+    # Margins around the ends of a connection of the windows the path planner searches, before the whole map
+    DETOUR_MARGINS = (4, 16, 64)
+
+    def __init__(self, room_map: RoomMap, forward_cost: float = CleaningRobot.WHEEL_MOVE_TIME,
+                 turn_cost: float = CleaningRobot.ROTATION_TIME):
+        self.room_map = room_map
+        self.forward_cost = forward_cost
+        self.turn_cost = turn_cost
+        self.path_planner = PathPlanner(room_map, forward_cost, turn_cost)
+
+    @classmethod
+    def for_robot(cls, robot: CleaningRobot) -> "CoveragePlanner":
+        """
+        :return: a planner over the room map of a robot, costing the commands with its actuation times
+        """
+        return cls(robot.room_map, robot.actuation_time(CleaningRobot.FORWARD),
+                   robot.actuation_time(CleaningRobot.RIGHT))
+
+    def plan(self, x: int, y: int, heading: str) -> CoveragePlan:
+        """
+        :return: the command program covering the room from (x, y, heading), the percentage of
+        the free cells it covers and its actuation time
+        """
+        room_map = self.room_map
+        if heading not in CleaningRobot.VALID_HEADINGS:
+            raise CleaningRobotError("Invalid heading.")
+        if not room_map.contains(x, y) or room_map.is_obstacle(x, y):
+            raise CleaningRobotError("Invalid starting cell.")
+
+        # Sweep along x when the room is wider than it is tall, along y otherwise
+        along_x = room_map.width >= room_map.height
+        program = []
+        covered = 0
+        position = (x, y, heading)
+        cells = self._decompose(along_x)
+        # The lanes of a cell overlap one another, so a cell is reachable as a whole or not at all
+        reachable = self._reachable(cells, x, y, along_x)
+        for cell in self._order([cell for cell in cells if cell[0] in reachable], x, y, along_x):
+            for lane, start, end in cell:
+                entry, exit_ = self._lane_ends(lane, start, end, position, along_x)
+                position = self._connect(program, position, entry)
+                # The lane is an obstacle-free run, so it is swept straight
+                position = self._straight(program, position, exit_)
+                covered += end - start + 1
+
+        route = CleaningRobot.compile_route(''.join(program))
+        free = room_map.width * room_map.height - room_map.count(RoomMap.OBSTACLE)
+        turns = len(route) - route.count(CleaningRobot.FORWARD)
+        return CoveragePlan(route, 100.0 * covered / free,
+                            route.count(CleaningRobot.FORWARD) * self.forward_cost + turns * self.turn_cost)
+
+    def _decompose(self, along_x: bool) -> List[List[Tuple[int, int, int]]]:
+        """
+        Split the free cells into lanes (lane, start, end) and group them into boustrophedon cells:
+        a cell goes on while a lane overlaps exactly one lane of the next row and vice versa
+        """
+        room_map = self.room_map
+        if along_x:
+            lanes = range(room_map.y_min, room_map.y_max + 1)
+            first = room_map.x_min
+        else:
+            lanes = range(room_map.x_min, room_map.x_max + 1)
+            first = room_map.y_min
+
+        cells = []
+        open_cells = []
+        previous = []
+        for lane in lanes:
+            current = [(lane, first + start, first + end) for start, end in self._free_runs(lane, along_x)]
+            above = [[] for _ in current]
+            below = [[] for _ in previous]
+            i = j = 0
+            while i < len(previous) and j < len(current):
+                if previous[i][2] >= current[j][1] and current[j][2] >= previous[i][1]:
+                    below[i].append(j)
+                    above[j].append(i)
+                if previous[i][2] < current[j][2]:
+                    i += 1
+                else:
+                    j += 1
+
+            next_open = []
+            for j, segment in enumerate(current):
+                parent = max(above[j], key=lambda i: self._overlap(previous[i], segment), default=None)
+                if parent is not None and max(below[parent], key=lambda k: self._overlap(previous[parent], current[k])) == j:
+                    cell = open_cells[parent]
+                else:
+                    cell = []
+                    cells.append(cell)
+                cell.append(segment)
+                next_open.append(cell)
+            open_cells = next_open
+            previous = current
+        return cells
+
+    @staticmethod
+    def _reachable(cells: List[List[Tuple[int, int, int]]], x: int, y: int,
+                   along_x: bool) -> Set[Tuple[int, int, int]]:
+        """
+        Flood fill over the lanes: a lane leads to the overlapping lanes of the next and the previous row
+        :return: the lanes the robot can drive to from (x, y)
+        """
+        lanes: Dict[int, List[Tuple[int, int, int]]] = {}
+        for segment in sorted(segment for cell in cells for segment in cell):
+            lanes.setdefault(segment[0], []).append(segment)
+        ends = {lane: [segment[2] for segment in segments] for lane, segments in lanes.items()}
+        along, across = (x, y) if along_x else (y, x)
+        start = lanes[across][bisect_left(ends[across], along)]
+        reachable = {start}
+        stack = [start]
+        while stack:
+            lane, start, end = stack.pop()
+            for other in (lane - 1, lane + 1):
+                segments = lanes.get(other, [])
+                # Lanes of a row are disjoint and in order: the first one ending at or after start on
+                index = bisect_left(ends.get(other, []), start)
+                while index < len(segments) and segments[index][1] <= end:
+                    if segments[index] not in reachable:
+                        reachable.add(segments[index])
+                        stack.append(segments[index])
+                    index += 1
+        return reachable
+
+    @staticmethod
+    def _overlap(lane: Tuple[int, int, int], other: Tuple[int, int, int]) -> int:
+        return min(lane[2], other[2]) - max(lane[1], other[1])
+
+    def _free_runs(self, lane: int, along_x: bool) -> List[Tuple[int, int]]:
+        room_map = self.room_map
+        if along_x:
+            row = (lane - room_map.y_min) * room_map.width
+            cells = bytes(room_map.cells[row:row + room_map.width])
+        else:
+            cells = bytes(room_map.cells[lane - room_map.x_min::room_map.width])
+        runs = []
+        start = 0
+        for piece in cells.split(bytes([RoomMap.OBSTACLE])):
+            if piece:
+                runs.append((start, start + len(piece) - 1))
+            start += len(piece) + 1
+        return runs
+
+    def _order(self, cells: List[List[Tuple[int, int, int]]], x: int, y: int, along_x: bool):
+        """
+        Yield the cells nearest first, each one swept from the end lane closer to the robot.
+        Only the next ORDER_WINDOW cells in sweep order are candidates, which keeps ordering linear.
+        """
+        remaining = list(cells)
+        # The first and last lane of each remaining cell, flattened for the distance loop
+        ends = [(*cell[0], *cell[-1]) for cell in cells]
+        while remaining:
+            along, across = (x, y) if along_x else (y, x)
+            best, index, reverse = None, 0, False
+            for candidate, (lane, start, end, last_lane, last_start, last_end) in enumerate(ends[:self.ORDER_WINDOW]):
+                if best is not None and lane - across > best:
+                    # Cells come in sweep order, so this one and the next ones start even farther
+                    break
+                # Entered from its first lane, or from its last one, in which case it is swept in reverse.
+                # The distance to the nearer end of a lane is branched inline, builtin calls dominate the loop
+                distance = abs(across - lane) + (start - along if along <= start else along - end if along >= end
+                                                 else min(along - start, end - along))
+                if best is None or distance < best:
+                    best, index, reverse = distance, candidate, False
+                distance = abs(across - last_lane) + (last_start - along if along <= last_start
+                                                      else along - last_end if along >= last_end
+                                                      else min(along - last_start, last_end - along))
+                if distance < best:
+                    best, index, reverse = distance, candidate, True
+            ends.pop(index)
+            lanes = remaining.pop(index)
+            if reverse:
+                lanes = lanes[::-1]
+            yield lanes
+            lane, start, end = lanes[-1]
+            x, y = (end, lane) if along_x else (lane, end)
+
+    @staticmethod
+    def _lane_ends(lane: int, start: int, end: int, position: Tuple[int, int, str], along_x: bool):
+        along = position[0] if along_x else position[1]
+        if abs(along - end) < abs(along - start):
+            start, end = end, start
+        if along_x:
+            return (start, lane), (end, lane)
+        return (lane, start), (lane, end)
+
+    def _connect(self, program: List[str], position: Tuple[int, int, str], target: Tuple[int, int]):
+        """
+        Append the commands that take the robot from position to the target cell
+        :return: the position reached
+        """
+        x, y, heading = position
+        target_x, target_y = target
+        if (x, y) == target:
+            return position
+        if x == target_x or y == target_y:
+            if self._clear(x, y, target_x, target_y):
+                return self._straight(program, position, target)
+        for corner in ((target_x, y), (x, target_y)):
+            if self._clear(x, y, *corner) and self._clear(*corner, target_x, target_y):
+                return self._straight(program, self._straight(program, position, corner), target)
+        for corners in (self._z_corners(x, y, target_x, target_y, True),
+                        self._z_corners(x, y, target_x, target_y, False)):
+            if corners is not None:
+                for corner in corners:
+                    position = self._straight(program, position, corner)
+                return self._straight(program, position, target)
+
+        route = self._plan_detour(x, y, heading, target_x, target_y)
+        program.append(route)
+        return (target_x, target_y, CleaningRobot.route_displacement(route, heading)[2])
+
+    def _plan_detour(self, x: int, y: int, heading: str, target_x: int, target_y: int) -> str:
+        """
+        Plan a connection in a window of the map around its ends, widening the window until the path
+        planner finds one, so blocked neighbouring lanes do not each cost a search of the whole map.
+        The route may go round an obstacle the other way than the fastest one, outside the window.
+        """
+        room_map = self.room_map
+        for margin in self.DETOUR_MARGINS:
+            x_min, x_max = max(min(x, target_x) - margin, room_map.x_min), min(max(x, target_x) + margin, room_map.x_max)
+            y_min, y_max = max(min(y, target_y) - margin, room_map.y_min), min(max(y, target_y) + margin, room_map.y_max)
+            if (x_min, x_max, y_min, y_max) == (room_map.x_min, room_map.x_max, room_map.y_min, room_map.y_max):
+                break
+            cells = bytearray()
+            for row in range(y_min, y_max + 1):
+                start = (row - room_map.y_min) * room_map.width + x_min - room_map.x_min
+                cells += room_map.cells[start:start + x_max - x_min + 1]
+            window = RoomMap(x_min, x_max, y_min, y_max, cells)
+            try:
+                return PathPlanner(window, self.forward_cost, self.turn_cost, 2.0).plan(x, y, heading, target_x, target_y)
+            except CleaningRobotError:
+                continue
+        return self.path_planner.plan(x, y, heading, target_x, target_y)
+
+    def _z_corners(self, x: int, y: int, target_x: int, target_y: int, along_x: bool):
+        """
+        Find a detour that runs along the lane of (x, y), crosses to the lane of the target
+        and runs along it, without hitting any obstacle
+        :return: the two corners of the detour, or None if there is none
+        """
+        if along_x:
+            low, high = self._free_run(x, y, True)
+            target_low, target_high = self._free_run(target_x, target_y, True)
+        else:
+            low, high = self._free_run(y, x, False)
+            target_low, target_high = self._free_run(target_y, target_x, False)
+        low, high = max(low, target_low), min(high, target_high)
+        if low > high:
+            return None
+        along, target_along = (x, target_x) if along_x else (y, target_y)
+        first, last = sorted((min(max(along, low), high), min(max(target_along, low), high)))
+        # Crossings between the two cells keep the detour as short as a straight path, the others widen it
+        crossings = list(range(first, last + 1))[:self.DETOUR_CROSSINGS]
+        for offset in range(1, self.DETOUR_CROSSINGS - len(crossings) + 1):
+            crossings.extend(crossing for crossing in (first - offset, last + offset) if low <= crossing <= high)
+        for crossing in crossings:
+            corners = ((crossing, y), (crossing, target_y)) if along_x else ((x, crossing), (target_x, crossing))
+            if self._clear(*corners[0], *corners[1]):
+                return corners
+        return None
+
+    def _free_run(self, along: int, lane: int, along_x: bool) -> Tuple[int, int]:
+        """
+        :return: the first and last cell of the obstacle-free run of the lane containing the given cell
+        """
+        room_map = self.room_map
+        if along_x:
+            row = (lane - room_map.y_min) * room_map.width
+            cells = bytes(room_map.cells[row:row + room_map.width])
+            first = room_map.x_min
+        else:
+            cells = bytes(room_map.cells[lane - room_map.x_min::room_map.width])
+            first = room_map.y_min
+        obstacle = bytes([RoomMap.OBSTACLE])
+        index = along - first
+        high = cells.find(obstacle, index)
+        return first + cells.rfind(obstacle, 0, index) + 1, first + (len(cells) if high < 0 else high) - 1
+
+    def _clear(self, x: int, y: int, target_x: int, target_y: int) -> bool:
+        room_map = self.room_map
+        low = (min(y, target_y) - room_map.y_min) * room_map.width + min(x, target_x) - room_map.x_min
+        high = (max(y, target_y) - room_map.y_min) * room_map.width + max(x, target_x) - room_map.x_min
+        if y == target_y:
+            return room_map.cells.find(RoomMap.OBSTACLE, low, high + 1) < 0
+        return RoomMap.OBSTACLE not in room_map.cells[low:high + 1:room_map.width]
+
+    @staticmethod
+    def _straight(program: List[str], position: Tuple[int, int, str], target: Tuple[int, int]):
+        x, y, heading = position
+        target_x, target_y = target
+        if (x, y) == target:
+            return position
+        if x == target_x:
+            direction = CleaningRobot.N if target_y > y else CleaningRobot.S
+        else:
+            direction = CleaningRobot.E if target_x > x else CleaningRobot.W
+        turns = CleaningRobot.ROTATIONS[heading].index(direction)
+        program.append(CleaningRobot.TURN_PROGRAMS[turns])
+        program.append(CleaningRobot.FORWARD * (abs(target_x - x) + abs(target_y - y)))
+        return target_x, target_y, direction
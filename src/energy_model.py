@@ -0,0 +1,329 @@
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.path_planner import PathPlanner
+
+
+class EnergyPlan(NamedTuple):
+    # The commands to execute: the kept commands of the route, then the return to the dock if it was truncated
+    route: str
+    # The number of commands of the requested route that were kept
+    kept: int
+    dock_route: str
+    # The predicted charge used by route
+    drain: float
+
+
+class EnergyModel:
+    """
+    Battery model learning the charge used per forward move, per rotation and per second of brush time
+    from the IBS readings, by least squares over the actuations between two readings.
+    It can replace the IBS of a CleaningRobot, which it then reads only every max_actuations actuations,
+    every max_age seconds, when the predicted charge nears the low battery level or when the drain of
+    an actuation since the last reading is not known yet, serving the prediction otherwise:
+    model.attach(robot)
+    A drain is known once it has a non-zero prior or has been fitted to min_samples readings.
+    Brush time counts the actuations and the cleaning system switches made with the brushes on,
+    as well as the time the robot stands still with them on.
+    """
+
+    LOW_BATTERY = 10
+
+    def __init__(self, forward: float = 0.0, rotation: float = 0.0, brush: float = 0.0, margin: float = 2.0,
+                 max_actuations: int = 20, prior_weight: float = 1.0, max_age: float = 30.0, min_samples: int = 3,
+                 clock: Optional[Callable[[], float]] = None):
+        """
+        :param forward: the prior charge used by a forward move, without the brushes
+        :param rotation: the prior charge used by a rotation, without the brushes
+        :param brush: the prior charge used by a second of brush time
+        :param margin: the charge kept above the low battery level by the predictions and the plans
+        :param max_actuations: the number of actuations after which the IBS is read again
+        :param prior_weight: how many readings the priors are worth against the learned drains
+        :param max_age: the seconds after which the IBS is read again
+        :param min_samples: the number of readings a drain without a prior is fitted to before it is trusted
+        :param clock: the source of time, the clock of the robot when attached if it has one, time.monotonic otherwise
+        """
+        self.forward = forward
+        self.rotation = rotation
+        self.brush = brush
+        self.margin = margin
+        self.max_actuations = max_actuations
+        self.max_age = max_age
+        self.min_samples = min_samples
+        self.clock = clock
+        self.ibs = None
+        self.robot = None
+
+        self.reads = 0
+        self.predictions = 0
+
+        self._charge = None
+        # Forward moves, rotations and brush seconds since the last reading
+        self._counts = [0, 0, 0.0]
+        # Readings each drain was fitted to, priors counting as enough
+        self._samples = [min_samples if prior > 0 else 0 for prior in (forward, rotation, brush)]
+        self._read_at = None
+        # Time up to which the brush time is accounted for, and actuation seconds accounted for beyond it
+        self._mark = None
+        self._busy = 0.0
+        # Normal equations of the least squares fit, regularized towards the priors
+        self._xtx = [[prior_weight if row == column else 0.0 for column in range(3)] for row in range(3)]
+        self._xty = [prior_weight * forward, prior_weight * rotation, prior_weight * brush]
+
+    def attach(self, robot: CleaningRobot) -> None:
+        self.ibs = robot.ibs
+        self.robot = robot
+        if self.clock is None:
+            self.clock = robot.clock if robot.clock is not None else time.monotonic
+        self._mark = self.clock()
+        robot.ibs = self
+        robot.energy_model = self
+
+    def actuated(self, load: str, seconds: float, cleaning: bool, count: bool = True) -> None:
+        """
+        Account for an actuation of the robot
+        :param load: the actuator, CleaningRobot.WHEEL_MOTOR, ROTATION_MOTOR or CLEANING_SYSTEM
+        :param cleaning: whether the brushes were running meanwhile
+        :param count: False for the extra time of a move already accounted for, e.g., a speed ramp,
+        whose motor drain is learned as part of the drain per move
+        """
+        self._account_idle()
+        self._busy += seconds
+        if count and load == CleaningRobot.WHEEL_MOTOR:
+            self._counts[0] += 1
+        elif count and load == CleaningRobot.ROTATION_MOTOR:
+            self._counts[1] += 1
+        if cleaning or load == CleaningRobot.CLEANING_SYSTEM:
+            self._counts[2] += seconds
+
+    def get_charge_left(self):
+        """
+        Returns the charge left, predicted unless the IBS has to be read again.
+        :return: the charge left (i.e., a percentage value from 0 to 100)
+        """
+        self._account_idle()
+        if (self._charge is None or self._counts[0] + self._counts[1] >= self.max_actuations
+                or not self._known() or self._read_at is None or self.clock() - self._read_at >= self.max_age
+                or self.predicted_charge() <= self.LOW_BATTERY + self.margin):
+            return self.refresh()
+        self.predictions += 1
+        return self.predicted_charge()
+
+    def _known(self) -> bool:
+        """
+        :return: whether the drain of every kind of actuation since the last reading is known
+        """
+        return all(not count or samples >= self.min_samples for count, samples in zip(self._counts, self._samples))
+
+    def _account_idle(self) -> None:
+        """
+        Count the time elapsed since the last accounting beyond the actuations as brush time, if the brushes are on
+        """
+        if self.robot is None:
+            return
+        now = self.clock()
+        idle = now - self._mark - self._busy
+        if idle > 0 and self.robot.cleaning_system_on:
+            self._counts[2] += idle
+        self._mark = now
+        self._busy = max(0.0, -idle)
+
+    def refresh(self):
+        """
+        Read the IBS, learning from the charge used since the previous reading
+        """
+        charge = self.ibs.get_charge_left()
+        self.reads += 1
+        if self.clock is not None:
+            self._read_at = self.clock()
+        if self._charge is not None and charge <= self._charge:  # The battery was not recharged meanwhile
+            self.learn(*self._counts, self._charge - charge)
+        self._charge = charge
+        self._counts = [0, 0, 0.0]
+        return charge
+
+    def learn(self, forwards: int, rotations: int, brush_seconds: float, drain: float) -> None:
+        """
+        Fit the drains to one more observation of the charge used by some actuations
+        """
+        sample = (forwards, rotations, brush_seconds)
+        if not any(sample):
+            return
+        for index, value in enumerate(sample):
+            if value:
+                self._samples[index] += 1
+        for row in range(3):
+            for column in range(3):
+                self._xtx[row][column] += sample[row] * sample[column]
+            self._xty[row] += sample[row] * drain
+        self.forward, self.rotation, self.brush = (max(0.0, value) for value in _solve(self._xtx, self._xty))
+
+    def predicted_charge(self) -> float:
+        if self._charge is None:
+            raise CleaningRobotError("The battery has not been read yet.")
+        return self._charge - self.drain(*self._counts)
+
+    def drain(self, forwards: int, rotations: int, brush_seconds: float) -> float:
+        return forwards * self.forward + rotations * self.rotation + brush_seconds * self.brush
+
+    def route_drain(self, route: str, cleaning: bool = True) -> float:
+        """
+        :return: the predicted charge used by a route, with each command taking its actuation time
+        """
+        forwards = route.count(CleaningRobot.FORWARD)
+        rotations = len(route) - forwards
+        forward_time, rotation_time = self._actuation_times()
+        seconds = forwards * forward_time + rotations * rotation_time
+        return self.drain(forwards, rotations, seconds if cleaning else 0.0)
+
+    def command_budget(self, charge: Optional[float] = None, cleaning: bool = True) -> int:
+        """
+        :param charge: the charge left, the predicted one by default
+        :return: the number of forward moves the robot can still make while staying above the margin
+        """
+        if charge is None:
+            charge = self._current_charge()
+        cost = self.route_drain(CleaningRobot.FORWARD, cleaning)
+        available = charge - self.LOW_BATTERY - self.margin
+        if available <= 0:
+            return 0
+        if cost <= 0:
+            raise CleaningRobotError("The drain of a forward move is unknown.")
+        return int(available // cost)
+
+    def fits(self, route: str, charge: Optional[float] = None) -> bool:
+        if charge is None:
+            charge = self._current_charge()
+        return self.route_drain(route) <= charge - self.LOW_BATTERY - self.margin
+
+    def plan_route(self, robot: CleaningRobot, route: str, dock: Tuple[int, int] = (0, 0)) -> EnergyPlan:
+        """
+        Check a route against the charge left. If the robot could not get back to the dock after it,
+        keep the longest part of the route after which it can, followed by the route to the dock.
+        The route to the dock avoids the obstacles of robot.room_map, if any.
+        """
+        if any(command not in CleaningRobot.VALID_COMMANDS for command in route):
+            raise CleaningRobotError("Invalid command received.")
+        available = self._current_charge() - self.LOW_BATTERY - self.margin
+        x, y, heading = robot.pos_x, robot.pos_y, robot.heading
+        costs = {command: self.route_drain(command) for command in CleaningRobot.VALID_COMMANDS}
+
+        # Prefixes after which an obstacle-free return to the dock would fit: (length, x, y, heading, drain)
+        candidates: List[Tuple[int, int, int, str, float]] = []
+        used = 0.0
+        if self._dock_estimate(x, y, heading, dock) <= available:
+            candidates.append((0, x, y, heading, used))
+        for index, command in enumerate(route):
+            used += costs[command]
+            if used > available:
+                break
+            if command == CleaningRobot.FORWARD:
+                dx, dy = CleaningRobot.DELTAS[heading]
+                x += dx
+                y += dy
+            else:
+                heading = CleaningRobot.ROTATIONS[heading][1 if command == CleaningRobot.RIGHT else 3]
+            if used + self._dock_estimate(x, y, heading, dock) <= available:
+                candidates.append((index + 1, x, y, heading, used))
+
+        # The estimate ignores the obstacles: the actual route back to the dock decides, the whole route included
+        for kept, x, y, heading, used in reversed(candidates):
+            dock_route = self._dock_route(robot, x, y, heading, dock)
+            if dock_route is None:
+                continue
+            drain = used + self.route_drain(dock_route)
+            if drain > available:
+                continue
+            if kept == len(route):
+                return EnergyPlan(route, kept, '', used)
+            return EnergyPlan(route[:kept] + dock_route, kept, dock_route, drain)
+        raise CleaningRobotError("Not enough charge left to get back to the dock.")
+
+    def _current_charge(self) -> float:
+        return self.refresh() if self._charge is None else self.predicted_charge()
+
+    def _dock_estimate(self, x: int, y: int, heading: str, dock: Tuple[int, int]) -> float:
+        forwards = abs(dock[0] - x) + abs(dock[1] - y)
+        turns = _l_turns(x, y, heading, *dock)
+        forward_time, rotation_time = self._actuation_times()
+        return self.drain(forwards, turns, forwards * forward_time + turns * rotation_time)
+
+    def _actuation_times(self) -> Tuple[float, float]:
+        """
+        :return: the seconds a forward move and a rotation take, for the attached robot if any
+        """
+        if self.robot is None:
+            return CleaningRobot.WHEEL_MOVE_TIME, CleaningRobot.ROTATION_TIME
+        return self.robot.actuation_time(CleaningRobot.FORWARD), self.robot.actuation_time(CleaningRobot.RIGHT)
+
+    @staticmethod
+    def _dock_route(robot: CleaningRobot, x: int, y: int, heading: str, dock: Tuple[int, int]) -> Optional[str]:
+        if robot.room_map is None:
+            return _l_route(x, y, heading, *dock)
+        try:
+            return PathPlanner.for_robot(robot).plan(x, y, heading, *dock)
+        except CleaningRobotError:
+            return None
+
+
+def _leg(heading: str, direction: str) -> str:
+    return CleaningRobot.TURN_PROGRAMS[CleaningRobot.ROTATIONS[heading].index(direction)]
+
+
+def _l_legs(x: int, y: int, target_x: int, target_y: int) -> List[Tuple[str, int]]:
+    east_west = CleaningRobot.E if target_x > x else CleaningRobot.W
+    north_south = CleaningRobot.N if target_y > y else CleaningRobot.S
+    return [(east_west, abs(target_x - x)), (north_south, abs(target_y - y))]
+
+
+def _l_route(x: int, y: int, heading: str, target_x: int, target_y: int) -> str:
+    """
+    :return: the route along x then along y, or along y then along x, with fewer turns
+    """
+    best = None
+    for legs in (_l_legs(x, y, target_x, target_y), _l_legs(x, y, target_x, target_y)[::-1]):
+        program = []
+        current = heading
+        for direction, cells in legs:
+            if cells:
+                program.append(_leg(current, direction) + CleaningRobot.FORWARD * cells)
+                current = direction
+        route = ''.join(program)
+        if best is None or len(route) < len(best):
+            best = route
+    return best
+
+
+def _l_turns(x: int, y: int, heading: str, target_x: int, target_y: int) -> int:
+    best = None
+    for legs in (_l_legs(x, y, target_x, target_y), _l_legs(x, y, target_x, target_y)[::-1]):
+        turns = 0
+        current = heading
+        for direction, cells in legs:
+            if cells:
+                turns += len(_leg(current, direction))
+                current = direction
+        best = turns if best is None else min(best, turns)
+    return best
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """
+    Solve a small linear system by Gaussian elimination with partial pivoting
+    """
+    size = len(vector)
+    rows = [list(matrix[row]) + [vector[row]] for row in range(size)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(rows[row][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        if rows[column][column] == 0:
+            raise CleaningRobotError("The energy model cannot be fitted.")
+        for row in range(column + 1, size):
+            factor = rows[row][column] / rows[column][column]
+            for k in range(column, size + 1):
+                rows[row][k] -= factor * rows[column][k]
+    solution = [0.0] * size
+    for row in reversed(range(size)):
+        solution[row] = (rows[row][size] - sum(rows[row][k] * solution[k] for k in range(row + 1, size))) / rows[row][row]
+    return solution
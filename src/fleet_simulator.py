@@ -0,0 +1,141 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+
+class FleetSimulator:
+    """
+    Struct-of-arrays simulator stepping N robots in lockstep with the semantics of
+    CleaningRobot.execute_command: positions, headings, batteries, borders and obstacle
+    maps are NumPy arrays and each step executes one command code per robot.
+    """
+
+    # Command codes, the indices of CleaningRobot.VALID_COMMANDS
+    LEFT = CleaningRobot.VALID_COMMANDS.index(CleaningRobot.LEFT)
+    RIGHT = CleaningRobot.VALID_COMMANDS.index(CleaningRobot.RIGHT)
+    FORWARD = CleaningRobot.VALID_COMMANDS.index(CleaningRobot.FORWARD)
+
+    # Cell offset of a forward move for each heading index of CleaningRobot.VALID_HEADINGS
+    DX = np.array([CleaningRobot.DELTAS[heading][0] for heading in CleaningRobot.VALID_HEADINGS], dtype=np.int32)
+    DY = np.array([CleaningRobot.DELTAS[heading][1] for heading in CleaningRobot.VALID_HEADINGS], dtype=np.int32)
+
+    LOW_BATTERY_LEVEL = 10
+
+    _CODES = np.full(256, -1, dtype=np.int8)
+    for _code, _command in enumerate(CleaningRobot.VALID_COMMANDS):
+        _CODES[ord(_command)] = _code
+    del _code, _command
+
+    def __init__(self, robots: int, borders: Sequence[int] = (0, 9, 0, 9), battery=100,
+                 obstacles: Optional[np.ndarray] = None, origin: Sequence[int] = (0, 0),
+                 forward_drain: float = 0, turn_drain: float = 0):
+        """
+        :param robots: the number of robots
+        :param borders: x_min, x_max, y_min, y_max shared by all robots, or an array of shape (robots, 4)
+        :param battery: the initial charge left, a scalar or an array of shape (robots,)
+        :param obstacles: a boolean grid of shape (height, width) shared by all robots,
+        or of shape (robots, height, width); cells outside the grid are free
+        :param origin: the x and y coordinates of the first cell of the obstacle grid
+        :param forward_drain: the charge used by each wheel motor activation
+        :param turn_drain: the charge used by each rotation motor activation
+        """
+        self.robots = robots
+        self.pos_x = np.zeros(robots, dtype=np.int32)
+        self.pos_y = np.zeros(robots, dtype=np.int32)
+        self.heading = np.zeros(robots, dtype=np.int8)
+        self.battery = np.broadcast_to(np.asarray(battery, dtype=np.float64), (robots,)).copy()
+        self.borders = np.broadcast_to(np.asarray(borders, dtype=np.int32), (robots, 4)).copy()
+        self.obstacles = None if obstacles is None else np.asarray(obstacles, dtype=bool)
+        if self.obstacles is not None and self.obstacles.ndim not in (2, 3):
+            raise CleaningRobotError("Invalid obstacle map.")
+        self.origin = tuple(origin)
+        self.forward_drain = forward_drain
+        self.turn_drain = turn_drain
+
+        # Outcome of the last step of each robot
+        self.low_battery = np.zeros(robots, dtype=bool)
+        self.blocked = np.zeros(robots, dtype=bool)
+        self.obstacle_x = np.zeros(robots, dtype=np.int32)
+        self.obstacle_y = np.zeros(robots, dtype=np.int32)
+
+    @classmethod
+    def encode(cls, routes: Sequence[str]) -> np.ndarray:
+        """
+        Turn one route per robot, all of the same length, into a (steps, robots) matrix of command codes
+        """
+        if len({len(route) for route in routes}) > 1:
+            raise CleaningRobotError("Routes must have the same length.")
+        raw = np.frombuffer(''.join(routes).encode('ascii', 'replace'), dtype=np.uint8)
+        codes = cls._CODES[raw]
+        if (codes < 0).any():
+            raise CleaningRobotError("Invalid command received.")
+        return codes.reshape(len(routes), -1).T.copy()
+
+    def step(self, commands: np.ndarray) -> None:
+        """
+        Execute one command code per robot
+        """
+        commands = np.asarray(commands)
+        x_min, x_max, y_min, y_max = self.borders.T
+        self.low_battery = self.battery <= self.LOW_BATTERY_LEVEL
+        inside = (x_min <= self.pos_x) & (self.pos_x <= x_max) & (y_min <= self.pos_y) & (self.pos_y <= y_max)
+        active = ~self.low_battery & inside
+        forward = active & (commands == self.FORWARD)
+        turn = active & (commands != self.FORWARD)
+
+        rotation = np.where(commands == self.RIGHT, 1, -1)
+        self.heading = np.where(turn, (self.heading + rotation) % 4, self.heading).astype(np.int8)
+
+        target_x = self.pos_x + self.DX[self.heading]
+        target_y = self.pos_y + self.DY[self.heading]
+        self.blocked = forward & self._obstacle_at(target_x, target_y)
+        move = forward & ~self.blocked
+        self.pos_x = np.where(move, target_x, self.pos_x)
+        self.pos_y = np.where(move, target_y, self.pos_y)
+        self.obstacle_x = target_x
+        self.obstacle_y = target_y
+        self.battery -= forward * self.forward_drain + turn * self.turn_drain
+
+    def run(self, routes: np.ndarray) -> None:
+        """
+        Execute a (steps, robots) matrix of command codes, one row per step
+        """
+        for commands in routes:
+            self.step(commands)
+
+    def out_of_bounds(self) -> np.ndarray:
+        x_min, x_max, y_min, y_max = self.borders.T
+        return ~((x_min <= self.pos_x) & (self.pos_x <= x_max) & (y_min <= self.pos_y) & (self.pos_y <= y_max))
+
+    def status(self, robot: int) -> str:
+        """
+        :return: the string execute_command would have returned for the last step of a robot
+        """
+        heading = CleaningRobot.VALID_HEADINGS[self.heading[robot]]
+        string = f'({self.pos_x[robot]},{self.pos_y[robot]},{heading})'
+        x_min, x_max, y_min, y_max = self.borders[robot]
+        if not (x_min <= self.pos_x[robot] <= x_max and y_min <= self.pos_y[robot] <= y_max):
+            string = f'O{string}'
+        if self.low_battery[robot]:
+            return f'!{string}'
+        if self.blocked[robot]:
+            return f'{string}({self.obstacle_x[robot]},{self.obstacle_y[robot]})'
+        return string
+
+    def statuses(self) -> List[str]:
+        return [self.status(robot) for robot in range(self.robots)]
+
+    def _obstacle_at(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        if self.obstacles is None:
+            return np.zeros(self.robots, dtype=bool)
+        height, width = self.obstacles.shape[-2:]
+        column = x - self.origin[0]
+        row = y - self.origin[1]
+        inside = (0 <= column) & (column < width) & (0 <= row) & (row < height)
+        column = np.clip(column, 0, width - 1)
+        row = np.clip(row, 0, height - 1)
+        if self.obstacles.ndim == 2:
+            return inside & self.obstacles[row, column]
+        return inside & self.obstacles[np.arange(self.robots), row, column]
@@ -0,0 +1,333 @@
+"""
+Mission journal: an append-only file of fixed-width binary records telling everything a robot did,
+i.e., the commands, battery readings, infrared readings, GPIO writes and resulting statuses.
+A journal can be replayed on a simulated robot to reconstruct a mission.
+"""
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from mock.backend import SimulatedBackend
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.virtual_clock import VirtualClock
+
+# Record kinds
+POSITION = 1
+BORDERS = 2
+COMMAND = 3
+CLEANING_SYSTEM = 4
+BATTERY = 5
+INFRARED = 6
+GPIO_WRITE = 7
+STATUS = 8
+
+
+class JournalRecord(NamedTuple):
+    """
+    A journal record. The meaning of the fields depends on the kind:
+    POSITION: x, y and code (the heading), flag is 0 if the robot was not initialized yet;
+    BORDERS: x_min, x_max, y_min, y_max in x, y, a, b;
+    COMMAND: code (the command); CLEANING_SYSTEM: no field;
+    BATTERY: reading (the charge left); INFRARED: flag (1 if an obstacle was found);
+    GPIO_WRITE: code (the pin) and flag (the level);
+    STATUS: x, y and code (the heading) after a command, flag (the stop reason, 0 for none)
+    and a, b (the blocked cell, if an obstacle stopped the command)
+    Characters are stored as their code points.
+    """
+    time: float
+    kind: int
+    code: int
+    flag: int
+    reading: float
+    x: int
+    y: int
+    a: int
+    b: int
+
+
+# Magic number and record size, followed by the records
+HEADER = struct.Struct('<4sI')
+MAGIC = b'CRJ1'
+RECORD = struct.Struct('<dBBhdiiii')
+
+
+class Journal:
+    """
+    Writer of a mission journal. Records are packed into an in-memory buffer, which is handed to
+    a writer thread once full, so the robot never waits on the file: journal.attach(robot)
+    Records must be written from a single thread, the one driving the robot.
+    """
+
+    def __init__(self, path: str, clock: Optional[Callable[[], float]] = None, buffer_size: int = 1 << 16):
+        """
+        :param path: the journal file, appended to if it exists
+        :param clock: the source of the record timestamps, the clock of the robot when attached if it
+        has one, time.monotonic otherwise, so the timestamps never decrease
+        :param buffer_size: the number of bytes buffered before they are handed to the writer thread
+        """
+        self.clock = clock
+        self.buffer_size = buffer_size
+        self.records = 0
+        self._buffer = bytearray()
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(HEADER.pack(MAGIC, RECORD.size))
+        self._chunks = queue.Queue()
+        self._writer = threading.Thread(target=self._write_chunks, daemon=True)
+        self._writer.start()
+
+    def attach(self, robot: CleaningRobot) -> None:
+        """
+        Start journaling a robot, recording its current position and borders first
+        """
+        robot.gpio = JournalGPIO(robot.gpio, self)
+        robot.ibs = JournalIBS(robot.ibs, self)
+        robot.journal = self
+        if self.clock is None:
+            self.clock = robot.clock if robot.clock is not None else time.monotonic
+        self.position(robot)
+        self.borders(robot)
+
+    def position(self, robot: CleaningRobot) -> None:
+        if robot.heading is None:
+            self._append(POSITION, 0, 0, 0.0, 0, 0, 0, 0)
+        else:
+            self._append(POSITION, ord(robot.heading), 1, 0.0, robot.pos_x, robot.pos_y, 0, 0)
+
+    def borders(self, robot: CleaningRobot) -> None:
+        self._append(BORDERS, 0, 0, 0.0, *robot.borders)
+
+    def command(self, command: str) -> None:
+        self._append(COMMAND, ord(command), 0, 0.0, 0, 0, 0, 0)
+
+    def cleaning_system(self) -> None:
+        self._append(CLEANING_SYSTEM, 0, 0, 0.0, 0, 0, 0, 0)
+
+    def battery(self, charge: float) -> None:
+        self._append(BATTERY, 0, 0, charge, 0, 0, 0, 0)
+
+    def infrared(self, obstacle: bool) -> None:
+        self._append(INFRARED, 0, 1 if obstacle else 0, 0.0, 0, 0, 0, 0)
+
+    def gpio_write(self, channel: int, value) -> None:
+        self._append(GPIO_WRITE, channel, 1 if value else 0, 0.0, 0, 0, 0, 0)
+
+    def status(self, robot: CleaningRobot, stop: Optional[str], obstacle) -> None:
+        a, b = obstacle if obstacle is not None else (0, 0)
+        self._append(STATUS, ord(robot.heading), ord(stop) if stop is not None else 0, 0.0,
+                     robot.pos_x, robot.pos_y, a, b)
+
+    def flush(self) -> None:
+        """
+        Write the buffered records to the file, waiting for the writer thread to be done
+        """
+        self._hand_off()
+        self._chunks.join()
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._chunks.put(None)
+        self._writer.join()
+        self._file.close()
+
+    def _append(self, kind: int, code: int, flag: int, reading: float, x: int, y: int, a: int, b: int) -> None:
+        self._buffer += RECORD.pack(self.clock(), kind, code, flag, reading, x, y, a, b)
+        self.records += 1
+        if len(self._buffer) >= self.buffer_size:
+            self._hand_off()
+
+    def _hand_off(self) -> None:
+        if self._buffer:
+            self._chunks.put(self._buffer)
+            self._buffer = bytearray()
+
+    def _write_chunks(self) -> None:
+        while True:
+            chunk = self._chunks.get()
+            try:
+                if chunk is None:
+                    return
+                self._file.write(chunk)
+            finally:
+                self._chunks.task_done()
+
+
+class JournalGPIO:
+    """
+    GPIO layer recording every write to a journal, forwarding everything else to the wrapped GPIO
+    """
+
+    def __init__(self, gpio, journal: Journal):
+        self.gpio = gpio
+        self.journal = journal
+
+    def __getattr__(self, name):
+        return getattr(self.gpio, name)
+
+    def output(self, channel, value) -> None:
+        if isinstance(channel, (list, tuple)):
+            values = value if isinstance(value, (list, tuple)) else [value] * len(channel)
+            for ch, val in zip(channel, values):
+                self.journal.gpio_write(ch, val)
+        else:
+            self.journal.gpio_write(channel, value)
+        self.gpio.output(channel, value)
+
+
+class JournalIBS:
+    """
+    IBS layer recording every battery reading to a journal
+    """
+
+    def __init__(self, ibs, journal: Journal):
+        self.ibs = ibs
+        self.journal = journal
+
+    def __getattr__(self, name):
+        return getattr(self.ibs, name)
+
+    def get_charge_left(self):
+        charge = self.ibs.get_charge_left()
+        self.journal.battery(charge)
+        return charge
+
+
+class JournalReader:
+    """
+    Memory-mapped view of a journal file; a record that was only partially written is ignored
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise CleaningRobotError("Not a journal file.")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or size != RECORD.size:
+            self._mmap.close()
+            raise CleaningRobotError("Not a journal file.")
+        self.records = (len(self._mmap) - HEADER.size) // RECORD.size
+        self._data = memoryview(self._mmap)[HEADER.size:HEADER.size + self.records * RECORD.size]
+
+    def __len__(self) -> int:
+        return self.records
+
+    def __getitem__(self, index: int) -> JournalRecord:
+        if not 0 <= index < self.records:
+            raise IndexError("Journal record out of range.")
+        return JournalRecord(*RECORD.unpack_from(self._data, index * RECORD.size))
+
+    def __iter__(self) -> Iterator[JournalRecord]:
+        for fields in RECORD.iter_unpack(self._data):
+            yield JournalRecord(*fields)
+
+    def find_time(self, timestamp: float) -> int:
+        """
+        Binary search the records, whose timestamps never decrease
+        :return: the index of the first record written at or after the timestamp
+        """
+        return bisect_left(self, timestamp, key=lambda record: record.time)
+
+    def between(self, start: float, end: float) -> Iterator[JournalRecord]:
+        """
+        Yield the records written from start (included) to end (excluded)
+        """
+        for index in range(self.find_time(start), self.records):
+            record = self[index]
+            if record.time >= end:
+                return
+            yield record
+
+    def visits(self, x: int, y: int) -> List[JournalRecord]:
+        """
+        :return: the STATUS records of the commands that left the robot at (x, y)
+        """
+        return [record for record in self if record.kind == STATUS and record.x == x and record.y == y]
+
+    def close(self) -> None:
+        self._data.release()
+        self._mmap.close()
+
+
+class ReplayResult(NamedTuple):
+    robot: CleaningRobot
+    commands: int
+    # Indices of the STATUS records the replayed robot disagreed with
+    mismatches: List[int]
+
+
+class _ReplayIBS:
+    def __init__(self, readings: deque):
+        self.readings = readings
+
+    def get_charge_left(self):
+        if not self.readings:
+            raise CleaningRobotError("The journal has no more battery readings.")
+        return self.readings.popleft()
+
+
+class _ReplayInfrared:
+    def __init__(self, readings: deque):
+        self.readings = readings
+
+    @property
+    def obstacle(self) -> bool:
+        if not self.readings:
+            raise CleaningRobotError("The journal has no more infrared readings.")
+        return self.readings.popleft()
+
+
+def replay(path: str) -> ReplayResult:
+    """
+    Re-drive a simulated robot with the commands of a journal, feeding it the recorded battery and
+    infrared readings in order, with no actuation delay. Each recorded status, i.e., the position, the
+    heading, the stop reason and the blocked cell, is checked against the replayed robot, so a mismatch tells where the robot did something its commands cannot explain.
+    """
+    reader = JournalReader(path)
+    try:
+        batteries = deque()
+        infrareds = deque()
+        # Plain tuples rather than JournalRecords, replaying is all about the speed of these two loops
+        for _, kind, _, flag, reading, _, _, _, _ in RECORD.iter_unpack(reader._data):
+            if kind == BATTERY:
+                batteries.append(reading)
+            elif kind == INFRARED:
+                infrareds.append(flag == 1)
+
+        robot = CleaningRobot(SimulatedBackend())
+        robot.ibs = _ReplayIBS(batteries)
+        robot.obstacle_sensor = _ReplayInfrared(infrareds)
+        robot.clock = VirtualClock()
+        commands = 0
+        mismatches = []
+        for index, (_, kind, code, flag, _, x, y, a, b) in enumerate(RECORD.iter_unpack(reader._data)):
+            if kind == COMMAND:
+                robot.execute_step(chr(code))
+                commands += 1
+            elif kind == STATUS:
+                stop = ord(robot.last_stop) if robot.last_stop is not None else 0
+                obstacle = (a, b) if flag == ord(CleaningRobot.OBSTACLE) else None
+                if (robot.pos_x != x or robot.pos_y != y or robot.heading != chr(code) or stop != flag
+                        or robot.last_obstacle != obstacle):
+                    mismatches.append(index)
+            elif kind == CLEANING_SYSTEM:
+                robot.manage_cleaning_system()
+            elif kind == POSITION:
+                if flag:
+                    robot.pos_x, robot.pos_y, robot.heading = x, y, chr(code)
+                else:
+                    robot.pos_x = robot.pos_y = robot.heading = None
+            elif kind == BORDERS:
+                robot.set_borders(x, y, a, b)
+        return ReplayResult(robot, commands, mismatches)
+    finally:
+        reader.close()
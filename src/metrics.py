@@ -0,0 +1,215 @@
+"""
+Instrumentation of a CleaningRobot, exported in the Prometheus text format.
+A robot without metrics pays a single attribute check per instrumented call.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.cleaning_robot import CleaningRobot
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+WRITE_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+class Histogram:
+    """
+    Prometheus histogram: the number of observations per bucket, their sum and their count
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        """
+        :param labels: the labels of the histogram, e.g., 'robot="r1",' with its trailing comma
+        """
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {self.count}')
+        labels = labels.rstrip(',')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class RobotMetrics:
+    """
+    Command latencies, motor on-time, IBS read latencies, GPIO writes per command and stop counts
+    of a robot: metrics.attach(robot)
+    """
+
+    def __init__(self, robot_id: Optional[str] = None, clock: Callable[[], float] = time.perf_counter):
+        """
+        :param robot_id: the value of the robot label of every sample, no label if None
+        :param clock: the source of the durations, e.g., the VirtualClock of a simulated robot
+        """
+        self.robot_id = robot_id
+        self.clock = clock
+        self.command_latency = {command: Histogram(LATENCY_BUCKETS) for command in CleaningRobot.VALID_COMMANDS}
+        self.ibs_latency = Histogram(LATENCY_BUCKETS)
+        self.gpio_writes = Histogram(WRITE_BUCKETS)
+        self.gpio_writes_total = 0
+        self.motor_on_time = {CleaningRobot.WHEEL_MOTOR: 0.0, CleaningRobot.ROTATION_MOTOR: 0.0}
+        self.stops = {CleaningRobot.LOW_BATTERY: 0, CleaningRobot.OUT_OF_BOUNDS: 0, CleaningRobot.OBSTACLE: 0}
+
+        self._command = None
+        self._command_started_at = 0.0
+        self._writes_at_start = 0
+        self._motors_started_at: Dict[str, float] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def attach(self, robot: CleaningRobot) -> None:
+        """
+        Start instrumenting a robot, wrapping its GPIO and IBS to count the writes and time the reads
+        """
+        robot.gpio = MetricsGPIO(robot.gpio, self)
+        robot.ibs = MetricsIBS(robot.ibs, self)
+        robot.metrics = self
+
+    def command_started(self, command: str) -> None:
+        self._command = command
+        self._writes_at_start = self.gpio_writes_total
+        self._command_started_at = self.clock()
+
+    def command_finished(self, stop: Optional[str]) -> None:
+        if self._command is None:
+            return
+        self.command_latency[self._command].observe(self.clock() - self._command_started_at)
+        self.gpio_writes.observe(self.gpio_writes_total - self._writes_at_start)
+        if stop is not None:
+            self.stops[stop] += 1
+        self._command = None
+
+    def motor_started(self, motor: str) -> None:
+        self._motors_started_at[motor] = self.clock()
+
+    def motor_stopped(self, motor: str) -> None:
+        started_at = self._motors_started_at.pop(motor, None)
+        if started_at is not None:
+            self.motor_on_time[motor] += self.clock() - started_at
+
+    def render(self) -> str:
+        """
+        :return: the metrics in the Prometheus text exposition format
+        """
+        robot = f'robot="{self.robot_id}",' if self.robot_id is not None else ''
+        lines = ['# HELP cleaning_robot_command_duration_seconds Time to execute a command.',
+                 '# TYPE cleaning_robot_command_duration_seconds histogram']
+        for command, histogram in self.command_latency.items():
+            lines += histogram.render('cleaning_robot_command_duration_seconds', f'{robot}command="{command}",')
+
+        lines += ['# HELP cleaning_robot_motor_on_seconds_total Time each motor has been driven.',
+                  '# TYPE cleaning_robot_motor_on_seconds_total counter']
+        for motor, seconds in self.motor_on_time.items():
+            lines.append(f'cleaning_robot_motor_on_seconds_total{{{robot}motor="{motor}"}} {seconds}')
+
+        lines += ['# HELP cleaning_robot_ibs_read_duration_seconds Time to read the charge left from the IBS.',
+                  '# TYPE cleaning_robot_ibs_read_duration_seconds histogram']
+        lines += self.ibs_latency.render('cleaning_robot_ibs_read_duration_seconds', robot)
+
+        lines += ['# HELP cleaning_robot_gpio_writes_per_command GPIO writes issued while executing a command.',
+                  '# TYPE cleaning_robot_gpio_writes_per_command histogram']
+        lines += self.gpio_writes.render('cleaning_robot_gpio_writes_per_command', robot)
+        lines += ['# HELP cleaning_robot_gpio_writes_total GPIO writes issued.',
+                  '# TYPE cleaning_robot_gpio_writes_total counter',
+                  f'cleaning_robot_gpio_writes_total{{{robot.rstrip(",")}}} {self.gpio_writes_total}']
+
+        lines += ['# HELP cleaning_robot_stops_total Commands stopped by a low battery, the borders or an obstacle.',
+                  '# TYPE cleaning_robot_stops_total counter']
+        for reason, name in ((CleaningRobot.LOW_BATTERY, 'low_battery'), (CleaningRobot.OUT_OF_BOUNDS, 'out_of_bounds'),
+                             (CleaningRobot.OBSTACLE, 'obstacle')):
+            lines.append(f'cleaning_robot_stops_total{{{robot}reason="{name}"}} {self.stops[reason]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str) -> None:
+        """
+        Atomically write the metrics to a file, e.g., for the textfile collector of the node exporter
+        """
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as file:
+            file.write(self.render())
+        os.replace(temporary, path)
+
+    def start_http_server(self, host: str = '127.0.0.1', port: int = 0) -> Tuple[str, int]:
+        """
+        Serve the metrics over HTTP from a background thread
+        :return: the address the server listens on
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[:2]
+
+    def stop_http_server(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+
+class MetricsGPIO:
+    """
+    GPIO layer counting the writes, forwarding everything else to the wrapped GPIO
+    """
+
+    def __init__(self, gpio, metrics: RobotMetrics):
+        self.gpio = gpio
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.gpio, name)
+
+    def output(self, channel, value) -> None:
+        self.metrics.gpio_writes_total += len(channel) if isinstance(channel, (list, tuple)) else 1
+        self.gpio.output(channel, value)
+
+
+class MetricsIBS:
+    """
+    IBS layer timing the battery readings
+    """
+
+    def __init__(self, ibs, metrics: RobotMetrics):
+        self.ibs = ibs
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.ibs, name)
+
+    def get_charge_left(self):
+        started_at = self.metrics.clock()
+        charge = self.ibs.get_charge_left()
+        self.metrics.ibs_latency.observe(self.metrics.clock() - started_at)
+        return charge
@@ -0,0 +1,139 @@
+import asyncio
+import time
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+
+class MotionCalibration(NamedTuple):
+    """
+    Measured motion of a robot: the seconds it takes to cross a cell and to make a quarter turn
+    at cruise speed, and the duty-cycle profile used to reach that speed
+    """
+    cell_time: float
+    quarter_turn_time: float
+    # Seconds to accelerate from standstill to cruise speed, and to decelerate back
+    ramp_time: float = 0.1
+    cruise_duty: float = 100.0
+    ramp_steps: int = 5
+    frequency: float = 1000.0
+
+
+class MotionController:
+    """
+    PWM speed control of the wheel and rotation motors of a robot: each activation accelerates
+    to the cruise duty cycle in ramp_steps steps, cruises and decelerates back to standstill, and
+    lasts as long as the calibration says the move takes rather than a fixed worst-case time.
+    The speed is taken to follow the duty cycle, so a ramp covers half the distance of the same
+    time at cruise speed: MotionController(calibration).attach(robot)
+    The path planners and the energy model cost routes with CleaningRobot.actuation_time(), which
+    includes the ramps. An AsyncCleaningRobot awaits the ramps, so they do not block the event loop.
+    """
+
+    def __init__(self, calibration: MotionCalibration):
+        if calibration.ramp_time < 0 or calibration.ramp_steps < 1 or not 0 < calibration.cruise_duty <= 100:
+            raise CleaningRobotError("Invalid motion profile.")
+        if calibration.cell_time < calibration.ramp_time or calibration.quarter_turn_time < calibration.ramp_time:
+            raise CleaningRobotError("A move cannot be shorter than its acceleration ramp.")
+        self.calibration = calibration
+        self.robot = None
+        self.pwms = {}
+        self._running: Dict[str, bool] = {}
+
+    def attach(self, robot: CleaningRobot) -> None:
+        """
+        Drive the PWMA and PWMB pins of a robot through PWM and time its moves with the calibration
+        """
+        calibration = self.calibration
+        self.robot = robot
+        self.pwms = {CleaningRobot.WHEEL_MOTOR: robot.gpio.PWM(robot.PWMA, calibration.frequency),
+                     CleaningRobot.ROTATION_MOTOR: robot.gpio.PWM(robot.PWMB, calibration.frequency)}
+        for pwm in self.pwms.values():
+            pwm.start(0)
+        self._running = {motor: False for motor in self.pwms}
+        # The ramps of a move cover one cell (or one quarter turn) in twice their time, which the cruise saves
+        robot.WHEEL_MOVE_TIME = calibration.cell_time - calibration.ramp_time
+        robot.WHEEL_CRUISE_TIME = calibration.cell_time
+        robot.ROTATION_TIME = calibration.quarter_turn_time - calibration.ramp_time
+        robot.motion = self
+
+    def accelerate(self, motor: str) -> None:
+        for seconds in self._accelerate(motor):
+            self._sleep(seconds, motor)
+
+    def decelerate(self, motor: str) -> None:
+        for seconds in self._decelerate(motor):
+            self._sleep(seconds, motor)
+
+    async def accelerate_async(self, motor: str) -> None:
+        for seconds in self._accelerate(motor):
+            await self._sleep_async(seconds, motor)
+
+    async def decelerate_async(self, motor: str) -> None:
+        for seconds in self._decelerate(motor):
+            await self._sleep_async(seconds, motor)
+
+    def halt(self, motor: str) -> None:
+        """
+        Cut a motor at once, e.g., on an emergency stop
+        """
+        if self._running.get(motor):
+            self.pwms[motor].ChangeDutyCycle(0)
+            self._running[motor] = False
+
+    def _accelerate(self, motor: str) -> Iterator[float]:
+        """
+        Step the duty cycle of a motor up to the cruise one
+        :return: the seconds to wait after each step
+        """
+        if self._running[motor]:
+            return
+        self._running[motor] = True
+        for duty, seconds in self.ramp(up=True):
+            self.pwms[motor].ChangeDutyCycle(duty)
+            self._actuated(motor, seconds)
+            yield seconds
+        self.pwms[motor].ChangeDutyCycle(self.calibration.cruise_duty)
+
+    def _decelerate(self, motor: str) -> Iterator[float]:
+        if not self._running.get(motor):
+            return
+        for duty, seconds in self.ramp(up=False):
+            self.pwms[motor].ChangeDutyCycle(duty)
+            self._actuated(motor, seconds)
+            yield seconds
+        self.pwms[motor].ChangeDutyCycle(0)
+        self._running[motor] = False
+
+    def ramp(self, up: bool) -> List[Tuple[float, float]]:
+        """
+        :return: the (duty cycle, seconds) steps of an acceleration, or of a deceleration if not up
+        """
+        calibration = self.calibration
+        steps = calibration.ramp_steps
+        # Duty cycles at the middle of each step, so the average speed of the ramp is half the cruise speed
+        duties = [calibration.cruise_duty * (step + 0.5) / steps for step in range(steps)]
+        return [(duty, calibration.ramp_time / steps) for duty in (duties if up else duties[::-1])]
+
+    def move_time(self, cells: int) -> float:
+        """
+        :return: the seconds a single activation of the wheel motor takes to cross some cells
+        """
+        return cells * self.calibration.cell_time + self.calibration.ramp_time
+
+    def turn_time(self) -> float:
+        return self.calibration.quarter_turn_time + self.calibration.ramp_time
+
+    def _actuated(self, motor: str, seconds: float) -> None:
+        # Not CleaningRobot._wait: a ramp step is part of a move, not an actuation of its own
+        robot = self.robot
+        if robot.energy_model is not None:
+            robot.energy_model.actuated(motor, seconds, robot.cleaning_system_on, count=False)
+
+    def _sleep(self, seconds: float, motor: str) -> None:
+        seconds = self.robot._elapse(seconds, motor)
+        if seconds:
+            time.sleep(seconds)
+
+    async def _sleep_async(self, seconds: float, motor: str) -> None:
+        await asyncio.sleep(self.robot._elapse(seconds, motor))
@@ -0,0 +1,100 @@
+import threading
+import time
+from typing import Callable, Tuple
+
+
+class ObstacleSensor:
+    """
+    Interrupt-driven view of the infrared sensor: edge callbacks keep a debounced,
+    timestamped obstacle state, so reading it costs no GPIO access. Every edge reaches the callbacks,
+    the debouncing is done here rather than by the GPIO driver.
+    An edge dropped as a bounce leaves the state unsettled: the first read after the debounce
+    window samples the pin again, so a real change that came with the bounce is not lost.
+    It can replace the polling of a CleaningRobot: robot.obstacle_sensor = ObstacleSensor(robot.gpio, robot.INFRARED_PIN)
+    """
+
+    def __init__(self, gpio, pin: int, debounce: float = 0.005, clock: Callable[[], float] = time.monotonic):
+        self.gpio = gpio
+        self.pin = pin
+        self.debounce = debounce
+        self.clock = clock
+
+        self._obstacle = False
+        # Whether an edge was dropped as a bounce since the state last changed
+        self._unsettled = False
+        self.changed_at = None
+        self.edges = 0
+        self.bounces = 0
+
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> None:
+        """
+        Sample the sensor once and keep the state updated from edge interrupts afterwards
+        """
+        if self._started:
+            return
+        with self._lock:
+            self._obstacle = bool(self.gpio.input(self.pin))
+            self._unsettled = False
+            self.changed_at = self.clock()
+        # No bouncetime: the driver would drop the edges inside it, the last one included,
+        # so a change that came with a bounce would never be sampled again
+        self.gpio.add_event_detect(self.pin, self.gpio.BOTH, callback=self._on_edge)
+        self._started = True
+
+    def stop(self) -> None:
+        if not self._started:
+            return
+        self.gpio.remove_event_detect(self.pin)
+        self._started = False
+
+    @property
+    def obstacle(self) -> bool:
+        """
+        Whether an obstacle is in front of the robot
+        """
+        if self._unsettled:
+            self._settle()
+        return self._obstacle
+
+    def state(self) -> Tuple[bool, float]:
+        """
+        :return: whether an obstacle is in front of the robot and when that last changed
+        """
+        if self._unsettled:
+            self._settle()
+        with self._lock:
+            return self._obstacle, self.changed_at
+
+    def _settle(self) -> None:
+        """
+        Sample the pin again once the debounce window of the last change is over
+        """
+        now = self.clock()
+        if now - self.changed_at < self.debounce:
+            return
+        level = bool(self.gpio.input(self.pin))
+        with self._lock:
+            if not self._unsettled:
+                return
+            self._unsettled = False
+            if level != self._obstacle:
+                self._obstacle = level
+                self.changed_at = now
+
+    def _on_edge(self, channel: int) -> None:
+        level = bool(self.gpio.input(channel))
+        now = self.clock()
+        with self._lock:
+            self.edges += 1
+            if level == self._obstacle:
+                return
+            if self.changed_at is not None and now - self.changed_at < self.debounce:
+                self.bounces += 1
+                self._unsettled = True
+                return
+            self._obstacle = level
+            self._unsettled = False
+            self.changed_at = now
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from src.cleaning_robot import CleaningRobotError
+from src.rms_server import DONE, ERROR, STEP
+
+
+class RouteReply(NamedTuple):
+    steps: List[str]
+    status: str
+
+
+class LoadReport(NamedTuple):
+    routes: int
+    steps: int
+    seconds: float
+    latencies: List[float]
+
+    @property
+    def routes_per_second(self) -> float:
+        return self.routes / self.seconds if self.seconds else 0.0
+
+
+class RMSClient:
+    """
+    Stand-in RMS speaking the line protocol of rms_server. Routes can be pipelined with
+    send() and their replies collected in order with receive().
+    """
+
+    def __init__(self):
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect_tcp(self, host: str, port: int) -> None:
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+
+    async def connect_unix(self, path: str) -> None:
+        self._reader, self._writer = await asyncio.open_unix_connection(path)
+
+    async def send(self, route: str) -> None:
+        self._writer.write(f'{route}\n'.encode('ascii'))
+        await self._writer.drain()
+
+    async def receive(self) -> RouteReply:
+        """
+        Wait for the whole reply to the oldest route sent
+        """
+        steps = []
+        while True:
+            line = (await self._reader.readline()).decode('ascii')
+            if not line:
+                raise ConnectionError("The robot closed the connection.")
+            kind, _, payload = line.rstrip('\n').partition(' ')
+            if kind == STEP:
+                steps.append(payload)
+            elif kind == DONE:
+                return RouteReply(steps, payload)
+            elif kind == ERROR:
+                raise CleaningRobotError(payload)
+
+    async def execute(self, route: str) -> RouteReply:
+        await self.send(route)
+        return await self.receive()
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def generate_load(address: Tuple[str, int], clients: int = 4, routes: int = 100,
+                        route: str = 'frfl') -> LoadReport:
+    """
+    Have several RMS clients pipeline routes to the robot at once
+    :param address: the host and port of the robot, or a one-element tuple with the path of its Unix socket
+    :param routes: the number of routes each client sends
+    """
+    async def client() -> Tuple[int, List[float]]:
+        rms = RMSClient()
+        if len(address) == 1:
+            await rms.connect_unix(address[0])
+        else:
+            await rms.connect_tcp(*address)
+        sent = []
+        steps = 0
+        latencies = []
+
+        async def send_all():
+            for _ in range(routes):
+                sent.append(time.perf_counter())
+                await rms.send(route)
+
+        sender = asyncio.ensure_future(send_all())
+        for index in range(routes):
+            reply = await rms.receive()
+            latencies.append(time.perf_counter() - sent[index])
+            steps += len(reply.steps)
+        await sender
+        await rms.close()
+        return steps, latencies
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client() for _ in range(clients)))
+    seconds = time.perf_counter() - start
+    return LoadReport(clients * routes, sum(steps for steps, _ in results), seconds,
+                      [latency for _, latencies in results for latency in latencies])
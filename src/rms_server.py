@@ -0,0 +1,173 @@
+"""
+Line protocol between the RMS and the robot.
+The RMS sends one route per line, e.g. "ffrf\n", and may pipeline as many as it likes.
+For each route the robot replies with one "S <status>" line per executed command, streamed
+as the command completes, then with "D <status>" once the route is done, or with "E <message>"
+if the route was rejected. Routes stop like execute_commands: at low battery, out of bounds or obstacles.
+"""
+import asyncio
+from typing import Optional, Set, Tuple
+
+from src import cleaning_robot
+from src.cleaning_robot import CleaningRobot
+
+STEP = 'S'
+DONE = 'D'
+ERROR = 'E'
+# Queued in place of a route whose line is longer than the stream limit
+_ROUTE_TOO_LONG = object()
+
+
+class RMSServer:
+    """
+    Asyncio server in front of a CleaningRobot. Routes from every connection go through a single
+    bounded queue drained by one worker task, so commands never interleave; when the queue is full
+    the server stops reading from the sockets, which pushes back on the RMS. Replies are sent by a
+    task per connection, so a slow RMS does not hold the robot or the other connections; one whose
+    replies pile up beyond reply_queue_size lines is disconnected. A route longer than the stream
+    limit is rejected with an error reply and the rest of its line is skipped.
+    """
+
+    def __init__(self, robot: CleaningRobot, queue_size: int = 64, reply_queue_size: int = 1024):
+        self.robot = robot
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._reply_queue_size = reply_queue_size
+        self._worker: Optional[asyncio.Task] = None
+        self._servers = []
+        self._connections: Set["_Connection"] = set()
+
+    async def start_tcp(self, host: str = '127.0.0.1', port: int = 0) -> Tuple[str, int]:
+        """
+        :return: the address the server listens on
+        """
+        server = await asyncio.start_server(self._handle, host, port)
+        self._start(server)
+        return server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path: str) -> None:
+        self._start(await asyncio.start_unix_server(self._handle, path))
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        connections, self._connections = self._connections, set()
+        # A handler may wait for room in the route queue, which nothing drains any more
+        tasks = [task for connection in connections for task in (connection.handler, connection.sender)]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start(self, server: asyncio.AbstractServer) -> None:
+        self._servers.append(server)
+        if self._worker is None:
+            self._queue = asyncio.Queue(self._queue_size)
+            self._worker = asyncio.ensure_future(self._execute_routes())
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = _Connection(writer, self._reply_queue_size)
+        self._connections.add(connection)
+        connection.sender.add_done_callback(lambda _: self._connections.discard(connection))
+        oversized = False
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as error:
+                    line = error.partial
+                except asyncio.LimitOverrunError as error:
+                    # Drop what is buffered of the line, the rest of it is dropped as it comes
+                    await reader.readexactly(error.consumed)
+                    oversized = True
+                    continue
+                if not line:
+                    break
+                await self._queue.put((_ROUTE_TOO_LONG if oversized else line.decode('ascii', 'replace').strip(),
+                                       connection))
+                connection.pending += 1
+                oversized = False
+        except ConnectionError:
+            pass
+        finally:
+            # Let the sender flush the replies of the routes still queued before closing: the worker
+            # closes it after the last one, so nothing waits for room in the queue here
+            connection.finished = True
+            if connection.pending == 0:
+                connection.reply(None)
+
+    async def _execute_routes(self) -> None:
+        while True:
+            route, connection = await self._queue.get()
+            connection.pending -= 1
+            if route is _ROUTE_TOO_LONG:
+                connection.reply(f'{ERROR} Route too long.\n')
+            elif not connection.writer.is_closing():
+                await self._execute_route(route, connection)
+            if connection.finished and connection.pending == 0:
+                connection.reply(None)
+
+    async def _execute_route(self, route: str, connection: "_Connection") -> None:
+        if any(command not in self.robot.VALID_COMMANDS for command in route):
+            connection.reply(f'{ERROR} Invalid command received.\n')
+            return
+        step = None
+        for command in route:
+            if cleaning_robot.DEPLOYMENT:  # The motors block on the actual hardware, keep the event loop serving
+                step = await asyncio.get_running_loop().run_in_executor(None, self.robot.execute_step, command)
+            else:
+                step = self.robot.execute_step(command)
+                # Let the senders stream the step
+                await asyncio.sleep(0)
+            connection.reply(f'{STEP} {self.robot.step_status(step)}\n')
+            if step.stop is not None:
+                break
+        connection.reply(f'{DONE} {self.robot.step_status(step)}\n')
+
+
+class _Connection:
+    """
+    Replies of a connection, queued by the worker and written by a sender task of their own
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, reply_queue_size: int):
+        self.writer = writer
+        # The task reading the routes of the connection
+        self.handler = asyncio.current_task()
+        self.replies = asyncio.Queue(reply_queue_size)
+        # Routes of the connection still in the route queue, and whether the RMS stopped sending
+        self.pending = 0
+        self.finished = False
+        self.sender = asyncio.ensure_future(self._send())
+
+    def reply(self, line: Optional[str]) -> None:
+        """
+        Queue a reply line, or None to close the connection once the queued replies are sent
+        """
+        if self.writer.is_closing():
+            self.sender.cancel()
+            return
+        try:
+            self.replies.put_nowait(line)
+        except asyncio.QueueFull:
+            # The RMS does not keep up with the robot: drop it rather than buffer without bound
+            self.writer.transport.abort()
+            self.sender.cancel()
+
+    async def _send(self) -> None:
+        try:
+            while True:
+                line = await self.replies.get()
+                if line is None or self.writer.is_closing():
+                    return
+                self.writer.write(line.encode('ascii'))
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.writer.close()
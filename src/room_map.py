@@ -0,0 +1,128 @@
+import mmap
+import os
+import struct
+from typing import Optional
+
+from src.cleaning_robot import CleaningRobotError
+
+
+class RoomMap:
+    """
+    Occupancy grid of the room, one byte per cell stored row by row from (x_min, y_min).
+    It can be attached to a CleaningRobot, which then records the cells it visits and the
+    obstacles it finds: robot.room_map = RoomMap(*robot.borders)
+    """
+
+    UNKNOWN = 0
+    FREE = 1
+    CLEANED = 2
+    OBSTACLE = 3
+
+    VALID_STATES = [UNKNOWN, FREE, CLEANED, OBSTACLE]
+
+    # Magic number and borders, followed by the cells
+    HEADER = struct.Struct('<4s4i')
+    MAGIC = b'CRM1'
+
+    def __init__(self, x_min: int, x_max: int, y_min: int, y_max: int, cells=None):
+        if x_max < x_min or y_max < y_min:
+            raise CleaningRobotError("Invalid borders.")
+        self.x_min = x_min
+        self.x_max = x_max
+        self.y_min = y_min
+        self.y_max = y_max
+        self.width = x_max - x_min + 1
+        self.height = y_max - y_min + 1
+        if cells is None:
+            cells = bytearray(self.width * self.height)
+        elif len(cells) != self.width * self.height:
+            raise CleaningRobotError("Map size does not match its borders.")
+        self.cells = cells
+        self._mmap: Optional[mmap.mmap] = None
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.x_min <= x <= self.x_max and self.y_min <= y <= self.y_max
+
+    def get(self, x: int, y: int) -> int:
+        return self.cells[self._index(x, y)]
+
+    def set(self, x: int, y: int, state: int) -> None:
+        if state not in self.VALID_STATES:
+            raise CleaningRobotError("Invalid cell state.")
+        self.cells[self._index(x, y)] = state
+
+    def is_obstacle(self, x: int, y: int) -> bool:
+        return self.contains(x, y) and self.cells[self._index(x, y)] == self.OBSTACLE
+
+    def count(self, state: int) -> int:
+        cells = self.cells
+        # Only the cells of a loaded map, a memoryview, have to be copied to be counted
+        return (cells if isinstance(cells, (bytes, bytearray)) else bytes(cells)).count(state)
+
+    def resize(self, x_min: int, x_max: int, y_min: int, y_max: int) -> None:
+        """
+        Move the map to new borders, keeping the cells that are inside both the old and the new borders
+        """
+        if x_max < x_min or y_max < y_min:
+            raise CleaningRobotError("Invalid borders.")
+        width = x_max - x_min + 1
+        cells = bytearray(width * (y_max - y_min + 1))
+        keep_x_min, keep_x_max = max(x_min, self.x_min), min(x_max, self.x_max)
+        if keep_x_min <= keep_x_max:
+            run = keep_x_max - keep_x_min + 1
+            for y in range(max(y_min, self.y_min), min(y_max, self.y_max) + 1):
+                source = self._index(keep_x_min, y)
+                target = (y - y_min) * width + keep_x_min - x_min
+                cells[target:target + run] = self.cells[source:source + run]
+        self.close()
+        self.x_min, self.x_max, self.y_min, self.y_max = x_min, x_max, y_min, y_max
+        self.width = width
+        self.height = y_max - y_min + 1
+        self.cells = cells
+
+    def save(self, path: str) -> None:
+        """
+        Atomically write the map to a file that load() can memory-map
+        """
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.x_min, self.x_max, self.y_min, self.y_max))
+            file.write(self.cells)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RoomMap":
+        """
+        Memory-map a map written by save(). Cells are paged in on first access and
+        changes stay private to this process until the map is saved again.
+        """
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < cls.HEADER.size:
+                raise CleaningRobotError("Not a room map file.")
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        try:
+            magic, x_min, x_max, y_min, y_max = cls.HEADER.unpack_from(mapped)
+            if magic != cls.MAGIC:
+                raise CleaningRobotError("Not a room map file.")
+            # Checked before the cells are viewed, as the map cannot be closed while they are
+            if x_max < x_min or y_max < y_min or size - cls.HEADER.size != (x_max - x_min + 1) * (y_max - y_min + 1):
+                raise CleaningRobotError("Map size does not match its borders.")
+        except CleaningRobotError:
+            mapped.close()
+            raise
+        room_map = cls(x_min, x_max, y_min, y_max, memoryview(mapped)[cls.HEADER.size:])
+        room_map._mmap = mapped
+        return room_map
+
+    def close(self) -> None:
+        if self._mmap is None:
+            return
+        self.cells.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def _index(self, x: int, y: int) -> int:
+        if not self.contains(x, y):
+            raise CleaningRobotError("Cell out of the map.")
+        return (y - self.y_min) * self.width + x - self.x_min
@@ -0,0 +1,101 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import FrozenSet, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from mock.backend import SimulatedBackend
+from src.cleaning_robot import CleaningRobot
+
+
+class Scenario(NamedTuple):
+    """
+    A simulated mission: the robot starts at (x, y, heading) inside borders and runs route.
+    Obstacles are the listed cells plus, with obstacle_density > 0, random cells drawn from seed.
+    Like a loop of execute_command calls, the route goes on after an obstacle and ends at the first
+    low battery or out of bounds status.
+    """
+    scenario_id: int
+    route: str
+    borders: Tuple[int, int, int, int] = (0, 9, 0, 9)
+    start: Tuple[int, int, str] = (0, 0, CleaningRobot.N)
+    obstacles: FrozenSet[Tuple[int, int]] = frozenset()
+    obstacle_density: float = 0.0
+    seed: int = 0
+    battery: float = 100
+    forward_drain: float = 0
+    turn_drain: float = 0
+
+
+class ScenarioResult(NamedTuple):
+    scenario_id: int
+    status: str
+    steps: int
+    obstacles_hit: int
+    actuation_time: float
+
+
+class ScenarioInfrared:
+    """
+    Infrared sensor stand-in that sees the obstacles of a scenario in front of the robot
+    """
+
+    def __init__(self, robot: CleaningRobot, obstacles: FrozenSet[Tuple[int, int]]):
+        self.robot = robot
+        self.obstacles = obstacles
+
+    @property
+    def obstacle(self) -> bool:
+        dx, dy = CleaningRobot.DELTAS[self.robot.heading]
+        return (self.robot.pos_x + dx, self.robot.pos_y + dy) in self.obstacles
+
+
+def scenario_obstacles(scenario: Scenario) -> FrozenSet[Tuple[int, int]]:
+    if scenario.obstacle_density <= 0:
+        return scenario.obstacles
+    generator = random.Random(scenario.seed)
+    x_min, x_max, y_min, y_max = scenario.borders
+    drawn = {(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)
+             if generator.random() < scenario.obstacle_density}
+    drawn.discard(scenario.start[:2])
+    return frozenset(drawn) | scenario.obstacles
+
+
+def run_scenario(scenario: Scenario) -> ScenarioResult:
+    backend = SimulatedBackend(charge=scenario.battery)
+    robot = CleaningRobot(backend)
+    robot.set_borders(*scenario.borders)
+    robot.pos_x, robot.pos_y, robot.heading = scenario.start
+    robot.obstacle_sensor = ScenarioInfrared(robot, scenario_obstacles(scenario))
+
+    steps = 0
+    obstacles_hit = 0
+    actuation_time = 0
+    step = None
+    for command in scenario.route:
+        step = robot.execute_step(command)
+        if step.stop in (CleaningRobot.LOW_BATTERY, CleaningRobot.OUT_OF_BOUNDS):
+            break
+        steps += 1
+        actuation_time += robot.actuation_time(step.command)
+        if step.command == CleaningRobot.FORWARD:
+            backend.ibs.charge -= scenario.forward_drain
+        else:
+            backend.ibs.charge -= scenario.turn_drain
+        if step.stop == CleaningRobot.OBSTACLE:
+            obstacles_hit += 1
+    return ScenarioResult(scenario.scenario_id, robot.step_status(step), steps, obstacles_hit, actuation_time)
+
+
+def run_scenarios(scenarios: Iterable[Scenario], workers: Optional[int] = None,
+                  chunksize: int = 64) -> Iterator[ScenarioResult]:
+    """
+    Run scenarios across a pool of processes, yielding their results in the order of the scenarios:
+    a result comes once its scenario and all the ones before it are done, so a slow scenario holds back
+    the results after it. Every scenario is submitted up front
+    :param workers: the number of processes, os.cpu_count() by default; 0 runs the scenarios in this process
+    :param chunksize: the number of scenarios sent to a process at once
+    """
+    if workers == 0:
+        yield from map(run_scenario, scenarios)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(run_scenario, scenarios, chunksize=chunksize)
@@ -0,0 +1,85 @@
+import threading
+from typing import Dict, Union
+
+
+class ShadowGPIO:
+    """
+    GPIO output layer that keeps a shadow copy of every output pin and drops writes
+    that would not change the level of the pin.
+    It wraps either RPi.GPIO or mock.GPIO and forwards everything else to it, so it can
+    replace the GPIO of a CleaningRobot: robot.gpio = ShadowGPIO(robot.gpio)
+    """
+
+    def __init__(self, gpio):
+        self.gpio = gpio
+        self.levels: Dict[int, int] = {}
+        self.writes_issued = 0
+        self.writes_suppressed = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.gpio, name)
+
+    def setup(self, channel, direction, initial=0, **kwargs) -> None:
+        self.gpio.setup(channel, direction, initial=initial, **kwargs)
+        with self._lock:
+            if direction == self.gpio.OUT:
+                self.levels[channel] = 1 if initial else 0
+            else:
+                self.levels.pop(channel, None)
+
+    def output(self, channel: int, value: Union[int, bool]) -> None:
+        """
+        Write a level to an output pin, unless the pin is already known to be at that level
+        """
+        level = 1 if value else 0
+        with self._lock:
+            if self.levels.get(channel) == level:
+                self.writes_suppressed += 1
+                return
+            self.gpio.output(channel, value)
+            self.levels[channel] = level
+            self.writes_issued += 1
+
+    def output_many(self, values: Dict[int, Union[int, bool]]) -> None:
+        """
+        Atomically update several output pins with a single GPIO call,
+        leaving out the pins that are already at the requested level
+        :param values: the level to write to each pin
+        """
+        with self._lock:
+            channels = []
+            levels = []
+            for channel, value in values.items():
+                level = 1 if value else 0
+                if self.levels.get(channel) == level:
+                    self.writes_suppressed += 1
+                    continue
+                channels.append(channel)
+                levels.append(level)
+            if not channels:
+                return
+            self.gpio.output(channels, levels)
+            for channel, level in zip(channels, levels):
+                self.levels[channel] = level
+            self.writes_issued += len(channels)
+
+    def level(self, channel: int):
+        """
+        :return: the last level written to the pin, or None if it is unknown
+        """
+        return self.levels.get(channel)
+
+    def invalidate(self, channel=None) -> None:
+        """
+        Forget the shadow level of a pin (or of every pin), so the next write is always issued
+        """
+        with self._lock:
+            if channel is None:
+                self.levels.clear()
+            else:
+                self.levels.pop(channel, None)
+
+    def cleanup(self, channel=None) -> None:
+        self.gpio.cleanup(channel)
+        self.invalidate(channel)
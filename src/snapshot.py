@@ -0,0 +1,157 @@
+"""
+State snapshot: a tiny file holding the last known state of a robot, i.e., its position, heading,
+borders, LEDs and cleaning system, saved after each command so a restarted process can resume
+the mission where it stopped instead of re-homing the robot.
+"""
+import os
+import struct
+import threading
+import zlib
+from typing import NamedTuple, Optional
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+# Magic number and slot size, followed by two slots
+HEADER = struct.Struct('<4sI')
+MAGIC = b'CRS1'
+# Sequence number, x, y, heading, x_min, x_max, y_min, y_max, flags, then the CRC32 of the rest
+SLOT = struct.Struct('<QiiBiiiiB')
+CRC = struct.Struct('<I')
+SLOT_SIZE = SLOT.size + CRC.size
+
+# Bits of the flags
+RECHARGE_LED = 1
+CLEANING_SYSTEM = 2
+WARNING_LED = 4
+
+
+class RobotState(NamedTuple):
+    x: Optional[int]
+    y: Optional[int]
+    # None if the robot was not initialized yet
+    heading: Optional[str]
+    borders: tuple
+    recharge_led_on: bool
+    cleaning_system_on: bool
+    warning_led_on: bool
+
+
+class StateSnapshot:
+    """
+    Writer and reader of a state snapshot. The file has two fixed slots written in turn, each with
+    a sequence number and a checksum, so a save is a single small positioned write and a save torn
+    by a crash or a power cut leaves the previous state readable: StateSnapshot(path).attach(robot)
+    Unchanged states are not written again. Saves may come from several threads, e.g., from a Supervisor.
+    """
+
+    def __init__(self, path: str, sync: bool = False):
+        """
+        :param path: the snapshot file, created if it does not exist
+        :param sync: flush each save to the storage, so it also survives a power cut, not only a crash
+        """
+        self.path = path
+        self.sync = sync
+        self.saves = 0
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < HEADER.size:
+            os.pwrite(self._fd, HEADER.pack(MAGIC, SLOT_SIZE) + bytes(2 * SLOT_SIZE), 0)
+            os.fsync(self._fd)
+        elif os.pread(self._fd, HEADER.size, 0) != HEADER.pack(MAGIC, SLOT_SIZE):
+            os.close(self._fd)
+            raise CleaningRobotError("Not a state snapshot.")
+        sequence, payload = _latest(os.pread(self._fd, 2 * SLOT_SIZE, HEADER.size))
+        self._sequence = sequence
+        self._last = payload
+
+    def attach(self, robot: CleaningRobot) -> None:
+        """
+        Save the state of a robot after each of its commands, starting with the current one
+        """
+        robot.snapshot = self
+        self.save(robot)
+
+    def save(self, robot: CleaningRobot) -> None:
+        heading = robot.heading
+        flags = ((RECHARGE_LED if robot.recharge_led_on else 0) | (CLEANING_SYSTEM if robot.cleaning_system_on else 0)
+                 | (WARNING_LED if robot.warning_led_on else 0))
+        if heading is None:
+            payload = (0, 0, 0, *robot.borders, flags)
+        else:
+            payload = (robot.pos_x, robot.pos_y, ord(heading), *robot.borders, flags)
+        if payload == self._last:
+            return
+        with self._lock:
+            sequence = self._sequence + 1
+            slot = SLOT.pack(sequence, *payload)
+            os.pwrite(self._fd, slot + CRC.pack(zlib.crc32(slot)), HEADER.size + (sequence & 1) * SLOT_SIZE)
+            if self.sync:
+                os.fsync(self._fd)
+            self._sequence = sequence
+            self._last = payload
+            self.saves += 1
+
+    def load(self) -> Optional[RobotState]:
+        """
+        :return: the last state saved, None if there is none
+        """
+        if self._last is None:
+            return None
+        return _state(self._last)
+
+    def restore(self, robot: CleaningRobot) -> bool:
+        """
+        Put a robot back in the last state saved, writing the LED and cleaning system pins accordingly,
+        and keep saving its state
+        :return: False, leaving the robot as it is, if no state was saved
+        """
+        state = self.load()
+        if state is not None:
+            robot.pos_x, robot.pos_y, robot.heading = state.x, state.y, state.heading
+            robot.borders = list(state.borders)
+            robot.recharge_led_on = state.recharge_led_on
+            robot.cleaning_system_on = state.cleaning_system_on
+            robot.warning_led_on = state.warning_led_on
+            robot.gpio.output(robot.RECHARGE_LED_PIN, state.recharge_led_on)
+            robot.gpio.output(robot.CLEANING_SYSTEM_PIN, state.cleaning_system_on)
+            robot.gpio.output(robot.WARNING_LED_PIN, state.warning_led_on)
+            if robot.room_map is not None:
+                robot.room_map.resize(*state.borders)
+        robot.snapshot = self
+        return state is not None
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "StateSnapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _latest(slots: bytes):
+    """
+    :return: the sequence number and the payload of the newest valid slot, (0, None) if none is valid
+    """
+    best = (0, None)
+    for offset in (0, SLOT_SIZE):
+        if len(slots) < offset + SLOT_SIZE:
+            break
+        slot = slots[offset:offset + SLOT.size]
+        if CRC.unpack_from(slots, offset + SLOT.size)[0] != zlib.crc32(slot):
+            continue
+        sequence, *payload = SLOT.unpack(slot)
+        if sequence > best[0]:
+            best = (sequence, tuple(payload))
+    return best
+
+
+def _state(payload: tuple) -> RobotState:
+    x, y, heading, x_min, x_max, y_min, y_max, flags = payload
+    if heading == 0:
+        x = y = None
+    return RobotState(x, y, chr(heading) if heading else None, (x_min, x_max, y_min, y_max),
+                      bool(flags & RECHARGE_LED), bool(flags & CLEANING_SYSTEM), bool(flags & WARNING_LED))
@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+
+class SupervisorEvent(NamedTuple):
+    # Supervisor.CLEANING_SYSTEM, RECHARGE_LED or WARNING_LED
+    output: str
+    on: bool
+    time: float
+
+
+class Supervisor:
+    """
+    Owner of the cleaning system, the recharge LED and the warning LED of a robot. It updates them
+    from a background thread every period seconds, or whenever tick() is called, e.g., from a monitor
+    of an AsyncCleaningRobot, so commands never wait on them. Every battery reading of the robot also
+    goes through the supervisor, which cuts the brushes as soon as one crosses the low battery level.
+    Changes are published as SupervisorEvents to the subscribers: Supervisor(robot).start()
+    The supervisor reads the IBS and writes the pins of the robot as they are when it is created, so
+    the background thread never goes through the journal, metrics or energy model layers, which
+    are attached afterwards and are driven from the command thread only.
+    """
+
+    CLEANING_SYSTEM = 'cleaning_system'
+    RECHARGE_LED = 'recharge_led'
+    WARNING_LED = 'warning_led'
+
+    LOW_BATTERY = 10
+
+    # Pin and robot attribute of each output
+    OUTPUTS = {CLEANING_SYSTEM: (CleaningRobot.CLEANING_SYSTEM_PIN, 'cleaning_system_on'),
+               RECHARGE_LED: (CleaningRobot.RECHARGE_LED_PIN, 'recharge_led_on'),
+               WARNING_LED: (CleaningRobot.WARNING_LED_PIN, 'warning_led_on')}
+
+    def __init__(self, robot: CleaningRobot, period: float = 0.5, clock: Callable[[], float] = time.monotonic):
+        """
+        :param period: seconds between two updates of the background thread
+        :param clock: the source of the event timestamps
+        """
+        if robot.journal is not None or robot.metrics is not None or robot.energy_model is not None:
+            raise CleaningRobotError("The supervisor must be created before the other layers are attached.")
+        self.robot = robot
+        self.gpio = robot.gpio
+        self.ibs = robot.ibs
+        self.period = period
+        self.clock = clock
+        self.states: Dict[str, Optional[bool]] = {output: None for output in self.OUTPUTS}
+        self._subscribers: List[Callable[[SupervisorEvent], None]] = []
+        # Serializes the decisions and pin writes of the background thread and of the command thread
+        self._lock = threading.Lock()
+        self._stop_event = None
+        self._thread = None
+
+        robot.ibs = SupervisedIBS(robot.ibs, self)
+        robot.supervisor = self
+
+    def subscribe(self, callback: Callable[[SupervisorEvent], None]) -> None:
+        """
+        :param callback: called with each SupervisorEvent, from the thread that caused the change
+        """
+        self._subscribers.append(callback)
+
+    def tick(self, charge: Optional[float] = None) -> None:
+        """
+        Update every output, switching the brushes on again once the battery allows it
+        :param charge: a battery reading already taken, the IBS is read otherwise
+        """
+        if charge is None:
+            charge = self.ibs.get_charge_left()
+        low = charge <= self.LOW_BATTERY
+        # Cut the brushes before anything else
+        self._set(self.CLEANING_SYSTEM, not low)
+        self._set(self.RECHARGE_LED, low)
+        robot = self.robot
+        if robot.heading is not None:
+            self._set(self.WARNING_LED, not robot._within_borders())
+
+    def battery_read(self, charge) -> None:
+        """
+        Cut the brushes at once if a battery reading of the robot is low. A reading never switches them on,
+        only tick() does.
+        """
+        if charge <= self.LOW_BATTERY and self.states[self.CLEANING_SYSTEM] is not False:
+            self._set(self.CLEANING_SYSTEM, False)
+            self._set(self.RECHARGE_LED, True)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.tick()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._supervise, args=(self._stop_event,),
+                                        name="supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._stop_event = None
+
+    def _supervise(self, stop_event: threading.Event) -> None:
+        while not stop_event.wait(self.period):
+            self.tick()
+
+    def _set(self, output: str, on: bool) -> None:
+        if self.states[output] == on:  # Most updates change nothing and do not take the lock
+            return
+        with self._lock:
+            if self.states[output] == on:
+                return
+            pin, attribute = self.OUTPUTS[output]
+            robot = self.robot
+            if output == self.CLEANING_SYSTEM and robot.clock is not None and robot.cleaning_system_on != on:
+                robot.clock.sleep(robot.CLEANING_SYSTEM_SWITCH_TIME, robot._loads(robot.CLEANING_SYSTEM))
+            self.gpio.output(pin, on)
+            setattr(robot, attribute, on)
+            self.states[output] = on
+            event = SupervisorEvent(output, on, self.clock())
+        if robot.snapshot is not None:
+            robot.snapshot.save(robot)
+        for callback in self._subscribers:
+            callback(event)
+
+
+class SupervisedIBS:
+    """
+    IBS layer handing every battery reading to a supervisor
+    """
+
+    def __init__(self, ibs, supervisor: Supervisor):
+        self.ibs = ibs
+        self.supervisor = supervisor
+
+    def __getattr__(self, name):
+        return getattr(self.ibs, name)
+
+    def get_charge_left(self):
+        charge = self.ibs.get_charge_left()
+        self.supervisor.battery_read(charge)
+        return charge
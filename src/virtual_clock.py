@@ -0,0 +1,65 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.cleaning_robot import CleaningRobot
+
+
+class VirtualClock:
+    """
+    Simulated time for a CleaningRobot: actuations advance it instead of sleeping,
+    so whole missions run in milliseconds: robot.clock = VirtualClock()
+    It can also be passed as clock to CachedBattery or ObstacleSensor.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.listeners: List[Callable[[float, Tuple[str, ...]], None]] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float, loads: Tuple[str, ...] = ()) -> None:
+        """
+        Advance the time, telling the listeners which actuators were drawing power meanwhile
+        """
+        self.now += seconds
+        for listener in self.listeners:
+            listener(seconds, loads)
+
+
+class VirtualBattery:
+    """
+    IBS stand-in draining with the simulated time: an idle drain per second plus the drain
+    per second of each actuator drawing power: robot.ibs = VirtualBattery(robot.clock)
+    """
+
+    def __init__(self, clock: VirtualClock, charge: float = 100, idle_drain: float = 0,
+                 drains: Optional[Dict[str, float]] = None):
+        """
+        :param drains: the charge per second used by CleaningRobot.WHEEL_MOTOR, ROTATION_MOTOR and CLEANING_SYSTEM
+        """
+        self.charge = charge
+        self.idle_drain = idle_drain
+        self.drains = drains if drains is not None else {}
+        clock.listeners.append(self._drain)
+
+    def get_charge_left(self) -> int:
+        """
+        Returns the charge left.
+        :return: the charge left (i.e., a percentage value from 0 to 100)
+        """
+        return max(0, int(self.charge))
+
+    def _drain(self, seconds: float, loads: Tuple[str, ...]) -> None:
+        rate = self.idle_drain + sum(self.drains.get(load, 0) for load in loads)
+        self.charge -= rate * seconds
+
+
+def attach_virtual_clock(robot: CleaningRobot, charge: float = 100, idle_drain: float = 0,
+                         drains: Optional[Dict[str, float]] = None) -> VirtualClock:
+    """
+    Switch a robot to simulated time, with a battery draining accordingly
+    :return: the clock of the robot
+    """
+    robot.clock = VirtualClock()
+    robot.ibs = VirtualBattery(robot.clock, charge, idle_drain, drains)
+    return robot.clock
@@ -0,0 +1,104 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock, patch, call
+
+from mock import GPIO
+from mock.backend import SimulatedBackend
+from mock.ibs import IBS
+from src.async_cleaning_robot import AsyncCleaningRobot
+from src.cleaning_robot import CleaningRobotError
+
+
+class TestAsyncCleaningRobot(IsolatedAsyncioTestCase):
+
+    @patch.object(IBS, "get_charge_left")
+    async def test_execute_command_async(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = AsyncCleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(0,1,N)", await cr.execute_command_async("f"))
+        self.assertEqual("(0,1,E)", await cr.execute_command_async("r"))
+
+    @patch.object(IBS, "get_charge_left")
+    async def test_execute_command_async_not_enough_battery(self, mock_ibs: Mock):
+        mock_ibs.return_value = 10
+        cr = AsyncCleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("!(0,0,N)", await cr.execute_command_async("f"))
+
+    async def test_per_instance_lazy_backend(self):
+        backend = SimulatedBackend(charge=5)
+        cr = AsyncCleaningRobot(backend, lazy=True)
+        cr.initialize_robot()
+        self.assertEqual("!(0,0,N)", await cr.execute_command_async("f"))
+        self.assertIs(backend.gpio, cr.gpio)
+
+    async def test_execute_command_async_invalid_option(self):
+        cr = AsyncCleaningRobot()
+        with self.assertRaises(CleaningRobotError):
+            await cr.execute_command_async("j")
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "input")
+    async def test_execute_commands_async_stops_on_obstacle(self, mock_infrared_sensor: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        mock_infrared_sensor.side_effect = [False, True]
+        cr = AsyncCleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(0,1,N)(0,2)", await cr.execute_commands_async("fff"))
+
+    @patch.object(IBS, "get_charge_left")
+    def test_synchronous_api_still_works(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = AsyncCleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(0,1,N)", cr.execute_command("f"))
+
+    @patch("src.cleaning_robot.DEPLOYMENT", True)
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "output")
+    async def test_emergency_stop_cancels_motion(self, mock_output: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = AsyncCleaningRobot()
+        cr.WHEEL_MOVE_TIME = 10
+        cr.initialize_robot()
+        motion = asyncio.ensure_future(cr.execute_command_async("f"))
+        await asyncio.sleep(0.01)
+        cr.emergency_stop()
+        with self.assertRaises(CleaningRobotError):
+            await motion
+        mock_output.assert_has_calls([call(cr.AIN1, GPIO.LOW), call(cr.PWMA, GPIO.LOW),
+                                      call(cr.BIN1, GPIO.LOW), call(cr.PWMB, GPIO.LOW)], any_order=True)
+        self.assertEqual((0, 0), (cr.pos_x, cr.pos_y))
+
+    @patch("src.cleaning_robot.DEPLOYMENT", True)
+    @patch.object(IBS, "get_charge_left")
+    async def test_monitor_runs_while_robot_moves(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = AsyncCleaningRobot()
+        cr.WHEEL_MOVE_TIME = 0.05
+        cr.initialize_robot()
+        samples = []
+        cr.add_monitor(lambda robot: samples.append((robot.pos_x, robot.pos_y)), 0.01)
+        self.assertEqual("(0,1,N)", await cr.execute_command_async("f"))
+        await cr.stop_monitors()
+        self.assertGreater(len(samples), 1)
+
+    @patch.object(IBS, "get_charge_left")
+    async def test_failing_monitor_is_logged_and_keeps_running(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = AsyncCleaningRobot()
+        cr.initialize_robot()
+        calls = []
+
+        def monitor(robot):
+            calls.append(robot.pos_y)
+            raise ValueError("sensor unplugged")
+
+        with self.assertLogs("src.async_cleaning_robot", "ERROR") as logs:
+            task = cr.add_monitor(monitor, 0)
+            await cr.execute_commands_async("ff")
+        self.assertGreater(len(calls), 1)
+        self.assertFalse(task.done())
+        self.assertIn("sensor unplugged", logs.output[0])
+        await cr.stop_monitors()
@@ -0,0 +1,115 @@
+import time
+from unittest import TestCase
+
+from mock.backend import RecordingGPIO, SimulatedBackend, SimulatedGPIO
+from src.cleaning_robot import CleaningRobot
+from src.obstacle_sensor import ObstacleSensor
+from src.virtual_clock import VirtualClock
+
+
+class TestSimulatedBackend(TestCase):
+
+    def test_robots_do_not_share_pins(self):
+        first = CleaningRobot(SimulatedBackend())
+        second = CleaningRobot(SimulatedBackend())
+        first.pos_x, first.pos_y, first.heading = 10, 0, "N"
+        second.initialize_robot()
+        first.robot_status()
+        second.robot_status()
+        self.assertTrue(first.gpio.levels[CleaningRobot.WARNING_LED_PIN])
+        self.assertFalse(second.gpio.levels[CleaningRobot.WARNING_LED_PIN])
+
+    def test_robots_do_not_share_batteries(self):
+        first = CleaningRobot(SimulatedBackend(charge=10))
+        second = CleaningRobot(SimulatedBackend(charge=50))
+        first.initialize_robot()
+        second.initialize_robot()
+        self.assertEqual("!(0,0,N)", first.execute_command("f"))
+        self.assertEqual("(0,1,N)", second.execute_command("f"))
+
+    def test_obstacle_from_simulated_infrared_sensor(self):
+        cr = CleaningRobot(SimulatedBackend())
+        cr.initialize_robot()
+        cr.gpio.inject_edge(CleaningRobot.INFRARED_PIN, SimulatedGPIO.HIGH)
+        self.assertEqual("(0,0,N)(0,1)", cr.execute_command("f"))
+
+    def test_obstacle_sensor_on_simulated_gpio(self):
+        cr = CleaningRobot(SimulatedBackend())
+        cr.obstacle_sensor = ObstacleSensor(cr.gpio, cr.INFRARED_PIN, debounce=0)
+        cr.obstacle_sensor.start()
+        cr.gpio.inject_edge(CleaningRobot.INFRARED_PIN, SimulatedGPIO.HIGH)
+        self.assertTrue(cr.obstacle_found())
+
+    def test_output_to_input_channel(self):
+        gpio = SimulatedGPIO()
+        gpio.setup(15, gpio.IN)
+        self.assertRaises(RuntimeError, gpio.output, 15, gpio.HIGH)
+
+    def test_output_to_list_of_channels(self):
+        gpio = SimulatedGPIO()
+        gpio.setup([16, 18], gpio.OUT)
+        gpio.output([16, 18], [gpio.HIGH, gpio.LOW])
+        self.assertEqual({16: gpio.HIGH, 18: gpio.LOW}, gpio.levels)
+
+    def test_event_detection(self):
+        gpio = SimulatedGPIO()
+        gpio.setup(15, gpio.IN)
+        gpio.add_event_detect(15, gpio.RISING)
+        self.assertFalse(gpio.event_detected(15))
+        gpio.inject_edge(15, gpio.HIGH)
+        self.assertTrue(gpio.event_detected(15))
+        self.assertFalse(gpio.event_detected(15))
+        gpio.inject_edge(15, gpio.LOW)
+        self.assertFalse(gpio.event_detected(15))
+        self.assertIsNone(gpio.wait_for_edge(15, gpio.BOTH, timeout=10))
+        self.assertRaises(RuntimeError, gpio.wait_for_edge, 15, gpio.BOTH)
+
+    def test_gpio_function(self):
+        gpio = SimulatedGPIO()
+        gpio.setup(15, gpio.IN)
+        gpio.setup(16, gpio.OUT)
+        self.assertEqual([gpio.IN, gpio.OUT, gpio.UNKNOWN], [gpio.gpio_function(ch) for ch in (15, 16, 18)])
+
+    def test_many_robots_are_cheap(self):
+        start = time.perf_counter()
+        robots = [CleaningRobot(SimulatedBackend()) for _ in range(10000)]
+        self.assertEqual(10000, len(robots))
+        self.assertLess(time.perf_counter() - start, 5)
+
+
+class TestRecordingGPIO(TestCase):
+
+    def test_records_pin_sequence(self):
+        gpio = RecordingGPIO()
+        cr = CleaningRobot(SimulatedBackend(gpio=gpio))
+        cr.initialize_robot()
+        cr.execute_command("f")
+        self.assertEqual([1, 0], gpio.writes(CleaningRobot.PWMA))
+        self.assertEqual([1, 0], gpio.writes(CleaningRobot.STBY))
+        self.assertEqual(9, gpio.count())
+
+    def test_entries_are_timestamped(self):
+        clock = VirtualClock(5)
+        gpio = RecordingGPIO(clock=clock)
+        gpio.setup([1, 2], gpio.OUT)
+        gpio.output([1, 2], [True, False])
+        clock.sleep(1)
+        gpio.output(1, False)
+        self.assertEqual([(5, 1, 1), (5, 2, 0), (6, 1, 0)], gpio.entries())
+        self.assertEqual([(5, 1, 1), (6, 1, 0)], gpio.entries(1))
+
+    def test_ring_buffer_keeps_last_writes(self):
+        gpio = RecordingGPIO(capacity=3)
+        gpio.setup(7, gpio.OUT)
+        for value in (1, 0, 1, 1, 0):
+            gpio.output(7, value)
+        self.assertEqual([1, 1, 0], gpio.writes(7))
+        self.assertEqual(3, len(gpio))
+        self.assertEqual(2, gpio.dropped)
+        gpio.clear()
+        self.assertEqual([], gpio.writes(7))
+
+    def test_failed_write_is_not_recorded(self):
+        gpio = RecordingGPIO()
+        self.assertRaises(RuntimeError, gpio.output, 7, 1)
+        self.assertEqual(0, gpio.count())
@@ -0,0 +1,88 @@
+import time
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock.ibs import IBS
+from src.battery import CachedBattery
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCachedBattery(TestCase):
+
+    def setUp(self):
+        self.ibs = Mock()
+        self.ibs.get_charge_left.return_value = 80
+        self.clock = FakeClock()
+        self.battery = CachedBattery(self.ibs, max_age=2, clock=self.clock)
+
+    def test_first_read_is_a_miss(self):
+        self.assertEqual(80, self.battery.get_charge_left())
+        self.assertEqual((0, 1), (self.battery.hits, self.battery.misses))
+
+    def test_fresh_sample_is_served_from_cache(self):
+        self.battery.get_charge_left()
+        self.clock.now = 2
+        self.ibs.get_charge_left.return_value = 70
+        self.assertEqual(80, self.battery.get_charge_left())
+        self.assertEqual(1, self.ibs.get_charge_left.call_count)
+        self.assertEqual(1, self.battery.hits)
+
+    def test_stale_sample_is_read_again(self):
+        self.battery.get_charge_left()
+        self.clock.now = 2.5
+        self.ibs.get_charge_left.return_value = 70
+        self.assertEqual(70, self.battery.get_charge_left())
+        self.assertEqual(2, self.battery.misses)
+
+    def test_sample_age(self):
+        self.assertIsNone(self.battery.sample_age())
+        self.battery.get_charge_left()
+        self.clock.now = 1.5
+        self.assertEqual({"hits": 0, "misses": 1, "sample_age": 1.5}, self.battery.stats())
+
+    def test_invalidate(self):
+        self.battery.get_charge_left()
+        self.battery.invalidate()
+        self.battery.get_charge_left()
+        self.assertEqual(2, self.ibs.get_charge_left.call_count)
+
+    def test_negative_max_age(self):
+        self.assertRaises(CleaningRobotError, CachedBattery, self.ibs, -1)
+
+    def test_sampler_needs_positive_period(self):
+        battery = CachedBattery(self.ibs, max_age=0)
+        self.assertRaises(CleaningRobotError, battery.start)
+        self.assertRaises(CleaningRobotError, battery.start, 0)
+        self.assertIsNone(battery._sampler)
+
+    def test_background_sampler_refreshes_cache(self):
+        battery = CachedBattery(self.ibs, max_age=0.05)
+        battery.start(period=0.005)
+        try:
+            self.ibs.get_charge_left.return_value = 5
+            deadline = time.monotonic() + 1
+            while battery.get_charge_left() != 5 and time.monotonic() < deadline:
+                time.sleep(0.005)
+        finally:
+            battery.stop()
+        self.assertEqual(5, battery.get_charge_left())
+
+    @patch.object(IBS, "get_charge_left")
+    def test_robot_low_battery_trips_within_bound(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        cr.ibs = CachedBattery(cr.ibs, max_age=2, clock=self.clock)
+        self.assertEqual("(0,1,N)", cr.execute_command("f"))
+        mock_ibs.return_value = 10
+        self.clock.now = 2.1
+        self.assertEqual("!(0,1,N)", cr.execute_command("f"))
@@ -0,0 +1,30 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from bench.benchmarks import Measurement, compare, gpio_calls, load_baseline, save_baseline
+
+
+class TestBenchmarks(TestCase):
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        baseline = {"latency": Measurement("latency", 10.0, "us", False),
+                    "throughput": Measurement("throughput", 1000.0, "commands/s", True)}
+        measurements = [Measurement("latency", 12.0, "us", False),
+                        Measurement("throughput", 700.0, "commands/s", True),
+                        Measurement("new", 1.0, "us", False)]
+        regressions = compare(measurements, baseline, threshold=0.25)
+        self.assertEqual(["throughput"], [regression.name for regression in regressions])
+        self.assertEqual(["latency", "throughput"], [r.name for r in compare(measurements, baseline, threshold=0.1)])
+
+    def test_baseline_round_trip(self):
+        measurements = [Measurement("latency", 10.5, "us", False)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            save_baseline(measurements, path)
+            self.assertEqual({"latency": measurements[0]}, load_baseline(path))
+
+    def test_gpio_calls_match_baseline(self):
+        baseline = load_baseline()
+        for measurement in gpio_calls():
+            self.assertEqual(baseline[measurement.name].value, measurement.value, measurement.name)
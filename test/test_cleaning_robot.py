@@ -3,7 +3,7 @@ from unittest.mock import Mock, patch, call
 
 from mock import GPIO
 from mock.ibs import IBS
-from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.cleaning_robot import CleaningRobot, CleaningRobotError, RobotStatus
 
 
 class TestCleaningRobot(TestCase):
@@ -183,3 +183,201 @@ class TestCleaningRobot(TestCase):
         cr.pos_y = 1
         cr.heading = "N"
         self.assertEqual(cr.execute_command("f"), "O(10,1,N)", "Status was not returned properly")
+
+    @patch.object(IBS, "get_charge_left")
+    def test_execute_commands_route(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(1,2,E)", cr.execute_commands("ffrf"))
+
+    @patch.object(IBS, "get_charge_left")
+    def test_step_status_matches_execute_commands(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(0,0,N)", cr.step_status(None))
+        steps = list(cr.iter_commands("ff"))
+        mock_ibs.return_value = 5
+        steps += list(cr.iter_commands("f"))
+        self.assertEqual("!(0,2,N)", cr.step_status(steps[-1]))
+
+    @patch.object(IBS, "get_charge_left")
+    def test_execute_commands_empty_route(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(0,0,N)", cr.execute_commands(""))
+
+    @patch.object(IBS, "get_charge_left")
+    def test_execute_commands_invalid_route(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        self.assertRaises(CleaningRobotError, cr.execute_commands, "ffj")
+        self.assertEqual((0, 0), (cr.pos_x, cr.pos_y), "Robot should not move on an invalid route")
+
+    @patch.object(IBS, "get_charge_left")
+    def test_execute_commands_stops_on_low_battery(self, mock_ibs: Mock):
+        mock_ibs.side_effect = [50, 50, 10, 10]
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("!(0,2,N)", cr.execute_commands("ffff"))
+
+    @patch.object(IBS, "get_charge_left")
+    def test_execute_commands_stops_out_of_borders(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        cr.set_borders(0, 1, 0, 1)
+        self.assertEqual("O(0,2,N)", cr.execute_commands("fffff"))
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "input")
+    def test_execute_commands_stops_on_obstacle(self, mock_infrared_sensor: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        mock_infrared_sensor.side_effect = [False, True]
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(0,1,N)(0,2)", cr.execute_commands("fff"))
+
+    @patch.object(IBS, "get_charge_left")
+    def test_iter_commands_yields_each_step(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        steps = list(cr.iter_commands("fr"))
+        self.assertEqual([(0, 1, "N"), (0, 1, "E")], [(s.pos_x, s.pos_y, s.heading) for s in steps])
+        self.assertIsNone(steps[-1].stop)
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "output")
+    def test_execute_commands_coalesced_moves_start_motor_once(self, mock_output: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(0,4,N)", cr.execute_commands("ffff", coalesce_moves=True))
+        self.assertEqual(1, mock_output.call_args_list.count(call(cr.AIN1, GPIO.HIGH)))
+        self.assertEqual(1, mock_output.call_args_list.count(call(cr.AIN1, GPIO.LOW)))
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "input")
+    def test_execute_commands_coalesced_moves_stop_at_obstacle(self, mock_infrared_sensor: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        mock_infrared_sensor.side_effect = [False, False, True]
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        self.assertEqual("(0,2,N)(0,3)", cr.execute_commands("ffffrf", coalesce_moves=True))
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "output")
+    def test_execute_commands_coalesced_moves_that_cannot_start_leave_motor_off(self, mock_output: Mock,
+                                                                                 mock_ibs: Mock):
+        motor_pins = {CleaningRobot.AIN1, CleaningRobot.AIN2, CleaningRobot.PWMA, CleaningRobot.STBY}
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        mock_output.reset_mock()
+        mock_ibs.return_value = 5
+        self.assertEqual("!(0,0,N)", cr.execute_commands("ff", coalesce_moves=True))
+        mock_ibs.return_value = 50
+        cr.set_borders(1, 5, 0, 5)
+        self.assertEqual("O(0,0,N)", cr.execute_commands("ff", coalesce_moves=True))
+        self.assertEqual([], [c for c in mock_output.call_args_list if c.args[0] in motor_pins])
+
+    @patch.object(IBS, "get_charge_left")
+    def test_execute_commands_coalesced_moves_match_single_moves(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        single = cr.execute_commands("ffrfffllf")
+        cr.initialize_robot()
+        self.assertEqual(single, cr.execute_commands("ffrfffllf", coalesce_moves=True))
+
+    def test_compile_route_cancels_opposite_turns(self):
+        self.assertEqual("ff", CleaningRobot.compile_route("flrf"))
+
+    def test_compile_route_reduces_turn_runs(self):
+        self.assertEqual("flfrrf", CleaningRobot.compile_route("frrrfllf"))
+        self.assertEqual("f", CleaningRobot.compile_route("rrrrf"))
+
+    def test_compile_route_keeps_trailing_turns(self):
+        self.assertEqual("ffl", CleaningRobot.compile_route("ffrrrllll"))
+
+    def test_compile_route_invalid_command(self):
+        self.assertRaises(CleaningRobotError, CleaningRobot.compile_route, "fjf")
+
+    def test_route_displacement(self):
+        self.assertEqual((1, 2, "E"), CleaningRobot.route_displacement("ffrf"))
+        self.assertEqual((2, 1, "N"), CleaningRobot.route_displacement("fflf", heading="E"))
+
+    @patch.object(IBS, "get_charge_left")
+    def test_compiled_route_ends_where_original_route_ends(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        route = "frrrflrrffllllrfl"
+        cr = CleaningRobot()
+        cr.pos_x, cr.pos_y, cr.heading = 5, 5, "N"
+        original = cr.execute_commands(route)
+        cr.pos_x, cr.pos_y, cr.heading = 5, 5, "N"
+        self.assertEqual(original, cr.execute_commands(CleaningRobot.compile_route(route)))
+        dx, dy, heading = CleaningRobot.route_displacement(route)
+        self.assertEqual(original, f"({5 + dx},{5 + dy},{heading})")
+
+    @patch.object(GPIO, "output")
+    def test_structured_status_within_borders(self, mock_output: Mock):
+        cr = CleaningRobot()
+        cr.pos_x, cr.pos_y, cr.heading = 2, 3, "S"
+        status = cr.status()
+        self.assertEqual((2, 3, "S", False), (status.x, status.y, status.heading, status.out_of_bounds))
+        self.assertEqual(cr.robot_status(), str(status))
+
+    @patch.object(GPIO, "output")
+    def test_structured_status_out_of_borders(self, mock_output: Mock):
+        cr = CleaningRobot()
+        cr.pos_x, cr.pos_y, cr.heading = 10, 3, "N"
+        status = cr.status()
+        self.assertTrue(status.out_of_bounds)
+        self.assertEqual("O(10,3,N)", str(status))
+        mock_output.assert_called_once_with(11, True)
+        self.assertTrue(cr.warning_led_on)
+
+    @patch.object(GPIO, "output")
+    def test_structured_status_writes_warning_led_only_on_change(self, mock_output: Mock):
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        record = cr.status()
+        self.assertIs(record, cr.status(into=record))
+        mock_output.assert_not_called()
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "input")
+    def test_structured_status_reports_obstacle(self, mock_infrared_sensor: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        mock_infrared_sensor.return_value = True
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        result = cr.execute_command("f")
+        status = cr.status()
+        self.assertEqual((0, 1), status.obstacle)
+        self.assertEqual(result, str(status))
+        mock_infrared_sensor.return_value = False
+        cr.execute_command("f")
+        self.assertIsNone(cr.status().obstacle)
+
+    @patch.object(IBS, "get_charge_left")
+    def test_structured_status_reports_low_battery(self, mock_ibs: Mock):
+        mock_ibs.return_value = 5
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        result = cr.execute_command("f")
+        status = cr.status()
+        self.assertTrue(status.low_battery)
+        self.assertEqual(result, str(status))
+
+    def test_structured_status_invalid_heading(self):
+        cr = CleaningRobot()
+        cr.pos_x, cr.pos_y, cr.heading = 0, 0, "J"
+        self.assertRaises(CleaningRobotError, cr.status)
+
+    def test_structured_status_legacy_format(self):
+        self.assertEqual("!O(10,3,N)", str(RobotStatus(10, 3, "N", out_of_bounds=True, low_battery=True)))
+        self.assertEqual("(0,0,N)(0,1)", str(RobotStatus(0, 0, "N", obstacle=(0, 1))))
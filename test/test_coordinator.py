@@ -0,0 +1,106 @@
+import time
+from unittest import TestCase
+
+from mock.backend import SimulatedBackend
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.coordinator import Coordinator
+from src.scenario_runner import ScenarioInfrared
+
+
+class TestCoordinator(TestCase):
+
+    def setUp(self):
+        self.coordinator = Coordinator()
+        self.robots = {}
+
+    def add(self, robot_id, x, y, heading, obstacles=frozenset()):
+        robot = CleaningRobot(SimulatedBackend())
+        robot.set_borders(-1000, 1000, -1000, 1000)
+        robot.pos_x, robot.pos_y, robot.heading = x, y, heading
+        robot.obstacle_sensor = ScenarioInfrared(robot, obstacles)
+        self.coordinator.add_robot(robot_id, robot)
+        self.robots[robot_id] = robot
+        return robot
+
+    def run_checked(self):
+        while True:
+            more = self.coordinator.step()
+            cells = [(robot.pos_x, robot.pos_y) for robot in self.robots.values()]
+            self.assertEqual(len(cells), len(set(cells)), f"Robots collided at tick {self.coordinator.tick}")
+            if not more:
+                return
+
+    def test_crossing_robots_wait_for_each_other(self):
+        first = self.add("a", 0, 2, CleaningRobot.E)
+        second = self.add("b", 2, 0, CleaningRobot.N)
+        self.assertEqual(0, self.coordinator.submit("a", "ffff"))
+        self.assertGreater(self.coordinator.submit("b", "ffff"), 0)
+        self.run_checked()
+        self.assertEqual((4, 2), (first.pos_x, first.pos_y))
+        self.assertEqual((2, 4), (second.pos_x, second.pos_y))
+
+    def test_follower_keeps_its_distance(self):
+        self.add("a", 1, 0, CleaningRobot.E)
+        follower = self.add("b", 0, 0, CleaningRobot.E)
+        self.coordinator.submit("a", "fff")
+        self.coordinator.submit("b", "fff")
+        self.assertEqual("b", self.coordinator.occupant(0, 0))
+        self.run_checked()
+        self.assertEqual((3, 0), (follower.pos_x, follower.pos_y))
+
+    def test_route_through_standing_robot_is_rejected(self):
+        self.add("a", 1, 0, CleaningRobot.E)
+        self.add("b", 0, 0, CleaningRobot.E)
+        self.assertRaises(CleaningRobotError, self.coordinator.submit, "b", "ff")
+        self.assertEqual(0, self.coordinator.submit("b", "lf"))
+
+    def test_routes_are_queued_per_robot(self):
+        robot = self.add("a", 0, 0, CleaningRobot.N)
+        self.coordinator.submit("a", "ff")
+        self.coordinator.submit("a", "rf")
+        self.assertEqual(4, self.coordinator.run())
+        self.assertEqual((1, 2, CleaningRobot.E), (robot.pos_x, robot.pos_y, robot.heading))
+
+    def test_robot_stopped_by_obstacle_makes_others_replan(self):
+        blocked = self.add("a", 0, 0, CleaningRobot.E, obstacles=frozenset({(2, 0)}))
+        other = self.add("b", 1, -3, CleaningRobot.N)
+        self.coordinator.submit("a", "ffff")
+        self.assertEqual(1, self.coordinator.submit("b", "ffffff"), "b should wait for a to leave (1,0)")
+        self.run_checked()
+        self.assertEqual((1, 0), (blocked.pos_x, blocked.pos_y))
+        self.assertEqual((1, -1), (other.pos_x, other.pos_y), "b should stop short of the cell a stands on")
+
+    def test_route_ending_on_a_later_crossing_is_rejected(self):
+        self.add("a", -5, 0, CleaningRobot.E)
+        self.add("b", 3, 2, CleaningRobot.S)
+        self.assertEqual(0, self.coordinator.submit("a", "f" * 10))
+        self.assertRaises(CleaningRobotError, self.coordinator.submit, "b", "ff")
+        self.assertEqual(0, self.coordinator.submit("b", "f"))
+        self.run_checked()
+
+    def test_routes_that_cannot_be_replanned_are_reported(self):
+        self.add("a", 0, 0, CleaningRobot.E, obstacles=frozenset({(2, 0)}))
+        self.add("b", 1, -1, CleaningRobot.N)
+        self.coordinator.submit("a", "fff")
+        self.coordinator.submit("b", "ff")
+        self.run_checked()
+        self.assertEqual([("a", "f"), ("b", "ff")], self.coordinator.dropped)
+
+    def test_cell_taken_by_another_robot(self):
+        self.add("a", 0, 0, CleaningRobot.N)
+        self.assertRaises(CleaningRobotError, self.add, "b", 0, 0, CleaningRobot.N)
+        self.assertRaises(CleaningRobotError, self.coordinator.submit, "a", "fx")
+
+    def test_hundreds_of_robots(self):
+        # 150 robots driving east along even rows cross 150 robots driving north along even columns
+        for index in range(150):
+            self.add(("east", index), -1, 2 * index, CleaningRobot.E)
+            self.add(("north", index), 2 * index, -1, CleaningRobot.N)
+        started_at = time.perf_counter()
+        for robot_id in self.robots:
+            self.coordinator.submit(robot_id, "f" * 302)
+        self.run_checked()
+        self.assertLess(time.perf_counter() - started_at, 30)
+        for (direction, index), robot in self.robots.items():
+            expected = (301, 2 * index) if direction == "east" else (2 * index, 301)
+            self.assertEqual(expected, (robot.pos_x, robot.pos_y))
@@ -0,0 +1,84 @@
+import random
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.coverage_planner import CoveragePlanner
+from src.room_map import RoomMap
+
+
+class TestCoveragePlanner(TestCase):
+
+    def drive(self, room_map: RoomMap, route: str, x: int, y: int, heading: str) -> set:
+        visited = {(x, y)}
+        for command in route:
+            if command == CleaningRobot.FORWARD:
+                x, y = x + CleaningRobot.DELTAS[heading][0], y + CleaningRobot.DELTAS[heading][1]
+                self.assertTrue(room_map.contains(x, y), "The robot left the room")
+                self.assertFalse(room_map.is_obstacle(x, y), "The robot hit an obstacle")
+                visited.add((x, y))
+            else:
+                heading = CleaningRobot.route_displacement(command, heading)[2]
+        return visited
+
+    def test_empty_room_is_swept_along_rows(self):
+        plan = CoveragePlanner(RoomMap(0, 3, 0, 1)).plan(0, 0, "E")
+        self.assertEqual("ffflflfff", plan.route)
+        self.assertEqual(100.0, plan.coverage)
+        self.assertEqual(9, plan.actuation_time)
+
+    def test_tall_room_is_swept_along_columns(self):
+        plan = CoveragePlanner(RoomMap(0, 1, 0, 3)).plan(0, 0, "N")
+        self.assertEqual("fffrfrfff", plan.route)
+
+    def test_covers_every_free_cell_around_obstacles(self):
+        room_map = RoomMap(0, 9, 0, 6)
+        for x, y in [(3, 0), (3, 1), (3, 2), (6, 4), (6, 5), (6, 6), (1, 5), (8, 1)]:
+            room_map.set(x, y, RoomMap.OBSTACLE)
+        plan = CoveragePlanner(room_map).plan(0, 0, "N")
+        visited = self.drive(room_map, plan.route, 0, 0, "N")
+        self.assertEqual(70 - 8, len(visited))
+        self.assertEqual(100.0, plan.coverage)
+
+    def test_actuation_time_counts_turns_and_moves(self):
+        plan = CoveragePlanner(RoomMap(0, 4, 0, 4), forward_cost=0.5, turn_cost=2).plan(0, 0, "E")
+        turns = len(plan.route) - plan.route.count("f")
+        self.assertEqual(plan.route.count("f") * 0.5 + turns * 2, plan.actuation_time)
+
+    def test_unreachable_area_is_not_covered(self):
+        room_map = RoomMap(0, 4, 0, 4)
+        for y in range(5):
+            room_map.set(2, y, RoomMap.OBSTACLE)
+        plan = CoveragePlanner(room_map).plan(0, 0, "N")
+        self.assertEqual(50.0, plan.coverage)
+        self.drive(room_map, plan.route, 0, 0, "N")
+
+    def test_unreachable_lanes_are_not_planned_to(self):
+        room_map = RoomMap(0, 99, 0, 9)
+        for y in range(10):
+            room_map.set(50, y, RoomMap.OBSTACLE)
+        room_map.set(75, 5, RoomMap.OBSTACLE)
+        planner = CoveragePlanner(room_map)
+        with patch.object(planner.path_planner, "plan", wraps=planner.path_planner.plan) as plan:
+            coverage = planner.plan(0, 0, "N").coverage
+        plan.assert_not_called()
+        self.assertEqual(100.0 * 500 / (1000 - 11), coverage)
+
+    def test_scattered_obstacles_are_joined_around_locally(self):
+        room_map = RoomMap(0, 199, 0, 199)
+        generator = random.Random(0)
+        for _ in range(800):
+            room_map.set(generator.randrange(200), generator.randrange(200), RoomMap.OBSTACLE)
+        room_map.set(0, 0, RoomMap.FREE)
+        planner = CoveragePlanner(room_map)
+        with patch.object(planner.path_planner, "plan", wraps=planner.path_planner.plan) as plan:
+            result = planner.plan(0, 0, "N")
+        plan.assert_not_called()
+        visited = self.drive(room_map, result.route, 0, 0, "N")
+        self.assertEqual(200 * 200 - room_map.count(RoomMap.OBSTACLE), len(visited))
+        self.assertEqual(100.0, result.coverage)
+
+    def test_invalid_starting_cell(self):
+        room_map = RoomMap(0, 4, 0, 4)
+        room_map.set(0, 0, RoomMap.OBSTACLE)
+        self.assertRaises(CleaningRobotError, CoveragePlanner(room_map).plan, 0, 0, "N")
@@ -0,0 +1,122 @@
+from unittest import TestCase
+
+from mock.backend import SimulatedBackend
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.energy_model import EnergyModel
+from src.room_map import RoomMap
+from src.virtual_clock import attach_virtual_clock
+
+
+class TestEnergyModel(TestCase):
+
+    def setUp(self):
+        self.backend = SimulatedBackend(charge=30)
+        self.robot = CleaningRobot(self.backend)
+        self.robot.initialize_robot()
+        self.robot.set_borders(-50, 50, -50, 50)
+
+    def test_learns_drains(self):
+        model = EnergyModel(prior_weight=1e-6)
+        model.learn(10, 0, 10, 6.0)
+        model.learn(0, 4, 4, 1.4)
+        model.learn(5, 5, 0, 3.75)
+        self.assertAlmostEqual(0.5, model.forward, places=3)
+        self.assertAlmostEqual(0.25, model.rotation, places=3)
+        self.assertAlmostEqual(0.1, model.brush, places=3)
+
+    def test_learns_from_ibs_readings(self):
+        attach_virtual_clock(self.robot, charge=100, drains={CleaningRobot.WHEEL_MOTOR: 0.5})
+        model = EnergyModel(max_actuations=10)
+        model.attach(self.robot)
+        self.robot.execute_commands("f" * 40)
+        self.assertAlmostEqual(0.5, model.forward, places=1)
+
+    def test_reduces_ibs_reads(self):
+        attach_virtual_clock(self.robot, charge=100, drains={CleaningRobot.WHEEL_MOTOR: 0.5})
+        model = EnergyModel(max_actuations=20)
+        model.attach(self.robot)
+        self.assertEqual("(0,40,N)", self.robot.execute_commands("f" * 40))
+        # Every reading until the forward drain is fitted to three of them, then one every 20 moves
+        self.assertEqual(5, model.reads)
+        self.assertEqual(35, model.predictions)
+
+    def test_unknown_drain_forces_reads(self):
+        model = EnergyModel(forward=1.0, max_actuations=100)
+        model.attach(self.robot)
+        self.robot.execute_commands("fff")
+        self.assertEqual(1, model.reads)
+        # Read before each command following a rotation, as long as the rotation drain is unknown
+        self.robot.execute_commands("rrr")
+        self.assertEqual(3, model.reads)
+
+    def test_reads_ibs_after_max_age(self):
+        clock = attach_virtual_clock(self.robot, charge=100)
+        model = EnergyModel(forward=1.0, max_actuations=100, max_age=2.5)
+        model.attach(self.robot)
+        self.robot.execute_commands("ffff")
+        self.assertEqual(2, model.reads)
+        self.assertEqual(4, clock())
+
+    def test_counts_idle_brush_time_and_switches(self):
+        clock = attach_virtual_clock(self.robot, charge=100)
+        model = EnergyModel(forward=1.0, brush=0.5)
+        model.attach(self.robot)
+        model.refresh()
+        self.robot.manage_cleaning_system()
+        clock.sleep(10)
+        self.assertAlmostEqual(100 - 0.5 * (CleaningRobot.CLEANING_SYSTEM_SWITCH_TIME + 10), model.get_charge_left())
+
+    def test_reads_ibs_near_low_battery(self):
+        model = EnergyModel(forward=1.0, margin=5)
+        model.attach(self.robot)
+        self.backend.ibs.charge = 14
+        self.robot.execute_commands("fff")
+        self.assertEqual(3, model.reads)
+
+    def test_command_budget(self):
+        model = EnergyModel(forward=0.5, brush=0.1)
+        model.attach(self.robot)
+        self.assertEqual(30, model.command_budget())
+        self.assertEqual(36, model.command_budget(cleaning=False))
+        self.assertTrue(model.fits("f" * 30))
+        self.assertFalse(model.fits("f" * 31))
+
+    def test_plan_keeps_route_that_fits(self):
+        model = EnergyModel(forward=1.0, margin=0)
+        model.attach(self.robot)
+        plan = model.plan_route(self.robot, "ffrrff")
+        self.assertEqual(("ffrrff", 6, ""), plan[:3])
+
+    def test_plan_truncates_and_returns_to_dock(self):
+        model = EnergyModel(forward=1.0, margin=0)
+        model.attach(self.robot)
+        plan = model.plan_route(self.robot, "f" * 20)
+        self.assertEqual(10, plan.kept)
+        self.assertEqual("rr" + "f" * 10, plan.dock_route)
+        self.assertEqual("f" * 10 + "rr" + "f" * 10, plan.route)
+        self.assertEqual(20, plan.drain)
+        self.assertEqual("(0,0,S)", self.robot.execute_commands(plan.route))
+
+    def test_plan_checks_route_to_dock_around_obstacles(self):
+        model = EnergyModel(forward=1.0, margin=0)
+        model.attach(self.robot)
+        self.robot.room_map = RoomMap(-50, 50, -50, 50)
+        for x in range(-4, 5):
+            self.robot.room_map.set(x, 5, RoomMap.OBSTACLE)
+        self.robot.pos_y = 8
+        # Straight back to the dock would fit after the whole route, the way around the wall does not
+        plan = model.plan_route(self.robot, "ff")
+        self.assertEqual(1, plan.kept)
+        self.assertEqual(19, plan.dock_route.count("f"))
+        self.assertLessEqual(plan.drain, 20)
+
+    def test_plan_without_enough_charge(self):
+        model = EnergyModel(forward=1.0, margin=0)
+        model.attach(self.robot)
+        self.robot.pos_x, self.robot.pos_y = 15, 15
+        self.assertRaises(CleaningRobotError, model.plan_route, self.robot, "f")
+
+    def test_invalid_route(self):
+        model = EnergyModel()
+        model.attach(self.robot)
+        self.assertRaises(CleaningRobotError, model.plan_route, self.robot, "fx")
@@ -0,0 +1,96 @@
+import random
+from unittest import TestCase, skipIf
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+
+try:
+    import numpy as np
+    from src.fleet_simulator import FleetSimulator
+except ImportError:
+    np = None
+
+
+@skipIf(np is None, "NumPy is not installed")
+class TestFleetSimulator(TestCase):
+
+    def test_encode_routes(self):
+        codes = FleetSimulator.encode(["fl", "rf"])
+        self.assertEqual([[FleetSimulator.FORWARD, FleetSimulator.RIGHT],
+                          [FleetSimulator.LEFT, FleetSimulator.FORWARD]], codes.tolist())
+
+    def test_encode_invalid_command(self):
+        self.assertRaises(CleaningRobotError, FleetSimulator.encode, ["fj"])
+
+    def test_encode_routes_of_different_length(self):
+        self.assertRaises(CleaningRobotError, FleetSimulator.encode, ["ff", "f"])
+
+    def test_step_moves_and_rotates(self):
+        fleet = FleetSimulator(2)
+        fleet.step(np.array([FleetSimulator.FORWARD, FleetSimulator.RIGHT]))
+        self.assertEqual(["(0,1,N)", "(0,0,E)"], fleet.statuses())
+
+    def test_low_battery(self):
+        fleet = FleetSimulator(2, battery=[10, 11])
+        fleet.step(np.array([FleetSimulator.FORWARD, FleetSimulator.FORWARD]))
+        self.assertEqual(["!(0,0,N)", "(0,1,N)"], fleet.statuses())
+
+    def test_out_of_bounds(self):
+        fleet = FleetSimulator(1, borders=(0, 1, 0, 1))
+        fleet.run(FleetSimulator.encode(["fff"]))
+        self.assertEqual("O(0,2,N)", fleet.status(0))
+
+    def test_obstacle(self):
+        obstacles = np.zeros((10, 10), dtype=bool)
+        obstacles[2, 0] = True
+        fleet = FleetSimulator(1, obstacles=obstacles)
+        fleet.run(FleetSimulator.encode(["ff"]))
+        self.assertEqual("(0,1,N)(0,2)", fleet.status(0))
+
+    def test_battery_drain(self):
+        fleet = FleetSimulator(1, battery=12, forward_drain=1, turn_drain=0.5)
+        fleet.run(FleetSimulator.encode(["frff"]))
+        self.assertEqual("!(1,1,E)", fleet.status(0))
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "input")
+    def test_matches_execute_command(self, mock_infrared_sensor: Mock, mock_ibs: Mock):
+        generator = random.Random(7)
+        robots, steps = 20, 60
+        obstacles = np.array([[generator.random() < 0.15 for _ in range(12)] for _ in range(12)])
+        routes = ["".join(generator.choice("lrff") for _ in range(steps)) for _ in range(robots)]
+        batteries = [generator.randint(11, 40) for _ in range(robots)]
+        borders = (0, 8, 0, 8)
+
+        fleet = FleetSimulator(robots, borders=borders, battery=batteries, obstacles=obstacles, forward_drain=1)
+        expected = []
+        for robot in range(robots):
+            cr = CleaningRobot()
+            cr.initialize_robot()
+            cr.set_borders(*borders)
+            charge = [batteries[robot]]
+
+            def read_charge():
+                return charge[0]
+
+            def read_infrared(pin, cr=cr):
+                x = cr.pos_x + CleaningRobot.DELTAS[cr.heading][0]
+                y = cr.pos_y + CleaningRobot.DELTAS[cr.heading][1]
+                return 0 <= x < 12 and 0 <= y < 12 and bool(obstacles[y, x])
+
+            mock_ibs.side_effect = read_charge
+            mock_infrared_sensor.side_effect = read_infrared
+            statuses = []
+            for command in routes[robot]:
+                actuated = charge[0] > 10 and 0 <= cr.pos_x <= 8 and 0 <= cr.pos_y <= 8
+                statuses.append(cr.execute_command(command))
+                if command == "f" and actuated:
+                    charge[0] -= 1
+            expected.append(statuses)
+
+        codes = FleetSimulator.encode(routes)
+        for step in range(steps):
+            fleet.step(codes[step])
+            self.assertEqual([expected[robot][step] for robot in range(robots)], fleet.statuses())
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from mock.backend import SimulatedBackend
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.journal import BATTERY, COMMAND, GPIO_WRITE, INFRARED, STATUS, Journal, JournalReader, replay
+from src.scenario_runner import ScenarioInfrared
+from src.virtual_clock import attach_virtual_clock
+
+
+class TestJournal(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "mission.journal")
+        self.backend = SimulatedBackend(charge=50)
+        self.robot = CleaningRobot(self.backend)
+        self.clock = attach_virtual_clock(self.robot)
+        self.robot.ibs = self.backend.ibs
+        self.robot.initialize_robot()
+        self.journal = Journal(self.path, clock=self.clock, buffer_size=64)
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def test_records_command_readings_writes_and_status(self):
+        self.journal.attach(self.robot)
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.journal.close()
+        reader = JournalReader(self.path)
+        kinds = [record.kind for record in reader]
+        reader.close()
+        self.assertEqual([COMMAND, BATTERY], kinds[2:4])
+        self.assertIn(GPIO_WRITE, kinds)
+        self.assertEqual([INFRARED, STATUS], kinds[-3:-1])
+        self.assertEqual(GPIO_WRITE, kinds[-1], "The warning LED is written by robot_status()")
+
+    def test_replay_reproduces_mission(self):
+        self.robot.obstacle_sensor = ScenarioInfrared(self.robot, frozenset({(2, 3)}))
+        self.journal.attach(self.robot)
+        self.robot.manage_cleaning_system()
+        self.robot.execute_commands("ffrfflfff", coalesce_moves=True)
+        self.robot.set_borders(0, 2, 0, 9)
+        self.robot.execute_commands("rf")
+        self.backend.ibs.charge = 5
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.journal.close()
+
+        result = replay(self.path)
+        self.assertEqual([], result.mismatches)
+        self.assertEqual(10, result.commands)
+        self.assertEqual((3, 2, CleaningRobot.E), (result.robot.pos_x, result.robot.pos_y, result.robot.heading))
+        self.assertEqual([0, 2, 0, 9], result.robot.borders)
+        self.assertTrue(result.robot.cleaning_system_on)
+
+    def test_replay_finds_unexplained_status(self):
+        self.journal.attach(self.robot)
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.robot.pos_x = 7
+        self.journal.status(self.robot, None, None)
+        self.journal.close()
+        self.assertEqual(1, len(replay(self.path).mismatches))
+
+    def test_replay_checks_stop_reason_and_blocked_cell(self):
+        self.robot.obstacle_sensor = ScenarioInfrared(self.robot, frozenset({(0, 1)}))
+        self.journal.attach(self.robot)
+        self.assertEqual("(0,0,N)(0,1)", self.robot.execute_command(CleaningRobot.FORWARD))
+        self.journal.status(self.robot, CleaningRobot.OBSTACLE, (5, 5))
+        self.journal.status(self.robot, None, None)
+        self.journal.close()
+        self.assertEqual(2, len(replay(self.path).mismatches))
+
+    def test_clock_defaults_to_robot_clock(self):
+        journal = Journal(os.path.join(self.directory.name, "other.journal"))
+        self.addCleanup(journal.close)
+        journal.attach(self.robot)
+        self.assertIs(self.clock, journal.clock)
+        robot = CleaningRobot(SimulatedBackend())
+        journal = Journal(os.path.join(self.directory.name, "monotonic.journal"))
+        self.addCleanup(journal.close)
+        journal.attach(robot)
+        self.assertIs(time.monotonic, journal.clock)
+
+    def test_search_by_time_and_position(self):
+        self.journal.attach(self.robot)
+        self.robot.execute_commands("ffrf")
+        self.journal.close()
+        reader = JournalReader(self.path)
+        self.assertEqual([(0, 2, CleaningRobot.N), (0, 2, CleaningRobot.E)],
+                         [(record.x, record.y, chr(record.code)) for record in reader.visits(0, 2)])
+        self.assertEqual(0, reader.find_time(0))
+        statuses = [record for record in reader.between(2, 3) if record.kind == STATUS]
+        self.assertEqual([(0, 2)], [(record.x, record.y) for record in statuses])
+        self.assertEqual(len(reader), reader.find_time(100))
+        reader.close()
+
+    def test_partial_record_is_ignored(self):
+        self.journal.attach(self.robot)
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.journal.close()
+        records = len(JournalReader(self.path))
+        with open(self.path, "ab") as file:
+            file.write(b"\1\2\3")
+        self.assertEqual(records, len(JournalReader(self.path)))
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as file:
+            file.write(b"\0" * 64)
+        self.assertRaises(CleaningRobotError, JournalReader, self.path)
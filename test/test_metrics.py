@@ -0,0 +1,88 @@
+import os
+import tempfile
+import urllib.request
+from unittest import TestCase
+
+from mock.backend import SimulatedBackend
+from src.cleaning_robot import CleaningRobot
+from src.metrics import Histogram, RobotMetrics
+from src.scenario_runner import ScenarioInfrared
+from src.virtual_clock import VirtualClock
+
+
+class TestRobotMetrics(TestCase):
+
+    def setUp(self):
+        self.backend = SimulatedBackend()
+        self.robot = CleaningRobot(self.backend)
+        self.robot.clock = VirtualClock()
+        self.robot.initialize_robot()
+        self.metrics = RobotMetrics("r1", clock=self.robot.clock)
+        self.metrics.attach(self.robot)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((1, 2))
+        for value in (0.5, 1, 1.5, 3):
+            histogram.observe(value)
+        self.assertEqual([2, 1, 1], histogram.counts)
+        self.assertEqual(['x_bucket{le="1"} 2', 'x_bucket{le="2"} 3', 'x_bucket{le="+Inf"} 4',
+                          'x_sum{} 6.0', 'x_count{} 4'], histogram.render('x', ''))
+
+    def test_command_latency_and_motor_on_time(self):
+        self.robot.execute_commands("ffr")
+        forward = self.metrics.command_latency[CleaningRobot.FORWARD]
+        self.assertEqual(2, forward.count)
+        self.assertEqual(2.0, forward.sum)
+        self.assertEqual(1, self.metrics.command_latency[CleaningRobot.RIGHT].count)
+        self.assertEqual({CleaningRobot.WHEEL_MOTOR: 2.0, CleaningRobot.ROTATION_MOTOR: 1.0},
+                         self.metrics.motor_on_time)
+
+    def test_gpio_writes_per_command(self):
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.assertEqual(1, self.metrics.gpio_writes.count)
+        self.assertEqual(8, self.metrics.gpio_writes.sum)
+        self.assertEqual(9, self.metrics.gpio_writes_total, "The warning LED is written after the command")
+
+    def test_ibs_reads_are_timed(self):
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.assertEqual(1, self.metrics.ibs_latency.count)
+
+    def test_stop_counts(self):
+        self.robot.obstacle_sensor = ScenarioInfrared(self.robot, frozenset({(0, 1)}))
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.robot.pos_y = 20
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.backend.ibs.charge = 5
+        self.robot.execute_command(CleaningRobot.FORWARD)
+        self.assertEqual({CleaningRobot.LOW_BATTERY: 1, CleaningRobot.OUT_OF_BOUNDS: 1, CleaningRobot.OBSTACLE: 1},
+                         self.metrics.stops)
+        self.assertIn('cleaning_robot_stops_total{robot="r1",reason="obstacle"} 1', self.metrics.render())
+
+    def test_render_prometheus_text(self):
+        self.robot.execute_command(CleaningRobot.LEFT)
+        text = self.metrics.render()
+        self.assertIn('cleaning_robot_command_duration_seconds_bucket{robot="r1",command="l",le="1"} 1', text)
+        self.assertIn('cleaning_robot_command_duration_seconds_count{robot="r1",command="f"} 0', text)
+        self.assertIn('cleaning_robot_motor_on_seconds_total{robot="r1",motor="rotation"} 1.0', text)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_write_textfile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "robot.prom")
+            self.metrics.write_textfile(path)
+            with open(path) as file:
+                self.assertEqual(self.metrics.render(), file.read())
+
+    def test_http_server(self):
+        host, port = self.metrics.start_http_server()
+        try:
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                self.assertEqual(self.metrics.render(), response.read().decode("utf-8"))
+        finally:
+            self.metrics.stop_http_server()
+
+    def test_robot_without_metrics(self):
+        robot = CleaningRobot(SimulatedBackend())
+        robot.initialize_robot()
+        self.assertIsNone(robot.metrics)
+        self.assertEqual("(0,1,N)", robot.execute_command(CleaningRobot.FORWARD))
@@ -0,0 +1,111 @@
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from mock.backend import SimulatedBackend
+from src.async_cleaning_robot import AsyncCleaningRobot
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.coverage_planner import CoveragePlanner
+from src.energy_model import EnergyModel
+from src.motion import MotionCalibration, MotionController
+from src.path_planner import PathPlanner
+from src.room_map import RoomMap
+from src.virtual_clock import attach_virtual_clock
+
+
+class TestMotion(TestCase):
+
+    def setUp(self):
+        self.backend = SimulatedBackend(charge=100)
+        self.robot = CleaningRobot(self.backend)
+        self.robot.initialize_robot()
+        self.robot.set_borders(-50, 50, -50, 50)
+        self.clock = attach_virtual_clock(self.robot, charge=100)
+        self.calibration = MotionCalibration(cell_time=0.5, quarter_turn_time=0.3, ramp_time=0.1)
+        self.motion = MotionController(self.calibration)
+        self.motion.attach(self.robot)
+
+    def test_attach_overrides_timings(self):
+        self.assertIs(self.motion, self.robot.motion)
+        self.assertAlmostEqual(0.4, self.robot.WHEEL_MOVE_TIME)
+        self.assertAlmostEqual(0.5, self.robot.WHEEL_CRUISE_TIME)
+        self.assertAlmostEqual(0.2, self.robot.ROTATION_TIME)
+        self.assertEqual(1, CleaningRobot.WHEEL_MOVE_TIME)
+
+    def test_forward_takes_calibrated_time(self):
+        self.assertEqual("(0,1,N)", self.robot.execute_command("f"))
+        self.assertAlmostEqual(self.motion.move_time(1), self.clock())
+        self.assertAlmostEqual(0.6, self.clock())
+
+    def test_rotation_takes_calibrated_time(self):
+        self.assertEqual("(0,0,E)", self.robot.execute_command("r"))
+        self.assertAlmostEqual(self.motion.turn_time(), self.clock())
+
+    def test_coalesced_run_ramps_once(self):
+        self.assertEqual("(0,3,N)", self.robot.execute_commands("fff", coalesce_moves=True))
+        self.assertAlmostEqual(self.motion.move_time(3), self.clock())
+
+    def test_duty_cycle_ramps(self):
+        self.robot.execute_command("f")
+        pwm = self.motion.pwms[CleaningRobot.WHEEL_MOTOR]
+        self.assertEqual([0, 10.0, 30.0, 50.0, 70.0, 90.0, 100.0, 90.0, 70.0, 50.0, 30.0, 10.0, 0],
+                         pwm.duty_cycles)
+        self.assertEqual([0], self.motion.pwms[CleaningRobot.ROTATION_MOTOR].duty_cycles)
+        self.assertEqual(self.calibration.frequency, pwm.frequency)
+
+    def test_faster_than_default_timings(self):
+        default = CleaningRobot(SimulatedBackend(charge=100))
+        default.initialize_robot()
+        default.set_borders(-50, 50, -50, 50)
+        default_clock = attach_virtual_clock(default, charge=100)
+        route = "ffrffrfflff"
+        self.assertEqual(default.execute_commands(route), self.robot.execute_commands(route))
+        self.assertLess(self.clock(), default_clock())
+
+    def test_invalid_calibration(self):
+        self.assertRaises(CleaningRobotError, MotionController, MotionCalibration(0.1, 0.3, ramp_time=0.2))
+        self.assertRaises(CleaningRobotError, MotionController, MotionCalibration(0.5, 0.1, ramp_time=0.2))
+        self.assertRaises(CleaningRobotError, MotionController, MotionCalibration(0.5, 0.3, cruise_duty=120))
+
+    def test_routes_are_costed_with_calibrated_times(self):
+        self.assertAlmostEqual(0.6, self.robot.actuation_time(CleaningRobot.FORWARD))
+        self.assertAlmostEqual(0.4, self.robot.actuation_time(CleaningRobot.LEFT))
+        room_map = RoomMap(0, 9, 0, 9)
+        self.robot.room_map = room_map
+        planner = PathPlanner.for_robot(self.robot)
+        self.assertEqual((0.6, 0.4), (planner.forward_cost, planner.turn_cost))
+        self.assertEqual((0.6, 0.4), (CoveragePlanner.for_robot(self.robot).forward_cost,
+                                      CoveragePlanner.for_robot(self.robot).turn_cost))
+
+    def test_energy_model_counts_ramps_as_brush_time(self):
+        model = EnergyModel(forward=1.0, brush=1.0)
+        model.attach(self.robot)
+        self.robot.cleaning_system_on = True
+        model.refresh()
+        self.robot.execute_command("f")
+        self.assertAlmostEqual(1.0 + self.motion.move_time(1), model.drain(*model._counts))
+        self.assertAlmostEqual(1.0 + 0.6, model.route_drain("f"))
+
+
+class TestAsyncMotion(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.robot = AsyncCleaningRobot(SimulatedBackend(charge=100))
+        self.robot.initialize_robot()
+        self.clock = attach_virtual_clock(self.robot, charge=100)
+        self.motion = MotionController(MotionCalibration(cell_time=0.5, quarter_turn_time=0.3, ramp_time=0.1))
+        self.motion.attach(self.robot)
+
+    async def test_ramps_are_awaited(self):
+        with patch.object(time, "sleep") as sleep:
+            self.assertEqual("(0,1,N)", await self.robot.execute_command_async("f"))
+            sleep.assert_not_called()
+        self.assertAlmostEqual(self.motion.move_time(1), self.clock())
+        self.assertEqual([0, 10.0, 30.0, 50.0, 70.0, 90.0, 100.0, 90.0, 70.0, 50.0, 30.0, 10.0, 0],
+                         self.motion.pwms[CleaningRobot.WHEEL_MOTOR].duty_cycles)
+
+    async def test_emergency_stop_cuts_motor_at_once(self):
+        self.robot.start_wheel_motor()
+        self.robot.emergency_stop()
+        self.assertEqual([0, 10.0, 30.0, 50.0, 70.0, 90.0, 100.0, 0],
+                         self.motion.pwms[CleaningRobot.WHEEL_MOTOR].duty_cycles)
@@ -0,0 +1,91 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot
+from src.obstacle_sensor import ObstacleSensor
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestObstacleSensor(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sensor = ObstacleSensor(GPIO, CleaningRobot.INFRARED_PIN, debounce=0.01, clock=self.clock)
+        self.sensor.start()
+
+    def tearDown(self):
+        self.sensor.stop()
+        GPIO.cleanup()
+
+    def test_rising_edge_sets_obstacle(self):
+        self.clock.now = 1
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.HIGH)
+        self.assertEqual((True, 1), self.sensor.state())
+
+    def test_falling_edge_clears_obstacle(self):
+        self.clock.now = 1
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.HIGH)
+        self.clock.now = 2
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.LOW)
+        self.assertEqual((False, 2), self.sensor.state())
+
+    def test_bounce_is_ignored(self):
+        self.clock.now = 1
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.HIGH)
+        self.clock.now = 1.005
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.LOW)
+        self.assertTrue(self.sensor.obstacle)
+        self.assertEqual(1, self.sensor.bounces)
+
+    def test_level_change_hidden_by_bounce_is_settled_after_window(self):
+        self.clock.now = 1
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.HIGH)
+        self.clock.now = 1.005
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.LOW)
+        self.assertTrue(self.sensor.obstacle)
+        self.clock.now = 1.02
+        self.assertEqual((False, 1.02), self.sensor.state())
+        self.assertFalse(self.sensor.obstacle)
+
+    def test_settled_bounce_keeps_state(self):
+        self.clock.now = 1
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.HIGH)
+        self.clock.now = 1.004
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.LOW)
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.HIGH)
+        self.clock.now = 1.02
+        self.assertEqual((True, 1), self.sensor.state())
+
+    def test_every_edge_reaches_the_sensor(self):
+        self.sensor.stop()
+        with patch.object(GPIO, "add_event_detect", wraps=GPIO.add_event_detect) as add_event_detect:
+            self.sensor.start()
+        self.assertNotIn("bouncetime", add_event_detect.call_args.kwargs)
+
+    def test_stop_detaches_interrupts(self):
+        self.sensor.stop()
+        GPIO.inject_edge(CleaningRobot.INFRARED_PIN, GPIO.HIGH)
+        self.assertFalse(self.sensor.obstacle)
+
+    @patch.object(IBS, "get_charge_left")
+    def test_robot_reads_cached_obstacle_state(self, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        cr.obstacle_sensor = self.sensor
+        self.assertEqual("(0,1,N)", cr.execute_command("f"))
+        self.clock.now = 1
+        GPIO.inject_edge(cr.INFRARED_PIN, GPIO.HIGH)
+        with patch.object(GPIO, "input") as mock_input:
+            self.assertEqual("(0,1,N)(0,2)", cr.execute_command("f"))
+            mock_input.assert_not_called()
@@ -0,0 +1,122 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.path_planner import PathPlanner
+from src.room_map import RoomMap
+
+
+class TestPathPlanner(TestCase):
+
+    def test_plan_straight_line(self):
+        planner = PathPlanner(RoomMap(0, 9, 0, 9))
+        self.assertEqual("fff", planner.plan(0, 0, "N", 0, 3))
+
+    def test_plan_minimizes_turns(self):
+        planner = PathPlanner(RoomMap(0, 9, 0, 9))
+        route = planner.plan(0, 0, "N", 3, 3)
+        self.assertEqual(1, route.count("r") + route.count("l"))
+        self.assertEqual((3, 3), CleaningRobot.route_displacement(route)[:2])
+
+    def test_plan_turns_around(self):
+        planner = PathPlanner(RoomMap(0, 9, 0, 9))
+        route = planner.plan(0, 5, "N", 0, 3)
+        self.assertIn(route, ["rrff", "llff"])
+
+    def test_plan_avoids_obstacles(self):
+        room_map = RoomMap(0, 4, 0, 4)
+        for y in range(4):
+            room_map.set(2, y, RoomMap.OBSTACLE)
+        route = PathPlanner(room_map).plan(0, 0, "E", 4, 0)
+        x, y, heading = 0, 0, "E"
+        for command in route:
+            if command == "f":
+                x, y = x + CleaningRobot.DELTAS[heading][0], y + CleaningRobot.DELTAS[heading][1]
+                self.assertFalse(room_map.is_obstacle(x, y))
+            else:
+                heading = CleaningRobot.route_displacement(command, heading)[2]
+        self.assertEqual((4, 0), (x, y))
+
+    def test_plan_weights_turns(self):
+        room_map = RoomMap(0, 4, 0, 4)
+        for x, y in [(1, 1), (2, 2), (3, 3)]:
+            room_map.set(x, y, RoomMap.OBSTACLE)
+        cheap_turns = PathPlanner(room_map, forward_cost=1, turn_cost=0.1).plan(0, 0, "N", 4, 4)
+        costly_turns = PathPlanner(room_map, forward_cost=1, turn_cost=10).plan(0, 0, "N", 4, 4)
+        self.assertEqual("ffffrffff", costly_turns)
+        self.assertEqual(8, cheap_turns.count("f"))
+
+    def test_unreachable_target(self):
+        room_map = RoomMap(0, 4, 0, 4)
+        for y in range(5):
+            room_map.set(2, y, RoomMap.OBSTACLE)
+        self.assertRaises(CleaningRobotError, PathPlanner(room_map).plan, 0, 0, "N", 4, 4)
+
+    def test_unreachable_target_behind_walls(self):
+        room_map = RoomMap(0, 199, 0, 199)
+        for y in range(200):
+            room_map.set(100, y, RoomMap.OBSTACLE)
+        planner = PathPlanner(room_map)
+        self.assertRaises(CleaningRobotError, planner.plan, 0, 0, "N", 199, 0)
+        # Detected by the distances of the cells, not by expanding every state of the other side
+        self.assertLessEqual(planner.expanded, planner.EXPANSION_BUDGET + 1)
+
+    def test_walled_room_expands_states_along_path(self):
+        room_map = RoomMap(0, 299, 0, 299)
+        # Walls open at the north and south ends in turn, making a winding corridor
+        for x in range(30, 300, 30):
+            for y in range(3, 297):
+                room_map.set(x, y, RoomMap.OBSTACLE)
+            room_map.set(x, 299 if x % 60 else 0, RoomMap.OBSTACLE)
+            room_map.set(x, 298 if x % 60 else 1, RoomMap.OBSTACLE)
+            room_map.set(x, 297 if x % 60 else 2, RoomMap.OBSTACLE)
+        planner = PathPlanner(room_map)
+        route = planner.plan(0, 0, "N", 299, 0)
+        x, y, heading = CleaningRobot.route_displacement(route)
+        self.assertEqual((299, 0), (x, y))
+        self.assertEqual(1 + 4 * 4, route.count("r") + route.count("l"))
+        self.assertLess(planner.expanded, planner.EXPANSION_BUDGET + 10 * len(route))
+
+    def test_weighted_search_expands_fewer_states(self):
+        room_map = RoomMap(0, 59, 0, 59)
+        for y in range(55):
+            room_map.set(30, y, RoomMap.OBSTACLE)
+        exact, weighted = PathPlanner(room_map), PathPlanner(room_map, weight=2)
+        route = weighted.plan(0, 0, "N", 59, 0)
+        self.assertEqual((59, 0), CleaningRobot.route_displacement(route)[:2])
+        exact.plan(0, 0, "N", 59, 0)
+        self.assertLess(weighted.expanded, exact.expanded)
+
+    def test_weight_below_one(self):
+        self.assertRaises(CleaningRobotError, PathPlanner, RoomMap(0, 4, 0, 4), weight=0.5)
+
+    def test_target_out_of_map(self):
+        self.assertRaises(CleaningRobotError, PathPlanner(RoomMap(0, 4, 0, 4)).plan, 0, 0, "N", 5, 0)
+
+    def test_replan_reuses_previous_search(self):
+        room_map = RoomMap(0, 59, 0, 59)
+        for y in range(55):
+            room_map.set(30, y, RoomMap.OBSTACLE)
+        planner = PathPlanner(room_map)
+        route = planner.plan(0, 0, "N", 59, 0)
+        first = planner.expanded
+        self.assertEqual(route, planner.plan(0, 0, "N", 59, 0))
+        self.assertLess(planner.expanded - first, first / 10)
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "input")
+    def test_drive_to_replans_around_new_obstacle(self, mock_infrared_sensor: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        obstacles = {(0, 2)}
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        cr.room_map = RoomMap(*cr.borders)
+        mock_infrared_sensor.side_effect = lambda pin: (cr.pos_x + CleaningRobot.DELTAS[cr.heading][0],
+                                                        cr.pos_y + CleaningRobot.DELTAS[cr.heading][1]) in obstacles
+        planner = PathPlanner(cr.room_map)
+        status = planner.drive_to(cr, 0, 4)
+        self.assertEqual((0, 4), (cr.pos_x, cr.pos_y))
+        self.assertEqual(f"(0,4,{cr.heading})", status)
+        self.assertTrue(cr.room_map.is_obstacle(0, 2))
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import tempfile
+import threading
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from mock.backend import SimulatedBackend
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.rms_client import RMSClient, RouteReply, generate_load
+from src.rms_server import RMSServer
+
+
+class TestRMSServer(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.robot = CleaningRobot(SimulatedBackend())
+        self.robot.initialize_robot()
+        self.robot.set_borders(0, 999, 0, 999)
+        self.server = RMSServer(self.robot, queue_size=4)
+        self.address = await self.server.start_tcp()
+        self.client = RMSClient()
+        await self.client.connect_tcp(*self.address)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_route_streams_each_step(self):
+        reply = await self.client.execute("ffr")
+        self.assertEqual(RouteReply(["(0,1,N)", "(0,2,N)", "(0,2,E)"], "(0,2,E)"), reply)
+
+    @patch("src.cleaning_robot.DEPLOYMENT", True)
+    async def test_deployment_runs_commands_off_the_event_loop(self):
+        self.robot.WHEEL_MOVE_TIME = 0.01
+        threads = []
+        execute_step = self.robot.execute_step
+
+        def record_thread(command):
+            threads.append(threading.current_thread())
+            return execute_step(command)
+
+        with patch.object(self.robot, "execute_step", record_thread):
+            self.assertEqual("(0,1,N)", (await self.client.execute("f")).status)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    async def test_pipelined_routes_reply_in_order(self):
+        for route in ["f", "r", "f"]:
+            await self.client.send(route)
+        replies = [await self.client.receive() for _ in range(3)]
+        self.assertEqual(["(0,1,N)", "(0,1,E)", "(1,1,E)"], [reply.status for reply in replies])
+
+    async def test_invalid_route(self):
+        with self.assertRaises(CleaningRobotError):
+            await self.client.execute("fj")
+        self.assertEqual((0, 0), (self.robot.pos_x, self.robot.pos_y))
+        self.assertEqual("(0,1,N)", (await self.client.execute("f")).status)
+
+    async def test_route_longer_than_stream_limit(self):
+        with self.assertRaises(CleaningRobotError):
+            await self.client.execute("f" * 100000)
+        # The rest of the line is skipped rather than run as a route
+        self.assertEqual(RouteReply(["(0,1,N)"], "(0,1,N)"), await self.client.execute("f"))
+
+    async def test_close_with_full_route_queue(self):
+        await self.server.close()
+        self.server = RMSServer(self.robot, queue_size=1)
+        address = await self.server.start_tcp()
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def blocked_route(route, connection):
+            started.set()
+            await release.wait()
+
+        with patch.object(self.server, "_execute_route", blocked_route):
+            reader, writer = await asyncio.open_connection(*address)
+            writer.write(b"f\nf\nf\n")
+            await started.wait()
+            writer.close()
+            await asyncio.sleep(0.01)
+            await asyncio.wait_for(self.server.close(), 5)
+        # The handler of the connection ended instead of waiting for room in the queue
+        handlers = [task for task in asyncio.all_tasks() if "_handle" in repr(task.get_coro())]
+        self.assertEqual([], handlers)
+
+    async def test_route_stops_on_low_battery(self):
+        self.robot.ibs.charge = 10
+        self.assertEqual(RouteReply(["!(0,0,N)"], "!(0,0,N)"), await self.client.execute("ff"))
+
+    async def test_load_generator_never_interleaves_commands(self):
+        report = await generate_load(self.address, clients=5, routes=40, route="frfl")
+        self.assertEqual(200, report.routes)
+        self.assertEqual(800, report.steps)
+        self.assertEqual(200, len(report.latencies))
+        # Each route moves the robot one cell up and one to the right only if its commands ran back to back
+        self.assertEqual((200, 200, "N"), (self.robot.pos_x, self.robot.pos_y, self.robot.heading))
+
+    async def test_slow_client_does_not_block_others(self):
+        await self.server.close()
+        self.server = RMSServer(self.robot, queue_size=4, reply_queue_size=2)
+        address = await self.server.start_tcp()
+        reader, writer = await asyncio.open_connection(*address)
+        slow_port = writer.get_extra_info('sockname')[1]
+        drain = asyncio.StreamWriter.drain
+
+        async def stalled_drain(server_writer):
+            if server_writer.get_extra_info('peername')[1] == slow_port:
+                await asyncio.Event().wait()
+            await drain(server_writer)
+
+        with patch.object(asyncio.StreamWriter, "drain", stalled_drain):
+            writer.write(b"ffff\n")
+            client = RMSClient()
+            await client.connect_tcp(*address)
+            reply = await asyncio.wait_for(client.execute("f"), 5)
+            self.assertEqual("(0,5,N)", reply.status)
+            # Its replies piled up beyond the limit, so the slow client was disconnected after the first one
+            self.assertEqual(b"S (0,1,N)\n", await asyncio.wait_for(reader.read(), 5))
+            await client.close()
+        writer.close()
+
+    async def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "robot.sock")
+            await self.server.start_unix(path)
+            client = RMSClient()
+            await client.connect_unix(path)
+            self.assertEqual("(0,1,N)", (await client.execute("f")).status)
+            await client.close()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.room_map import RoomMap
+
+
+class TestRoomMap(TestCase):
+
+    def test_new_map_is_unknown(self):
+        room_map = RoomMap(0, 9, 0, 4)
+        self.assertEqual(50, room_map.count(RoomMap.UNKNOWN))
+
+    def test_set_and_get_cell(self):
+        room_map = RoomMap(-2, 2, -2, 2)
+        room_map.set(-2, 1, RoomMap.OBSTACLE)
+        self.assertEqual(RoomMap.OBSTACLE, room_map.get(-2, 1))
+        self.assertTrue(room_map.is_obstacle(-2, 1))
+        self.assertFalse(room_map.is_obstacle(5, 5))
+
+    def test_cell_out_of_map(self):
+        room_map = RoomMap(0, 9, 0, 9)
+        self.assertRaises(CleaningRobotError, room_map.get, 10, 0)
+
+    def test_invalid_state(self):
+        room_map = RoomMap(0, 9, 0, 9)
+        self.assertRaises(CleaningRobotError, room_map.set, 0, 0, 7)
+
+    def test_resize_keeps_overlapping_cells(self):
+        room_map = RoomMap(0, 4, 0, 4)
+        room_map.set(1, 1, RoomMap.CLEANED)
+        room_map.set(4, 4, RoomMap.OBSTACLE)
+        room_map.resize(1, 9, -3, 3)
+        self.assertEqual(RoomMap.CLEANED, room_map.get(1, 1))
+        self.assertFalse(room_map.contains(4, 4))
+        self.assertEqual((9, 7), (room_map.width, room_map.height))
+        self.assertEqual(1, room_map.count(RoomMap.CLEANED))
+
+    def test_save_and_load(self):
+        room_map = RoomMap(0, 999, 0, 999)
+        room_map.set(500, 700, RoomMap.OBSTACLE)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "room.map")
+            room_map.save(path)
+            loaded = RoomMap.load(path)
+            self.assertEqual((0, 999, 0, 999), (loaded.x_min, loaded.x_max, loaded.y_min, loaded.y_max))
+            self.assertTrue(loaded.is_obstacle(500, 700))
+            loaded.set(0, 0, RoomMap.FREE)
+            loaded.close()
+            self.assertEqual(RoomMap.UNKNOWN, RoomMap.load(path).get(0, 0), "Changes should stay private")
+
+    def test_load_invalid_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "room.map")
+            with open(path, "wb") as file:
+                file.write(b"\0" * 64)
+            self.assertRaises(CleaningRobotError, RoomMap.load, path)
+
+    def test_load_truncated_file(self):
+        room_map = RoomMap(0, 9, 0, 9)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "room.map")
+            room_map.save(path)
+            with open(path, "rb") as file:
+                data = file.read()
+            for size in (0, RoomMap.HEADER.size - 1, len(data) - 1):
+                with open(path, "wb") as file:
+                    file.write(data[:size])
+                self.assertRaises(CleaningRobotError, RoomMap.load, path)
+
+    def test_count_loaded_map(self):
+        room_map = RoomMap(0, 9, 0, 9)
+        room_map.set(1, 1, RoomMap.OBSTACLE)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "room.map")
+            room_map.save(path)
+            loaded = RoomMap.load(path)
+            self.assertEqual((1, 99), (loaded.count(RoomMap.OBSTACLE), loaded.count(RoomMap.UNKNOWN)))
+            loaded.close()
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "input")
+    def test_robot_records_cells_and_obstacles(self, mock_infrared_sensor: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        mock_infrared_sensor.side_effect = [False, True]
+        cr = CleaningRobot()
+        cr.initialize_robot()
+        cr.room_map = RoomMap(*cr.borders)
+        cr.cleaning_system_on = True
+        self.assertEqual("(0,1,N)(0,2)", cr.execute_commands("ff"))
+        self.assertEqual(RoomMap.CLEANED, cr.room_map.get(0, 1))
+        self.assertEqual(RoomMap.OBSTACLE, cr.room_map.get(0, 2))
+
+    def test_robot_set_borders_resizes_map(self):
+        cr = CleaningRobot()
+        cr.room_map = RoomMap(*cr.borders)
+        cr.set_borders(0, 19, 0, 4)
+        self.assertEqual((20, 5), (cr.room_map.width, cr.room_map.height))
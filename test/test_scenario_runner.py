@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from src.scenario_runner import Scenario, ScenarioResult, run_scenario, run_scenarios, scenario_obstacles
+
+
+class TestScenarioRunner(TestCase):
+
+    def test_route_without_obstacles(self):
+        result = run_scenario(Scenario(1, "ffrf"))
+        self.assertEqual(ScenarioResult(1, "(1,2,E)", 4, 0, 4), result)
+
+    def test_route_goes_on_after_obstacle(self):
+        result = run_scenario(Scenario(2, "ffrf", obstacles=frozenset({(0, 1)})))
+        self.assertEqual(ScenarioResult(2, "(1,0,E)", 4, 2, 4), result)
+
+    def test_route_ends_on_low_battery(self):
+        result = run_scenario(Scenario(3, "ffff", battery=13, forward_drain=1))
+        self.assertEqual(ScenarioResult(3, "!(0,3,N)", 3, 0, 3), result)
+
+    def test_route_ends_out_of_bounds(self):
+        result = run_scenario(Scenario(4, "ffff", borders=(0, 1, 0, 1)))
+        self.assertEqual("O(0,2,N)", result.status)
+        self.assertEqual(2, result.steps)
+
+    def test_seeded_obstacles_are_deterministic(self):
+        scenario = Scenario(5, "", borders=(0, 29, 0, 29), obstacle_density=0.2, seed=42)
+        self.assertEqual(scenario_obstacles(scenario), scenario_obstacles(scenario._replace(scenario_id=6)))
+        self.assertNotEqual(scenario_obstacles(scenario), scenario_obstacles(scenario._replace(seed=43)))
+        self.assertNotIn((0, 0), scenario_obstacles(scenario))
+
+    def test_process_pool_matches_serial_run(self):
+        scenarios = [Scenario(i, "frflffrrf" * 3, obstacle_density=0.1, seed=i) for i in range(40)]
+        self.assertEqual(list(run_scenarios(scenarios, workers=0)),
+                         list(run_scenarios(scenarios, workers=2, chunksize=8)))
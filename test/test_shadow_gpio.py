@@ -0,0 +1,65 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch, call
+
+from mock import GPIO
+from mock.ibs import IBS
+from src.cleaning_robot import CleaningRobot
+from src.shadow_gpio import ShadowGPIO
+
+
+class TestShadowGPIO(TestCase):
+
+    @patch.object(GPIO, "output")
+    def test_redundant_write_is_suppressed(self, mock_output: Mock):
+        gpio = ShadowGPIO(GPIO)
+        gpio.output(11, True)
+        gpio.output(11, GPIO.HIGH)
+        mock_output.assert_called_once_with(11, True)
+        self.assertEqual((1, 1), (gpio.writes_issued, gpio.writes_suppressed))
+
+    @patch.object(GPIO, "output")
+    def test_level_change_is_written(self, mock_output: Mock):
+        gpio = ShadowGPIO(GPIO)
+        gpio.output(11, True)
+        gpio.output(11, False)
+        mock_output.assert_has_calls([call(11, True), call(11, False)])
+        self.assertEqual(0, gpio.level(11))
+
+    @patch.object(GPIO, "output")
+    def test_setup_seeds_shadow_level(self, mock_output: Mock):
+        gpio = ShadowGPIO(GPIO)
+        gpio.setup(13, GPIO.OUT)
+        gpio.output(13, GPIO.LOW)
+        mock_output.assert_not_called()
+
+    @patch.object(GPIO, "output")
+    def test_output_many_writes_changed_pins_at_once(self, mock_output: Mock):
+        gpio = ShadowGPIO(GPIO)
+        gpio.output(16, GPIO.HIGH)
+        gpio.output_many({16: GPIO.HIGH, 18: GPIO.LOW, 22: GPIO.HIGH})
+        mock_output.assert_called_with([18, 22], [0, 1])
+        self.assertEqual((3, 1), (gpio.writes_issued, gpio.writes_suppressed))
+
+    @patch.object(GPIO, "output")
+    def test_invalidate_forces_next_write(self, mock_output: Mock):
+        gpio = ShadowGPIO(GPIO)
+        gpio.output(11, True)
+        gpio.invalidate(11)
+        gpio.output(11, True)
+        self.assertEqual(2, mock_output.call_count)
+
+    def test_forwards_other_attributes(self):
+        gpio = ShadowGPIO(GPIO)
+        self.assertEqual(GPIO.HIGH, gpio.HIGH)
+
+    @patch.object(IBS, "get_charge_left")
+    @patch.object(GPIO, "output")
+    def test_robot_commands_drop_redundant_writes(self, mock_output: Mock, mock_ibs: Mock):
+        mock_ibs.return_value = 50
+        cr = CleaningRobot()
+        cr.gpio = ShadowGPIO(cr.gpio)
+        cr.initialize_robot()
+        self.assertEqual("(0,1,N)", cr.execute_command("f"))
+        self.assertEqual("(0,2,N)", cr.execute_command("f"))
+        self.assertEqual(1, mock_output.call_args_list.count(call(cr.WARNING_LED_PIN, False)))
+        self.assertEqual(4, cr.gpio.writes_suppressed)
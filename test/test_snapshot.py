@@ -0,0 +1,130 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from mock.backend import RecordingGPIO, SimulatedBackend
+from src.cleaning_robot import CleaningRobot, CleaningRobotError, LazyPeripheral
+from src.snapshot import HEADER, SLOT_SIZE, RobotState, StateSnapshot
+from src.supervisor import Supervisor
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "robot.snapshot")
+        self.robot = CleaningRobot(SimulatedBackend())
+        self.robot.initialize_robot()
+        self.robot.set_borders(-5, 5, -5, 5)
+        self.snapshot = StateSnapshot(self.path)
+        self.snapshot.attach(self.robot)
+
+    def tearDown(self):
+        self.snapshot.close()
+        self.directory.cleanup()
+
+    def _restarted(self, gpio=None):
+        robot = CleaningRobot(SimulatedBackend(gpio=gpio), lazy=True)
+        snapshot = StateSnapshot(self.path)
+        self.addCleanup(snapshot.close)
+        return robot, snapshot, snapshot.restore(robot)
+
+    def test_saves_after_each_command(self):
+        self.robot.execute_commands("ffrf")
+        self.robot.manage_cleaning_system()
+        self.assertEqual(RobotState(1, 2, 'E', (-5, 5, -5, 5), False, True, False), self.snapshot.load())
+
+    def test_warm_restart_resumes_mission(self):
+        self.robot.execute_commands("ffrf")
+        self.snapshot.close()
+        gpio = RecordingGPIO()
+        robot, snapshot, restored = self._restarted(gpio)
+        self.assertTrue(restored)
+        self.assertEqual("(1,2,E)", robot.robot_status())
+        self.assertEqual([-5, 5, -5, 5], robot.borders)
+        self.assertEqual("(2,2,E)", robot.execute_command("f"))
+        self.assertEqual((2, 2, 'E'), snapshot.load()[:3])
+
+    def test_restore_without_snapshot(self):
+        self.snapshot.close()
+        os.remove(self.path)
+        robot, snapshot, restored = self._restarted()
+        self.assertFalse(restored)
+        self.assertIsNone(robot.heading)
+        self.assertIsNone(snapshot.load())
+
+    def test_restore_writes_outputs(self):
+        self.robot.pos_x = 10
+        self.robot.robot_status()
+        self.robot.manage_cleaning_system()
+        self.snapshot.close()
+        gpio = RecordingGPIO()
+        robot, _, _ = self._restarted(gpio)
+        self.assertTrue(robot.warning_led_on)
+        self.assertEqual([1], gpio.writes(CleaningRobot.WARNING_LED_PIN))
+        self.assertEqual([1], gpio.writes(CleaningRobot.CLEANING_SYSTEM_PIN))
+
+    def test_low_battery_cut_is_saved(self):
+        self.robot.manage_cleaning_system()
+        self.robot.ibs.charge = 5
+        self.assertEqual("!(0,0,N)", self.robot.execute_command("f"))
+        self.robot.manage_cleaning_system()
+        state = self.snapshot.load()
+        self.assertTrue(state.recharge_led_on)
+        self.assertFalse(state.cleaning_system_on)
+
+    def test_supervisor_changes_are_saved(self):
+        robot = CleaningRobot(SimulatedBackend(charge=50))
+        robot.initialize_robot()
+        supervisor = Supervisor(robot)
+        self.snapshot.attach(robot)
+        supervisor.tick()
+        self.assertTrue(self.snapshot.load().cleaning_system_on)
+        robot.ibs.ibs.charge = 5
+        robot.execute_command("f")
+        state = self.snapshot.load()
+        self.assertTrue(state.recharge_led_on)
+        self.assertFalse(state.cleaning_system_on)
+
+    def test_unchanged_state_is_not_written(self):
+        saves = self.snapshot.saves
+        self.robot.execute_command("f")
+        self.robot.set_borders(-5, 5, -5, 5)
+        self.assertEqual(saves + 1, self.snapshot.saves)
+
+    def test_torn_save_falls_back_to_previous_state(self):
+        self.robot.execute_command("f")
+        self.robot.execute_command("f")
+        sequence = self.snapshot._sequence
+        self.snapshot.close()
+        with open(self.path, 'r+b') as file:
+            file.seek(HEADER.size + (sequence & 1) * SLOT_SIZE + 5)
+            file.write(b'\xff\xff')
+        with StateSnapshot(self.path) as snapshot:
+            self.assertEqual((0, 1, 'N'), snapshot.load()[:3])
+
+    def test_rejects_other_files(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'CRJ1' + bytes(100))
+        self.assertRaises(CleaningRobotError, StateSnapshot, self.path)
+
+
+class TestLazyPeripherals(TestCase):
+
+    def test_setup_deferred_to_first_gpio_call(self):
+        gpio = RecordingGPIO()
+        robot = CleaningRobot(SimulatedBackend(gpio=gpio), lazy=True)
+        self.assertIsInstance(robot.gpio, LazyPeripheral)
+        self.assertIsNone(gpio.mode)
+        robot.initialize_robot()
+        self.assertEqual("(0,1,N)", robot.execute_command("f"))
+        self.assertIs(gpio, robot.gpio)
+        self.assertEqual(gpio.BOARD, gpio.mode)
+
+    def test_ibs_deferred_to_first_reading(self):
+        backend = SimulatedBackend(charge=5)
+        robot = CleaningRobot(backend, lazy=True)
+        self.assertIsInstance(robot.ibs, LazyPeripheral)
+        robot.initialize_robot()
+        self.assertEqual("!(0,0,N)", robot.execute_command("f"))
+        self.assertIs(backend.ibs, robot.ibs)
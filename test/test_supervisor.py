@@ -0,0 +1,100 @@
+import threading
+from unittest import TestCase
+
+from mock.backend import RecordingGPIO, SimulatedBackend
+from src.cleaning_robot import CleaningRobot, CleaningRobotError
+from src.metrics import RobotMetrics
+from src.supervisor import Supervisor, SupervisorEvent
+from src.virtual_clock import VirtualClock
+
+
+class TestSupervisor(TestCase):
+
+    def setUp(self):
+        self.gpio = RecordingGPIO()
+        self.backend = SimulatedBackend(charge=50, gpio=self.gpio)
+        self.robot = CleaningRobot(self.backend)
+        self.robot.initialize_robot()
+        self.supervisor = Supervisor(self.robot, clock=lambda: 0.0)
+        self.events = []
+        self.supervisor.subscribe(self.events.append)
+
+    def tearDown(self):
+        self.supervisor.stop()
+
+    def test_tick_sets_every_output(self):
+        self.supervisor.tick()
+        self.assertTrue(self.robot.cleaning_system_on)
+        self.assertFalse(self.robot.recharge_led_on)
+        self.assertEqual([SupervisorEvent(Supervisor.CLEANING_SYSTEM, True, 0.0),
+                          SupervisorEvent(Supervisor.RECHARGE_LED, False, 0.0),
+                          SupervisorEvent(Supervisor.WARNING_LED, False, 0.0)], self.events)
+
+    def test_only_changes_are_written_and_published(self):
+        self.supervisor.tick()
+        self.gpio.clear()
+        self.supervisor.tick()
+        self.assertEqual(0, self.gpio.count())
+        self.assertEqual(3, len(self.events))
+
+    def test_low_battery_reading_cuts_brushes_at_once(self):
+        self.supervisor.tick()
+        self.events.clear()
+        self.backend.ibs.charge = 10
+        self.assertEqual("!(0,0,N)", self.robot.execute_command("f"))
+        self.assertFalse(self.robot.cleaning_system_on)
+        self.assertTrue(self.robot.recharge_led_on)
+        self.assertEqual([Supervisor.CLEANING_SYSTEM, Supervisor.RECHARGE_LED], [event.output for event in self.events])
+        self.assertEqual([1, 0], self.gpio.writes(CleaningRobot.CLEANING_SYSTEM_PIN))
+
+    def test_battery_readings_never_switch_brushes_on(self):
+        self.backend.ibs.charge = 5
+        self.robot.execute_command("f")
+        self.assertFalse(self.robot.cleaning_system_on)
+        self.backend.ibs.charge = 50
+        self.robot.execute_command("f")
+        self.assertFalse(self.robot.cleaning_system_on)
+        self.supervisor.tick()
+        self.assertTrue(self.robot.cleaning_system_on)
+
+    def test_switching_brushes_takes_virtual_time(self):
+        self.robot.clock = VirtualClock()
+        self.supervisor.tick()
+        self.assertEqual(CleaningRobot.CLEANING_SYSTEM_SWITCH_TIME, self.robot.clock())
+        self.supervisor.tick()
+        self.assertEqual(CleaningRobot.CLEANING_SYSTEM_SWITCH_TIME, self.robot.clock())
+
+    def test_background_thread_bypasses_later_layers(self):
+        metrics = RobotMetrics()
+        metrics.attach(self.robot)
+        self.supervisor.tick()
+        self.assertEqual(0, metrics.gpio_writes_total)
+        self.assertTrue(self.robot.cleaning_system_on)
+
+    def test_must_be_created_before_other_layers(self):
+        robot = CleaningRobot(SimulatedBackend())
+        RobotMetrics().attach(robot)
+        self.assertRaises(CleaningRobotError, Supervisor, robot)
+
+    def test_commands_leave_warning_led_to_supervisor(self):
+        self.robot.pos_x = 20
+        self.assertEqual("O(20,0,N)", self.robot.execute_command("f"))
+        self.assertEqual([], self.gpio.writes(CleaningRobot.WARNING_LED_PIN))
+        self.supervisor.tick()
+        self.assertTrue(self.robot.warning_led_on)
+        self.assertEqual([1], self.gpio.writes(CleaningRobot.WARNING_LED_PIN))
+
+    def test_manage_cleaning_system_delegates_to_supervisor(self):
+        self.robot.manage_cleaning_system()
+        self.assertTrue(self.robot.cleaning_system_on)
+        self.assertEqual(3, len(self.events))
+
+    def test_background_thread(self):
+        self.supervisor.period = 0.01
+        self.supervisor.start()
+        warned = threading.Event()
+        self.supervisor.subscribe(lambda event: event.output == Supervisor.WARNING_LED and event.on and warned.set())
+        self.robot.pos_x = 20
+        self.assertTrue(warned.wait(2))
+        self.supervisor.stop()
+        self.assertTrue(self.robot.warning_led_on)
@@ -0,0 +1,66 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from mock.backend import SimulatedBackend
+from src.async_cleaning_robot import AsyncCleaningRobot
+from src.cleaning_robot import CleaningRobot
+from src.virtual_clock import VirtualBattery, VirtualClock, attach_virtual_clock
+
+
+class TestVirtualClock(TestCase):
+
+    def test_sleep_advances_time(self):
+        clock = VirtualClock()
+        clock.sleep(1.5)
+        self.assertEqual(1.5, clock())
+
+    def test_battery_drains_with_loads(self):
+        clock = VirtualClock()
+        battery = VirtualBattery(clock, charge=50, idle_drain=0.5, drains={CleaningRobot.WHEEL_MOTOR: 2})
+        clock.sleep(2)
+        clock.sleep(1, (CleaningRobot.WHEEL_MOTOR,))
+        self.assertEqual(50 - 1 - 2.5, battery.charge)
+        self.assertEqual(46, battery.get_charge_left())
+
+    def test_actuations_advance_time(self):
+        cr = CleaningRobot(SimulatedBackend())
+        clock = attach_virtual_clock(cr)
+        cr.initialize_robot()
+        cr.ROTATION_TIME = 0.75
+        self.assertEqual("(1,2,E)", cr.execute_commands("ffrf"))
+        self.assertEqual(3.75, clock.now)
+
+    def test_coalesced_moves_cruise(self):
+        cr = CleaningRobot(SimulatedBackend())
+        clock = attach_virtual_clock(cr)
+        cr.initialize_robot()
+        cr.execute_commands("fff", coalesce_moves=True)
+        self.assertAlmostEqual(cr.WHEEL_MOVE_TIME + 2 * cr.WHEEL_CRUISE_TIME, clock.now)
+
+    def test_cleaning_system_switch_advances_time(self):
+        cr = CleaningRobot(SimulatedBackend())
+        clock = attach_virtual_clock(cr)
+        cr.manage_cleaning_system()
+        cr.manage_cleaning_system()
+        self.assertEqual(cr.CLEANING_SYSTEM_SWITCH_TIME, clock.now)
+
+    def test_mission_predicts_battery_depletion(self):
+        cr = CleaningRobot(SimulatedBackend())
+        clock = attach_virtual_clock(cr, charge=30, drains={CleaningRobot.WHEEL_MOTOR: 1,
+                                                            CleaningRobot.CLEANING_SYSTEM: 1})
+        cr.initialize_robot()
+        cr.set_borders(0, 99, 0, 99)
+        cr.manage_cleaning_system()
+        status = cr.execute_commands("f" * 50)
+        self.assertEqual("!(0,10,N)", status)
+        self.assertEqual(10.5, clock.now)
+
+
+class TestAsyncVirtualClock(IsolatedAsyncioTestCase):
+
+    async def test_async_actuations_advance_time(self):
+        cr = AsyncCleaningRobot()
+        cr.clock = VirtualClock()
+        cr.ibs = VirtualBattery(cr.clock)
+        cr.initialize_robot()
+        self.assertEqual("(0,1,W)", await cr.execute_commands_async("fl"))
+        self.assertEqual(2, cr.clock.now)